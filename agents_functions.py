@@ -3,47 +3,15 @@ from droidrun import DroidAgent, DroidrunConfig, LLMProfile, LoggingConfig, Agen
 from dotenv import load_dotenv
 from phoenix.otel import register
 from tools.inshot_tools import InshotTools
+from tools.metrics import export_from_env, install_llm_hooks
+from profiling import phase, profile
+from tools.state_cache import CachedTools
+from tools.media_import import fast_import, select_all_tiles
 from pydantic import BaseModel, Field
 
 async def select_images_tool(tools: Tools, **kwargs):
-    ui_state = (await tools.get_state())[2]
-
-    id = -1
-    start = False
-    elems = []
-    for elem in ui_state:
-        if elem.get("resourceId", "") == "com.camerasideas.instashot:id/wallRecyclerView":
-            id = elem.get("index", "")
-            start = True
-            continue
-
-        if not start: continue
-
-        id_now = elem.get("index", "")
-        if id_now - id > 1:
-            if elem.get("resourceId") == "":
-                elems.append(elem)
-            else:
-                start = False
-
-    print(elems)
-    print(len(elems))
-    
-    for elem in elems:
-        try:
-            bounds_str = elem.get("bounds", "0,0,0,0")
-            bounds = [int(x) for x in bounds_str.split(',')]
-            center_x = (bounds[0] + bounds[2]) // 2
-            center_y = (bounds[1] + bounds[3]) // 2
-            
-            print(f"Tapping Image at ({center_x}, {center_y})")
-            InshotTools._adb_tap(center_x, center_y)
-            
-        except Exception as e:
-            print(f"Failed to tap element: {e}")
-
-    id = await InshotTools._find_node_by_id(tools, "com.camerasideas.instashot:id/applySelectVideo")
-    await tools.tap_on_index(id)
+    tools = CachedTools.wrap(tools)
+    await select_all_tiles(tools)
     print("Selection Complete")
 
 def getProfile():
@@ -101,7 +69,13 @@ def getAgentConfig(reasoning = False, vision=False):
         executor=ExecutorConfig(vision=vision)
     )
 
-async def select_images():
+async def select_images(remote_dir="/sdcard/Pictures/droidrun", use_agent_fallback=True):
+    if await fast_import(remote_dir):
+        return True
+    if not use_agent_fallback:
+        return False
+    print("🤖 Falling back to the import agent...")
+
     goal = """
             Open inshot app and select all the images from the droidrun and go the video editor screen and your job is done.
             After opening the inshot app select the video icon (looks like a film) in the left center and then find the droidrun folder
@@ -126,12 +100,26 @@ async def select_images():
         }
     }
     
+    return await run_goal(goal, custom_tools)
+
+async def run_goal(goal, custom_tools=None):
+    """Runs the vision agent on a free-form goal (import agent, macro hand-off)."""
+    if custom_tools is None:
+        custom_tools = {
+            "select_images": {
+                "arguments": [],
+                "description": "Selects the images",
+                "function": select_images_tool
+            }
+        }
+
     load_dotenv()
     tracer_provider = register(
         project_name="droidrun-video-editor", 
         endpoint="http://127.0.0.1:6006/v1/traces",
         auto_instrument=True
     )
+    install_llm_hooks()
     
     config = DroidrunConfig(
         agent=getAgentConfig(reasoning=False, vision=True),
@@ -154,13 +142,14 @@ async def select_images():
 
 import json
 
-async def edit_image(num_images, plan):
+async def edit_image(num_images, plan, calibrate=True):
     load_dotenv()
     tracer_provider = register(
         project_name="droidrun-video-editor", 
         endpoint="http://127.0.0.1:6006/v1/traces",
         auto_instrument=True 
     )
+    install_llm_hooks()
     
     config = DroidrunConfig(
         agent=getAgentConfig(reasoning=False, vision=True),
@@ -173,9 +162,14 @@ async def edit_image(num_images, plan):
     
     plan_str = json.dumps(plan, indent=4)
 
+    if calibrate:
+        setup = f"- Call 'calibrate(num_images={num_images})' to map the timeline."
+    else:
+        setup = "- The timeline is ALREADY calibrated. Do NOT call 'calibrate' again (it resets the timeline model)."
+
     goal = f"""
         Phase 1: Setup & Physics
-        - Call 'calibrate(num_images={num_images})' to map the timeline.
+        {setup}
 
         Phase 2: Execution
         Follow this execution plan strictly. Convert the JSON below into tool calls. 
@@ -196,6 +190,11 @@ async def edit_image(num_images, plan):
             "description":  "Moves the playhead to a specific timestamp in seconds (e.g. 12.5). Automatically corrects position if it misses.",
             "function": InshotTools.seek_timeline
         },
+        "zoom_timeline": {
+            "arguments": ["scale"],
+            "description": "Pinch-zooms the timeline. scale is relative to the calibrated zoom (0.5 = zoomed out 2x). Only needed for manual navigation; seek_timeline zooms on its own.",
+            "function": InshotTools.zoom_timeline
+        },
         "add_transition": {
             "arguments": ["image1_idx", "image2_idx", "transition_type", "all_apply"],
             "description": "Adds a transition between two images. image1_idx/image2_idx are 1-based. all_apply=True applies to ALL clips (use idx 1 & 2 as placeholders).",
@@ -221,9 +220,20 @@ async def edit_image(num_images, plan):
 
     result = await agent.run()
 
+    stats = CachedTools.total_stats()
+    print(f"🗄️ get_state cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%})")
+    export_from_env()
+
     return result
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run plan.json through the editing agent.")
+    parser.add_argument("--profile", nargs="?", const="profiles", help="profile the Editing phase into this folder")
+    args = parser.parse_args()
+
     with open("plan.json", "r") as f:
         plan = json.load(f)
-    asyncio.run(edit_image(4, plan["plan"]))
\ No newline at end of file
+    with profile(args.profile), phase("Editing"):
+        asyncio.run(edit_image(4, plan["plan"]))
\ No newline at end of file
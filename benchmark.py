@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from plan_executor import PlanExecutor
+from plan_optimizer import optimize_plan
+from tools.inshot_simulator import InshotSimulator
+from tools.inshot_tools import InshotTools
+from tools.seek_controller import SeekController
+from tools.state_cache import CachedTools
+
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Relative increase that counts as a regression. The simulator is seeded, so
+# everything except wall time is deterministic and any real change shows up.
+TOLERANCE = {"wall_ms": 0.25}
+DEFAULT_TOLERANCE = 0.05
+WALL_FLOOR_MS = 5.0 # Below this a wall-time difference is noise
+LOWER_IS_BETTER = ("wall_ms", "device_s", "get_state", "gestures", "inputs", "seek_iterations", "sleep_s", "errors")
+
+
+def _load_plan(path="plan.json"):
+    with open(path, "r") as f:
+        return json.load(f)["plan"]
+
+
+async def _seek_sweep(sim, auto_zoom=False):
+    results = []
+    for target in (12.5, 3.0, 27.5, 15.0):
+        results.append(await InshotTools.seek_timeline(target, tools=sim, auto_zoom=auto_zoom))
+    return results
+
+
+async def _run_plan(sim, optimize=False):
+    steps = _load_plan()
+    if optimize:
+        steps, _ = optimize_plan(steps, len(sim.truth))
+    report = await PlanExecutor(sim, fallback_to_agent=False, log=lambda *a: None).run(steps)
+    return [s.message for s in report.steps]
+
+
+# name -> (clips in the project, body run after calibration)
+CASES = {
+    "seek_timeline": (6, _seek_sweep),
+    # auto_zoom stays off by default until this case beats the one above
+    "seek_timeline_auto_zoom": (6, lambda sim: _seek_sweep(sim, auto_zoom=True)),
+    "change_duration": (4, lambda sim: InshotTools.change_duration(3, 7.5, tools=sim)),
+    "apply_effect": (4, lambda sim: InshotTools.apply_effect(2, ["Noise"], tools=sim)),
+    "apply_effect_stacked": (4, lambda sim: InshotTools.apply_effect(2, ["Noise", "Flash"], tools=sim)),
+    "add_transition": (4, lambda sim: InshotTools.add_transition(2, 3, "fade", False, tools=sim)),
+    "add_transition_all": (4, lambda sim: InshotTools.add_transition(2, 3, "mix", True, tools=sim)),
+    "plan": (4, _run_plan),
+    "plan_optimized": (4, lambda sim: _run_plan(sim, optimize=True)),
+}
+
+
+@contextmanager
+def _count_calls(owner, name, counts):
+    original = getattr(owner, name)
+
+    def counted(*args, **kwargs):
+        counts[name] = counts.get(name, 0) + 1
+        return original(*args, **kwargs)
+
+    setattr(owner, name, counted)
+    try:
+        yield counts
+    finally:
+        setattr(owner, name, original)
+
+
+def _errors(result):
+    results = result if isinstance(result, list) else [result]
+    return sum(1 for r in results if isinstance(r, str) and r.lstrip().startswith(("❌", "⚠️")))
+
+
+async def _measure(name, seed):
+    num_clips, body = CASES[name]
+    sim = InshotSimulator(num_clips=num_clips, seed=seed)
+    with sim.install():
+        await InshotTools.calibrate(num_clips, tools=sim)
+        before = dict(sim.stats)
+        device_before = sim.now
+        cache_before = CachedTools.total_stats()["hits"]
+
+        with _count_calls(SeekController, "plan", {}) as counts:
+            started = time.perf_counter()
+            result = await body(sim)
+            wall = time.perf_counter() - started
+        sim.settle()
+
+    delta = {k: sim.stats[k] - before[k] for k in sim.stats}
+    return {
+        "wall_ms": wall * 1000,
+        "device_s": round(sim.now - device_before, 3),
+        "get_state": delta["get_state"],
+        "cache_hits": CachedTools.total_stats()["hits"] - cache_before,
+        "gestures": delta["taps"] + delta["swipes"] + delta["pinches"],
+        "inputs": delta["inputs"],
+        "seek_iterations": counts.get("plan", 0),
+        "sleep_s": round(delta["sleep_seconds"], 3),
+        "errors": _errors(result),
+    }
+
+
+def run_case(name, repeats=5, seed=0):
+    """
+    One case on a fresh simulator, `repeats` times. Counters come from the
+    first run (they are identical every time); wall time is the median.
+    """
+    runs = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(asyncio.run(_measure(name, seed)))
+    metrics = dict(runs[0])
+    metrics["wall_ms"] = round(statistics.median(r["wall_ms"] for r in runs), 2)
+    return metrics
+
+
+def run_all(names=None, repeats=5, seed=0):
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "repeats": repeats,
+        "cases": {name: run_case(name, repeats, seed) for name in (names or CASES)},
+    }
+
+
+def compare(baseline, current):
+    """[(case, metric, old, new)] for every metric that got worse beyond its tolerance."""
+    regressions = []
+    for name, metrics in current["cases"].items():
+        old_metrics = baseline.get("cases", {}).get(name)
+        if not old_metrics:
+            continue
+        for metric in LOWER_IS_BETTER:
+            old, new = old_metrics.get(metric), metrics.get(metric)
+            if old is None or new is None or new <= old:
+                continue
+            if metric == "wall_ms" and new - old < WALL_FLOOR_MS:
+                continue
+            if new > old * (1 + TOLERANCE.get(metric, DEFAULT_TOLERANCE)) or old == 0:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def format_table(results, baseline=None):
+    columns = ("wall_ms", "device_s", "get_state", "gestures", "seek_iterations", "sleep_s", "errors")
+    header = f"{'case':<22}" + "".join(f"{c:>17}" for c in columns)
+    lines = [header, "-" * len(header)]
+    for name, metrics in results["cases"].items():
+        old_metrics = (baseline or {}).get("cases", {}).get(name, {})
+        cells = []
+        for c in columns:
+            cell = f"{metrics[c]:g}"
+            old = old_metrics.get(c)
+            if old:
+                cell += f" ({(metrics[c] - old) / old:+.0%})"
+            cells.append(f"{cell:>17}")
+        lines.append(f"{name:<22}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="InshotTools benchmarks against the offline InShot simulator.")
+    parser.add_argument("cases", nargs="*", help=f"subset of: {', '.join(CASES)}")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", nargs="?", const=BASELINE_PATH, help="write results as the new baseline")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, help="flag regressions against a baseline")
+    args = parser.parse_args(argv)
+
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    results = run_all(args.cases, args.repeats, args.seed)
+    print(format_table(results, baseline))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"💾 Baseline written to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, results)
+        for name, metric, old, new in regressions:
+            print(f"❌ {name}: {metric} {old:g} -> {new:g}")
+        if regressions:
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+TILE = 320 # px per square tile; enough to read mood, colour and subject
+COLUMNS = 4
+MAX_TILES = 16 # per sheet, so labels stay legible at Gemini's input resolution
+BACKGROUND = 24
+
+
+def _tile(path, size):
+    """Letterboxed size x size RGB array of one clip."""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        canvas = np.full((size, size, 3), BACKGROUND, dtype=np.uint8)
+        h, w = img.height, img.width
+        top, left = (size - h) // 2, (size - w) // 2
+        canvas[top:top + h, left:left + w] = np.asarray(img)
+    return canvas
+
+
+def _grid(tiles, columns):
+    """(n, s, s, 3) -> one (rows*s, columns*s, 3) image, row-major."""
+    n, size = tiles.shape[0], tiles.shape[1]
+    rows = -(-n // columns)
+    padded = np.full((rows * columns, size, size, 3), BACKGROUND, dtype=np.uint8)
+    padded[:n] = tiles
+    return padded.reshape(rows, columns, size, size, 3).transpose(0, 2, 1, 3, 4).reshape(rows * size, columns * size, 3)
+
+
+def _label(sheet, first_number, count, size, columns):
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default(size=max(16, size // 8))
+    for k in range(count):
+        row, col = divmod(k, columns)
+        text = str(first_number + k)
+        x, y = col * size + 6, row * size + 6
+        box = draw.textbbox((x, y), text, font=font)
+        draw.rectangle((box[0] - 4, box[1] - 4, box[2] + 4, box[3] + 4), fill=(255, 255, 0))
+        draw.text((x, y), text, fill=(0, 0, 0), font=font)
+
+
+def build_contact_sheets(paths, out_dir=".director_uploads", tile=TILE, columns=COLUMNS, max_tiles=MAX_TILES):
+    """
+    Tiles the clips into numbered contact sheets (tile k is image k, 1-based,
+    continuing across sheets). Returns the sheet paths in order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    tiles = np.stack([_tile(p, tile) for p in paths])
+
+    sheets = []
+    for first in range(0, len(paths), max_tiles):
+        chunk = tiles[first:first + max_tiles]
+        sheet = Image.fromarray(_grid(chunk, columns))
+        _label(sheet, first + 1, len(chunk), tile, columns)
+        dest = os.path.join(out_dir, f"contact_sheet_{first // max_tiles + 1}.jpg")
+        sheet.save(dest, "JPEG", quality=85)
+        sheets.append(dest)
+
+    print(f"🗂️ Tiled {len(paths)} clips into {len(sheets)} contact sheet(s) in {time.perf_counter() - started:.1f}s")
+    return sheets
+
+
+def compare_modes(director, user_prompt, clips_path, modes=("images", "contact_sheet")):
+    """
+    Runs the Director once per mode (cache bypassed) and reports upload
+    count, tokens and latency for each.
+    """
+    cache, director.cache = director.cache, None
+    results = {}
+    try:
+        for mode in modes:
+            started = time.perf_counter()
+            plan = director.generate_plan(user_prompt, clips_path, mode=mode)
+            usage = director.last_usage
+            results[mode] = {
+                "seconds": round(time.perf_counter() - started, 2),
+                "upload_seconds": round(director.last_timings.get("upload", 0.0), 2),
+                "generate_seconds": round(director.last_timings.get("generate", 0.0), 2),
+                "uploads": director.last_timings.get("uploads", 0),
+                "prompt_tokens": getattr(usage, "prompt_token_count", None),
+                "total_tokens": getattr(usage, "total_token_count", None),
+                "steps": len(plan["plan"]) if plan else None,
+            }
+    finally:
+        director.cache = cache
+
+    print(f"{'mode':<14} {'uploads':>7} {'prompt tok':>10} {'total tok':>10} {'upload s':>9} {'total s':>8} {'steps':>5}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<14} {r['uploads']:>7} {str(r['prompt_tokens']):>10} {str(r['total_tokens']):>10} "
+            f"{r['upload_seconds']:>9} {r['seconds']:>8} {str(r['steps']):>5}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    from director import VideoDirector
+    from image_preprocess import list_sync_images
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else "images"
+    paths = list_sync_images(folder)
+    results = compare_modes(VideoDirector(), "Somehow make an intresting looking edit from these images", paths)
+    with open("contact_sheet_comparison.json", "w") as f:
+        json.dump(results, f, indent=4)
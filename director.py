@@ -1,7 +1,14 @@
 from google import genai
 import json
 from dotenv import load_dotenv
-import os
+import time
+from plan_cache import PlanCache, plan_key
+from upload_registry import FileUploader
+from image_preprocess import preprocess_images, list_sync_images
+from contact_sheet import build_contact_sheets
+from plan_stream import PlanStreamParser
+from profiling import phase, profile
+from tools.metrics import timed
 
 DIRECTOR_SYSTEM_PROMPT = """
 You are an expert Video Editor AI. Your goal is to translate a high-level user request (e.g., "Make it cinematic", "Make it fast-paced") into a specific list of tool execution commands.
@@ -105,53 +112,145 @@ Note 2: If you do not manually set the duration of any image by default it is se
 """
 
 class VideoDirector:
-    def __init__(self):
+    def __init__(self, cache: PlanCache = None, mode: str = "images", client=None):
         load_dotenv()
-        self.client = genai.Client()
+        self.client = client or genai.Client()
         self.model = "gemini-2.5-pro"
-        
-    def generate_plan(self, user_prompt: str, clips_path: list[str]):
+        self.mode = mode # "images": one part per clip, "contact_sheet": numbered tiles
+        self.last_usage = None
+        self.last_timings = {}
+        self.cache = cache if cache is not None else PlanCache.from_env()
+        self.uploader = FileUploader(self.client) # Sweeps orphaned uploads after its first upload_all
+
+    def _cached_plan(self, user_prompt, clips_path, mode):
+        """(cache_key, cached plan or None)"""
+        if not self.cache:
+            return None, None
+        cache_key = plan_key(user_prompt, clips_path, self.model, f"{mode}\n{DIRECTOR_SYSTEM_PROMPT}")
+        cached = self.cache.get(cache_key)
+        if cached:
+            print(f"♻️ Reusing cached plan ({cache_key[:12]}). Skipping upload and planning.")
+            with open("plan.json", "w") as f:
+                json.dump(cached, f, indent=4)
+        return cache_key, cached
+
+    def _build_contents(self, user_prompt, clips_path, mode):
         num_clips = len(clips_path)
         system_instruction = DIRECTOR_SYSTEM_PROMPT.format(num_clips=num_clips)
-        
         full_prompt = f"""
         {system_instruction}
         
         USER REQUEST: "{user_prompt}"
         """
 
-        files = []
-        for i, path in enumerate(clips_path):
-            files.append(self.client.files.upload(file=path, config={
-                "display_name": f"image{i}"
-            }))
-
         contents = [full_prompt]
+        if mode == "contact_sheet":
+            sheets = self.uploader.upload_all(build_contact_sheets(clips_path))
+            contents.append(
+                f"Here is the visual context for the {num_clips} video clips as contact sheet(s). "
+                "Each tile is labeled with its number: tile k is image k."
+            )
+            contents.extend(sheets)
+            return contents, len(sheets)
+
+        files = self.uploader.upload_all(preprocess_images(clips_path))
         contents.append("Here is the visual context for the video clips, in order:")
 
         for i, file_obj in enumerate(files):
             contents.append(f"\n--- IMAGE {i+1} ---")
             contents.append(file_obj)
+        return contents, len(files)
+
+    def _store(self, cache_key, plan_data):
+        with open("plan.json", "w") as f:
+            json.dump(plan_data, f, indent=4)
+        if cache_key:
+            self.cache.put(cache_key, plan_data)
+        
+    def generate_plan(self, user_prompt: str, clips_path: list[str], mode: str = None):
+        mode = mode or self.mode
+        cache_key, cached = self._cached_plan(user_prompt, clips_path, mode)
+        if cached:
+            return cached
+
+        started = time.perf_counter()
+        contents, uploads = self._build_contents(user_prompt, clips_path, mode)
+        uploaded = time.perf_counter()
         
         print(f"🎬 Director thinking about: '{user_prompt}'...")
-        response = self.client.models.generate_content(model=self.model, 
-                                                       contents=contents
-                                                       )
+        with timed("llm_step", source="director", model=self.model):
+            response = self.client.models.generate_content(model=self.model, 
+                                                           contents=contents
+                                                           )
 
+        self.last_usage = response.usage_metadata
+        self.last_timings = {"upload": uploaded - started, "generate": time.perf_counter() - uploaded, "uploads": uploads}
         print(response.usage_metadata)
         
         try:
             clean_text = response.text.replace("```json", "").replace("```", "").strip()
             plan_data = json.loads(clean_text)
-            with open("plan.json", "w") as f:
-                json.dump(plan_data, f, indent=4)
+            self._store(cache_key, plan_data)
             return plan_data
         except Exception as e:
             print(f"Error parsing Director plan: {e}")
             return None
 
+    def generate_plan_stream(self, user_prompt: str, clips_path: list[str], on_step, mode: str = None):
+        """
+        Like generate_plan, but calls on_step(step) for every plan step the
+        moment the model finishes writing it, so execution can start before
+        the reply is complete. Returns the full plan dict at the end.
+        """
+        mode = mode or self.mode
+        cache_key, cached = self._cached_plan(user_prompt, clips_path, mode)
+        if cached:
+            for step in cached.get("plan", []):
+                on_step(step)
+            return cached
+
+        started = time.perf_counter()
+        contents, uploads = self._build_contents(user_prompt, clips_path, mode)
+        uploaded = time.perf_counter()
+
+        print(f"🎬 Director streaming plan for: '{user_prompt}'...")
+        parser = PlanStreamParser()
+        first_step = None
+        with timed("llm_step", source="director", model=self.model):
+            for chunk in self.client.models.generate_content_stream(model=self.model, contents=contents):
+                if getattr(chunk, "usage_metadata", None):
+                    self.last_usage = chunk.usage_metadata
+                for step in parser.feed(chunk.text):
+                    if first_step is None:
+                        first_step = time.perf_counter() - uploaded
+                    on_step(step)
+
+        self.last_timings = {
+            "upload": uploaded - started,
+            "generate": time.perf_counter() - uploaded,
+            "first_step": first_step,
+            "uploads": uploads,
+        }
+        print(self.last_usage)
+
+        plan_data = parser.result()
+        if len(plan_data.get("plan", [])) != len(parser.steps):
+            # Whatever the final parse says, the executor already has the streamed steps
+            plan_data["plan"] = list(parser.steps)
+        if parser.done:
+            self._store(cache_key, plan_data)
+        else:
+            print("Error parsing Director plan: stream ended before the plan array was closed")
+        return plan_data
+
 if __name__ == "__main__":
-    director = VideoDirector()
-    files = os.listdir("images")
-    paths = [os.path.join("images", file) for file in files]
-    print(director.generate_plan("Somehow make an intresting looking edit from these images", paths))
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate plan.json for the images in ./images.")
+    parser.add_argument("--profile", nargs="?", const="profiles", help="profile the Planning phase into this folder")
+    args = parser.parse_args()
+
+    with profile(args.profile), phase("Planning"):
+        director = VideoDirector()
+        paths = list_sync_images("images")
+        print(director.generate_plan("Somehow make an intresting looking edit from these images", paths))
\ No newline at end of file
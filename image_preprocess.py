@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from plan_cache import file_sha256
+
+LONG_EDGE = 1024 # Plenty for the Director to judge mood / content
+QUALITY = 80
+FORMATS = {"JPEG": ".jpg", "WEBP": ".webp"}
+POOL_MIN_JOBS = 3 # Fewer images than this are converted inline
+UPLOAD_KEEP_S = 3600 # Upload copies not used for this long are pruned
+UPLOAD_NAME = re.compile(r"^[0-9a-f]{24}\.(jpg|webp)(\.tmp)?$")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _map(fn, jobs, max_workers=None):
+    """
+    fn over jobs in order, on a thread pool shared by every caller (PIL
+    releases the GIL while decoding / resizing / encoding, and threads skip
+    the re-import a spawned process pays). Small batches run inline.
+    """
+    global _pool
+    if len(jobs) < POOL_MIN_JOBS:
+        return [fn(job) for job in jobs]
+    if max_workers is not None:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(fn, jobs))
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="image")
+    return list(_pool.map(fn, jobs))
+
+
+def _shrink(job):
+    """Worker: (src, out_dir, long_edge, fmt, quality) -> (dest, bytes_in, bytes_out)"""
+    src, out_dir, long_edge, fmt, quality = job
+    settings = f"{long_edge}-{fmt}-{quality}"
+    digest = hashlib.sha256(f"{file_sha256(src)}:{settings}".encode()).hexdigest()[:24]
+    dest = os.path.join(out_dir, digest + FORMATS[fmt])
+    bytes_in = os.path.getsize(src)
+
+    if os.path.exists(dest):
+        os.utime(dest) # Still in use: keep it out of _prune_uploads
+    else:
+        with Image.open(src) as img:
+            img = ImageOps.exif_transpose(img) # Bake orientation in before EXIF is dropped
+            img = img.convert("RGB")
+            img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+            # Re-encoding from pixels only: no exif / icc / text chunks are carried over
+            tmp = dest + ".tmp"
+            img.save(tmp, fmt, quality=quality, optimize=True)
+            os.replace(tmp, dest)
+
+    return dest, bytes_in, os.path.getsize(dest)
+
+
+def preprocess_images(paths, out_dir=".director_uploads", long_edge=LONG_EDGE, fmt="JPEG", quality=QUALITY, max_workers=None):
+    """
+    Downsized, metadata-free copies of `paths` for upload (originals are left
+    alone for the device). Returns the new paths in the same order; outputs
+    are named by content + settings so reruns are free.
+    """
+    fmt = fmt.upper()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt}, expected one of {list(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    jobs = [(p, out_dir, long_edge, fmt, quality) for p in paths]
+    results = _map(_shrink, jobs, max_workers)
+    _prune_uploads(out_dir, {os.path.basename(r[0]) for r in results})
+
+    bytes_in = sum(r[1] for r in results)
+    bytes_out = sum(r[2] for r in results)
+    saved = 100.0 * (1 - bytes_out / bytes_in) if bytes_in else 0.0
+    print(
+        f"🗜️ Preprocessed {len(paths)} images: {bytes_in / 1e6:.1f} MB -> {bytes_out / 1e6:.1f} MB "
+        f"({saved:.0f}% saved) in {time.perf_counter() - started:.1f}s"
+    )
+    return [r[0] for r in results]
+
+
+def _prune_uploads(out_dir, keep):
+    """Deletes upload copies (not contact sheets) that this run didn't use and no run touched lately."""
+    cutoff = time.time() - UPLOAD_KEEP_S
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if name in keep or not UPLOAD_NAME.match(name):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass # Another run got there first
+
+
+SOURCES_MANIFEST = ".sources.json"
+
+
+def _export_png(job):
+    """Worker: (src, dest, previous source hash) -> (dest, source hash, converted?, error)"""
+    src, dest, previous = job
+    try:
+        digest = file_sha256(src)
+        if digest == previous and os.path.exists(dest):
+            return dest, digest, False, None
+        with Image.open(src) as img:
+            tmp = dest + ".tmp"
+            img.save(tmp, "PNG")
+            os.replace(tmp, dest)
+        return dest, digest, True, None
+    except Exception as e:
+        if os.path.exists(dest):
+            os.remove(dest) # Don't leave the previous image in this slot
+        return dest, None, False, str(e)
+
+
+def export_pngs(paths, out_dir, max_workers=None):
+    """
+    Writes paths[i] to out_dir/image{i+1}.png (selection order) on the
+    shared pool. A manifest of source hashes lets unchanged slots be
+    skipped; slots beyond len(paths) are removed. Raises RuntimeError when
+    any image failed, since a missing slot would sync a short album.
+    """
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, SOURCES_MANIFEST)
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = {}
+
+    names = [f"image{i+1}.png" for i in range(len(paths))]
+    jobs = [(src, os.path.join(out_dir, name), manifest.get(name)) for src, name in zip(paths, names)]
+    results = _map(_export_png, jobs, max_workers)
+
+    for name in os.listdir(out_dir):
+        if name.startswith("image") and name.endswith(".png") and name not in names:
+            os.remove(os.path.join(out_dir, name))
+
+    manifest = {}
+    failures = []
+    for src, name, (dest, digest, _, error) in zip(paths, names, results):
+        if error:
+            failures.append(f"{os.path.basename(src)}: {error}")
+        else:
+            manifest[name] = digest
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(paths)} image(s) could not be converted ({'; '.join(failures)})")
+
+    converted = sum(1 for r in results if r[2])
+    reused = sum(1 for r in results if r[1] and not r[2])
+    print(f"🖼️ Local images: {converted} converted, {reused} reused in {time.perf_counter() - started:.1f}s")
+    return [r[0] for r in results]
+
+
+def list_sync_images(out_dir):
+    """image1.png, image2.png, ... in clip order (skips the manifest and strays)."""
+    names = [n for n in os.listdir(out_dir) if n.startswith("image") and n.endswith(".png") and n[5:-4].isdigit()]
+    return [os.path.join(out_dir, n) for n in sorted(names, key=lambda n: int(n[5:-4]))]
@@ -2,16 +2,22 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import subprocess
 import os
-import shutil
 import threading
 import time
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 from director import VideoDirector
-from agents_functions import select_images, edit_image
+from image_preprocess import export_pngs, list_sync_images
+from agents_functions import select_images
+from plan_executor import execute_plan, execute_plan_stream
+from plan_optimizer import optimize_plan
+from profiling import bind, phase, profile
+from tools.adb_transport import AdbTransportError, get_transport
+from tools.device_sync import DeviceSync
 import asyncio
 
 REMOTE_ALBUM_PATH = "/sdcard/Pictures/droidrun"
 LOCAL_SYNC_DIR = "images"
+STREAM_PLAN = os.environ.get("DIRECTOR_STREAM", "0") == "1" # Start editing while the plan is still being written
 
 def format_plan_to_text(plan_json):
     """Converts the Director's JSON into a readable script for the GUI."""
@@ -26,29 +32,38 @@ def format_plan_to_text(plan_json):
     
     steps = plan_json.get("plan", [])
     for i, step in enumerate(steps, 1):
-        tool = step.get("tool")
-        args = step.get("args", {})
-        
-        if tool == "change_duration":
-            line = f"{i}. Set Clip {args.get('image_idx')} duration to {args.get('duration')}s"
-        elif tool == "apply_effect":
-            effects = ", ".join(args.get('effects_list', []))
-            line = f"{i}. Add '{effects}' to Clip {args.get('image_idx')}"
-        elif tool == "add_transition":
-            t_type = args.get("transition_type")
-            all_apply = " (All Clips)" if args.get("all_apply") else ""
-            line = f"{i}. Apply '{t_type}' transition{all_apply}"
-        elif tool == "add_background_music":
-             line = f"{i}. Add Music: {args.get('filename')}"
-        else:
-            line = f"{i}. {tool}: {args}"
-            
-        output.append(line)
+        output.append(format_step(i, step))
         
     return "\n".join(output)
 
+def format_step(i, step):
+    """One readable line per plan step."""
+    tool = step.get("tool")
+    args = step.get("args", {})
+    
+    if tool == "change_duration":
+        return f"{i}. Set Clip {args.get('image_idx')} duration to {args.get('duration')}s"
+    elif tool == "apply_effect":
+        effects = ", ".join(args.get('effects_list', []))
+        return f"{i}. Add '{effects}' to Clip {args.get('image_idx')}"
+    elif tool == "add_transition":
+        t_type = args.get("transition_type")
+        all_apply = " (All Clips)" if args.get("all_apply") else ""
+        return f"{i}. Apply '{t_type}' transition{all_apply}"
+    elif tool == "add_background_music":
+        return f"{i}. Add Music: {args.get('filename')}"
+    return f"{i}. {tool}: {args}"
+
 def run_adb_command(cmd_list):
     """Run system ADB commands safely."""
+    if cmd_list and cmd_list[0] == "shell":
+        # Device-side commands reuse the persistent shell session
+        try:
+            exit_code, output = get_transport().run_args(cmd_list[1:])
+            return exit_code == 0, output.strip()
+        except AdbTransportError as e:
+            return False, str(e)
+
     try:
         full_cmd = ["adb"] + cmd_list
         startupinfo = None
@@ -78,48 +93,23 @@ def check_device_connection():
     return True, f"Connected: {devices[0].split()[0]}"
 
 def process_files(local_files, status_callback):
-    total = len(local_files)
+    # Local PNGs are CPU-bound and the push is I/O-bound: run them side by side
+    with ThreadPoolExecutor(max_workers=1) as background:
+        conversion = background.submit(export_pngs, list(local_files), LOCAL_SYNC_DIR)
 
-    status_callback("Cleaning phone gallery...", 0)
-    run_adb_command(["shell", "rm", "-rf", REMOTE_ALBUM_PATH])
-    run_adb_command(["shell", "mkdir", "-p", REMOTE_ALBUM_PATH])
-
-    status_callback("Preparing local sync folder...", 10)
-    if os.path.exists(LOCAL_SYNC_DIR):
-        shutil.rmtree(LOCAL_SYNC_DIR)
-    os.makedirs(LOCAL_SYNC_DIR)
-
-    num_files = len(local_files)
-
-    for i, file_path in enumerate(local_files):
-        filename = os.path.basename(file_path)
-        remote_path = os.path.join(REMOTE_ALBUM_PATH, filename).replace("\\", "/")
-        
-        progress = 10 + int((i / total) * 80)
-        status_callback(f"Processing ({i+1}/{total}): {filename}...", progress)
-        
-        success, err = run_adb_command(["push", file_path, remote_path])
-
-        timestamp = f"20250101.1200{i:02d}" 
-        run_adb_command(["shell", "touch", "-t", timestamp, remote_path])
-        if not success:
-            status_callback(f"Upload Failed: {err}", 0, is_error=True)
+        try:
+            DeviceSync(REMOTE_ALBUM_PATH).sync(local_files, lambda msg, progress: status_callback(msg, progress))
+        except Exception as e:
+            # Runs on a worker thread: anything uncaught here would leave the GUI waiting forever
+            status_callback(f"Upload Failed: {e}", 0, is_error=True)
             return
 
+        status_callback("Finishing local images...", 90)
         try:
-            dest_name = f"image{i+1}.png"
-            dest_path = os.path.join(LOCAL_SYNC_DIR, dest_name)
-            
-            with Image.open(file_path) as img:
-                img.save(dest_path, "PNG")
+            conversion.result()
         except Exception as e:
-            print(f"Warning: Local conversion failed: {e}")
-
-        run_adb_command([
-            "shell", "am", "broadcast", 
-            "-a", "android.intent.action.MEDIA_SCANNER_SCAN_FILE", 
-            "-d", f"file://{remote_path}"
-        ])
+            status_callback(f"Local image conversion failed: {e}", 90, is_error=True)
+            return
 
     status_callback("✅ Ready! Files synced to phone & local folder.", 100, is_success=True)
 
@@ -230,6 +220,9 @@ class DirectorApp:
              self.is_upload_complete = True
              self.btn_run.state(['!disabled'])
              messagebox.showinfo("Ready", "Files synced.")
+        elif is_error:
+             self.btn_upload.state(['!disabled']) # Let the user retry
+             messagebox.showerror("Upload failed", msg)
 
     def start_agent_thread(self):
         prompt = self.txt_prompt.get("1.0", tk.END).strip()
@@ -261,6 +254,15 @@ class DirectorApp:
             self.txt_plan.delete("1.0", tk.END)
             self.txt_plan.insert("1.0", formatted_text)
             
+        elif action == "plan_step":
+            # Streaming mode: steps show up as the Director writes them
+            i, step = data
+            if i == 1:
+                self.txt_plan.delete("1.0", tk.END)
+                self.txt_plan.insert("1.0", "EXECUTION STEPS (streaming):")
+            self.txt_plan.insert(tk.END, f"\n{format_step(i, step)}")
+            self.txt_plan.see(tk.END)
+            
         elif action == "log":
             # Append log message
             self.txt_plan.insert(tk.END, f"\n> {data}")
@@ -271,37 +273,115 @@ class DirectorApp:
             messagebox.showinfo("Done", data)
 
 
-def run_agent_workflow(user_prompt, ui_callback):
+def run_agent_workflow(user_prompt, ui_callback, profile_dir=None):
     """
     Runs the full pipeline and updates the GUI at each step.
     ui_callback(action, data)
+    profile_dir (or $DROIDRUN_PROFILE) profiles Planning / Setup / Editing into that folder.
     """
     try:
         ui_callback("stage", 0) # Highlight "Planning"
         ui_callback("log", f" Agent started. Analyzing prompt: '{user_prompt}'...")
         
-        director = VideoDirector()
-        files = os.listdir("images")
-        paths = [os.path.join("images", file) for file in files]
-        plan = director.generate_plan(user_prompt, paths)
-        print(plan)
-
-        ui_callback("plan", plan) 
-        
-        ui_callback("stage", 1) # Highlight "Setup"
-        ui_callback("log", " Opening InShot and importing media...")
-        
-        asyncio.run(select_images())
-
-        ui_callback("stage", 2) # Highlight "Setup"
-        ui_callback("log", "Editing")
-
-        asyncio.run(edit_image(len(files), plan["plan"]))
+        with profile(profile_dir, log=lambda msg: ui_callback("log", msg)):
+            with phase("Planning"):
+                director = VideoDirector()
+            paths = list_sync_images(LOCAL_SYNC_DIR)
+            workflow = streaming_workflow if STREAM_PLAN else planned_workflow
+            asyncio.run(workflow(director, user_prompt, paths, ui_callback))
         
     except Exception as e:
         print(f"Agent Error: {e}")
         ui_callback("log", f" ERROR: {e}")
 
+async def run_concurrently(*coros):
+    """
+    Runs coroutines as one TaskGroup: if any fails the others are cancelled
+    and the first error is raised as-is (not wrapped in an ExceptionGroup).
+    Work running in a thread (the Director call) can't be interrupted; its
+    result is simply dropped.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(c) for c in coros]
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    return [t.result() for t in tasks]
+
+async def import_media(ui_callback):
+    ui_callback("stage", 1) # Highlight "Setup"
+    ui_callback("log", " Opening InShot and importing media...")
+    with phase("Setup"):
+        imported = await select_images(REMOTE_ALBUM_PATH)
+    if not imported:
+        # Raising cancels planning too (run_concurrently) and lands in the GUI's error log
+        raise RuntimeError("Media import failed: InShot editor is not open with the album")
+    ui_callback("log", "Media imported")
+
+async def planned_workflow(director, user_prompt, paths, ui_callback):
+    """
+    Planning (cloud) and the media import (device) don't depend on each
+    other, so both run at once and join before editing starts.
+    """
+    async def plan():
+        with phase("Planning"):
+            plan = await asyncio.to_thread(bind(director.generate_plan), user_prompt, paths)
+            if not plan or not plan.get("plan"):
+                raise RuntimeError("Director returned no usable plan")
+            print(plan)
+
+            plan["plan"], savings = optimize_plan(plan["plan"], len(paths))
+        ui_callback("plan", plan) 
+        ui_callback("log", f"Optimized plan: {savings['steps_before']} -> {savings['steps_after']} steps, "
+                           f"~{savings['estimated_cost_saved']}s of seeking saved")
+        return plan
+
+    plan, _ = await run_concurrently(plan(), import_media(ui_callback))
+
+    ui_callback("stage", 2) # Highlight "Editing"
+    ui_callback("log", "Editing")
+
+    with phase("Editing"):
+        report = await execute_plan(len(paths), plan["plan"], log=lambda msg: ui_callback("log", msg))
+    ui_callback("log", f"Finished in {report.seconds:.1f}s ({len(report.failed)} step(s) failed)")
+
+async def streaming_workflow(director, user_prompt, paths, ui_callback):
+    """
+    Streaming variant: InShot is set up while the Director streams, then
+    steps run as soon as each one is complete. The optimizer is skipped
+    here since it needs the whole plan up front.
+    """
+    loop = asyncio.get_running_loop()
+    step_queue = asyncio.Queue()
+    streamed = 0
+
+    def on_step(step):
+        nonlocal streamed
+        streamed += 1
+        ui_callback("plan_step", (streamed, step))
+        loop.call_soon_threadsafe(step_queue.put_nowait, step)
+
+    def plan():
+        try:
+            with phase("Planning"):
+                return director.generate_plan_stream(user_prompt, paths, on_step)
+        finally:
+            loop.call_soon_threadsafe(step_queue.put_nowait, None)
+
+    async def edit():
+        await import_media(ui_callback)
+        ui_callback("stage", 2)
+        ui_callback("log", "Editing (plan still streaming)")
+        with phase("Editing"):
+            return await execute_plan_stream(len(paths), step_queue, log=lambda msg: ui_callback("log", msg))
+
+    _, report = await run_concurrently(asyncio.to_thread(plan), edit())
+
+    first_step = director.last_timings.get("first_step")
+    if first_step is not None:
+        ui_callback("log", f"First step arrived after {first_step:.1f}s of generation")
+    ui_callback("log", f"Finished in {report.seconds:.1f}s ({len(report.failed)} step(s) failed)")
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = DirectorApp(root)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import time
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.split()).casefold()
+
+
+def plan_key(prompt, clip_paths, model, template=""):
+    """
+    Content address of a planning request: same prompt (modulo whitespace and
+    case), same image bytes in the same order, same model and system prompt.
+    """
+    payload = {
+        "prompt": normalize_prompt(prompt),
+        "images": [file_sha256(p) for p in clip_paths],
+        "model": model,
+        "template": hashlib.sha256(template.encode()).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class DiskPlanBackend:
+    """One JSON file per plan; file mtime doubles as last-used time."""
+
+    def __init__(self, directory=".plan_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r") as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        os.utime(self._path(key)) # Mark as recently used
+        return record
+
+    def set(self, key, record):
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def entries(self):
+        """[(key, created, last_used)]"""
+        out = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r") as f:
+                    created = json.load(f).get("created", 0)
+                out.append((name[:-5], created, os.path.getmtime(path)))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return out
+
+
+class RedisPlanBackend:
+    """
+    Stores plans through RedisState (so it also works on its local-memory
+    fallback). The index is a hash of key -> [created, last_used], so every
+    update is a single HSET / HDEL instead of rewriting the whole index.
+    """
+
+    INDEX_KEY = "plan_cache_entries"
+
+    def __init__(self, state=None):
+        if state is None:
+            from redis_state import RedisState
+            state = RedisState(session_id="plan_cache")
+        self.state = state
+
+    def get(self, key):
+        record = self.state.get(f"plan:{key}")
+        if not isinstance(record, dict):
+            return None
+        self.state.set_field(self.INDEX_KEY, key, [record.get("created", time.time()), time.time()])
+        return record
+
+    def set(self, key, record):
+        self.state.set(f"plan:{key}", record)
+        self.state.set_field(self.INDEX_KEY, key, [record.get("created", time.time()), time.time()])
+
+    def delete(self, key):
+        # Index first: an entry without a plan is a miss, a plan without an entry would never be evicted
+        self.state.delete_field(self.INDEX_KEY, key)
+        self.state.delete(f"plan:{key}")
+
+    def entries(self):
+        return [
+            (key, value[0], value[1])
+            for key, value in self.state.get_fields(self.INDEX_KEY).items()
+            if isinstance(value, list) and len(value) == 2
+        ]
+
+
+class PlanCache:
+    """
+    Director plans keyed by plan_key(). Entries older than max_age_s are
+    dropped on read; beyond max_entries the least recently used go first.
+    """
+
+    def __init__(self, backend=None, max_entries=200, max_age_s=7 * 24 * 3600):
+        self.backend = backend or DiskPlanBackend()
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+
+    @classmethod
+    def from_env(cls):
+        """PLAN_CACHE=disk (default) | redis | off"""
+        kind = os.environ.get("PLAN_CACHE", "disk").lower()
+        if kind == "off":
+            return None
+        if kind == "redis":
+            return cls(RedisPlanBackend())
+        return cls(DiskPlanBackend(os.environ.get("PLAN_CACHE_DIR", ".plan_cache")))
+
+    def get(self, key):
+        record = self.backend.get(key)
+        if not record:
+            return None
+        if time.time() - record.get("created", 0) > self.max_age_s:
+            self.backend.delete(key)
+            return None
+        return record.get("plan")
+
+    def put(self, key, plan):
+        self.backend.set(key, {"created": time.time(), "plan": plan})
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = self.backend.entries()
+        alive = []
+        for key, created, used in entries:
+            if now - created > self.max_age_s:
+                self.backend.delete(key)
+            else:
+                alive.append((used, key))
+        alive.sort()
+        for _, key in alive[:max(0, len(alive) - self.max_entries)]:
+            self.backend.delete(key)
@@ -0,0 +1,259 @@
+import asyncio
+import inspect
+import json
+import time
+from dataclasses import dataclass, field, asdict
+
+from tools.inshot_tools import InshotTools
+from tools.metrics import export_from_env
+from tools.session_recorder import recording_from_env
+from tools.state_cache import CachedTools, new_tools
+from tools.ui_snapshot import UiSnapshot
+
+# Plan tool name -> InshotTools entry point. Same functions the agent gets.
+STEP_TOOLS = {
+    "calibrate": InshotTools.calibrate,
+    "seek_timeline": InshotTools.seek_timeline,
+    "change_duration": InshotTools.change_duration,
+    "apply_effect": InshotTools.apply_effect,
+    "add_transition": InshotTools.add_transition,
+}
+
+TOOLBAR_ID = "com.camerasideas.instashot:id/hs_video_toolbar"
+# Items only the selected-clip toolbar has; the main toolbar shows none of them
+CLIP_TOOLBAR_IDS = tuple(f"com.camerasideas.instashot:id/{name}" for name in (
+    "btn_precut", "btn_split", "btn_speed", "btn_volume", "btn_animation",
+    "btn_duration", "btn_crop", "btn_delete", "btn_copy",
+))
+MAX_BACKS = 4 # Deepest stack: clip -> Duration panel -> duration dialog
+
+
+@dataclass
+class StepResult:
+    index: int
+    tool: str
+    args: dict
+    ok: bool
+    message: str
+    seconds: float
+    via_agent: bool = False
+    partial: bool = False # Failed after touching the timeline; some of it may have been applied
+    skipped: bool = False # Not run: an earlier step failed
+
+
+@dataclass
+class PlanReport:
+    steps: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failed(self):
+        return [s for s in self.steps if not s.ok]
+
+    @property
+    def partial(self):
+        return [s for s in self.steps if s.partial]
+
+    def summary(self):
+        lines = [f"{'#':>3} {'tool':<16} {'time':>7}  result"]
+        for s in self.steps:
+            mark = "✅" if s.ok else "⏭️" if s.skipped else "❌"
+            via = " (agent)" if s.via_agent else ""
+            partial = " (may be partially applied)" if s.partial else ""
+            lines.append(f"{s.index:>3} {s.tool:<16} {s.seconds:>6.1f}s  {mark}{via}{partial} {s.message}")
+        lines.append(
+            f"Total: {self.seconds:.1f}s, {len(self.failed)} failed "
+            f"({sum(s.skipped for s in self.failed)} not run, {len(self.partial)} possibly partial)"
+        )
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {"seconds": self.seconds, "steps": [asdict(s) for s in self.steps]}
+
+
+def _is_failure(result):
+    # Warnings are steps that only got partway (e.g. an effect that wasn't extended)
+    return isinstance(result, str) and result.lstrip().startswith(("❌", "⚠️"))
+
+
+def _at_editor_root(snapshot):
+    """Main toolbar showing: no clip selected, no panel or dialog open."""
+    return snapshot.find_by_id(TOOLBAR_ID) is not None and not any(snapshot.find_by_id(i) for i in CLIP_TOOLBAR_IDS)
+
+
+class PlanExecutor:
+    """
+    Runs Director plan steps straight against InshotTools, no LLM in the loop.
+    The first step that fails (error or warning string, or exception) stops
+    direct execution: the editor is backed out to its main toolbar, later
+    steps are recorded as not run and, if enabled, the failed step and
+    everything after it go to the DroidAgent in plan order. Later steps can
+    depend on the failed one, so they are never run ahead of it.
+    """
+
+    def __init__(self, tools=None, fallback_to_agent=True, log=print):
+        self.tools = tools
+        self.fallback_to_agent = fallback_to_agent
+        self.log = log
+
+    async def run_step(self, index, step):
+        tool = step.get("tool")
+        args = dict(step.get("args") or {})
+        fn = STEP_TOOLS.get(tool)
+        started = time.perf_counter()
+
+        if fn is None:
+            return StepResult(index, tool, args, False, f"❌ Error: Unknown tool '{tool}'", 0.0)
+
+        # Drop anything the LLM invented that the tool doesn't take
+        params = inspect.signature(fn).parameters
+        call_args = {k: v for k, v in args.items() if k in params}
+
+        try:
+            result = await fn(**call_args, tools=self.tools)
+            ok = not _is_failure(result)
+            message = str(result) if result is not None else "done"
+        except Exception as e:
+            ok, message = False, f"❌ Error: {type(e).__name__}: {e}"
+
+        # We can't tell how far a failed tool got before it gave up
+        partial = not ok and tool != "calibrate"
+        return StepResult(index, tool, args, ok, message, time.perf_counter() - started, partial=partial)
+
+    async def reset_editor(self):
+        """Backs out of whatever panel or dialog a failed step left open; True once at the main toolbar."""
+        tools = CachedTools.wrap(self.tools or new_tools())
+        for _ in range(MAX_BACKS + 1):
+            try:
+                if _at_editor_root(await UiSnapshot.capture(tools)):
+                    return True
+                await tools.back()
+                await InshotTools._settle(0.5)
+            except Exception as e:
+                self.log(f"⚠️ Could not reset the editor: {type(e).__name__}: {e}")
+                return False
+        return False
+
+    async def run(self, steps, num_images=None):
+        """
+        steps: the "plan" list from plan.json. Calibration is run first when
+        num_images is given and the plan doesn't calibrate on its own.
+        """
+        steps = list(steps)
+        if num_images is not None and not any(s.get("tool") == "calibrate" for s in steps):
+            steps.insert(0, {"tool": "calibrate", "args": {"num_images": num_images}})
+
+        async def source():
+            for step in steps:
+                yield step
+
+        return await self._run(source(), num_images)
+
+    async def run_stream(self, step_queue, num_images=None):
+        """
+        Same as run(), but steps arrive on an asyncio.Queue while the Director
+        is still writing the plan; None marks the end. Calibration starts
+        right away, before the first step has arrived.
+        """
+        async def source():
+            calibrated = False
+            if num_images is not None:
+                calibrated = True
+                yield {"tool": "calibrate", "args": {"num_images": num_images}}
+            while True:
+                step = await step_queue.get()
+                if step is None:
+                    return
+                if calibrated and step.get("tool") == "calibrate":
+                    continue
+                yield step
+
+        return await self._run(source(), num_images)
+
+    async def _run(self, steps, num_images):
+        report = PlanReport()
+        started = time.perf_counter()
+
+        stopped_at = None
+        async for step in steps:
+            index = len(report.steps)
+            if stopped_at is not None:
+                # Keep draining (a streamed plan is still arriving) so the hand-off gets the whole rest
+                report.steps.append(StepResult(
+                    index, step.get("tool"), dict(step.get("args") or {}), False,
+                    f"not run: step {stopped_at.index} failed", 0.0, skipped=True,
+                ))
+                continue
+
+            result = await self.run_step(index, step)
+            report.steps.append(result)
+            self.log(f"{'✅' if result.ok else '❌'} Step {result.index}: {result.tool} ({result.seconds:.1f}s) {result.message}")
+
+            if not result.ok:
+                stopped_at = result
+                if result.tool != "calibrate" and not await self.reset_editor():
+                    self.log("⚠️ Editor is not back at the main toolbar")
+
+        # Nothing can work without the timeline geometry, so a failed calibration isn't handed off
+        if stopped_at is not None and stopped_at.tool != "calibrate" and self.fallback_to_agent:
+            await self._agent_fallback(report.failed, num_images)
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+    async def _agent_fallback(self, failed, num_images):
+        # Imported here: the agent stack (phoenix, LLM clients) is only needed on failure
+        from agents_functions import edit_image
+
+        self.log(f"🤖 Handing step {failed[0].index} and the {len(failed) - 1} after it to the agent...")
+        started = time.perf_counter()
+        plan = []
+        for s in failed:
+            entry = {"tool": s.tool, "args": s.args}
+            if s.partial:
+                entry["note"] = "A previous attempt may have partially applied this step; check the timeline before redoing it."
+            plan.append(entry)
+        try:
+            result = await edit_image(num_images, plan, calibrate=False)
+            ok = bool(getattr(result, "success", False))
+            message = getattr(result, "reason", None) or ("agent completed" if ok else "agent failed")
+        except Exception as e:
+            ok, message = False, f"❌ Error: {type(e).__name__}: {e}"
+
+        seconds = time.perf_counter() - started
+        for s in failed:
+            s.ok, s.via_agent, s.message = ok, True, str(message)
+            s.seconds += seconds / len(failed)
+
+
+async def execute_plan(num_images, steps, log=print, fallback_to_agent=True):
+    """Direct execution of a Director plan on the connected device."""
+    with recording_from_env({"entry": "plan", "num_images": num_images, "steps": steps}):
+        tools = new_tools()
+        executor = PlanExecutor(tools, fallback_to_agent=fallback_to_agent, log=log)
+        report = await executor.run(steps, num_images=num_images)
+    print(report.summary())
+    export_from_env()
+    return report
+
+
+async def execute_plan_stream(num_images, step_queue, log=print, fallback_to_agent=True):
+    """execute_plan for a plan that is still streaming in (see PlanExecutor.run_stream)."""
+    with recording_from_env({"entry": "plan", "num_images": num_images}) as recording:
+        tools = new_tools()
+        executor = PlanExecutor(tools, fallback_to_agent=fallback_to_agent, log=log)
+        report = await executor.run_stream(step_queue, num_images=num_images)
+        if recording is not None:
+            # Replay runs the plan as it finally arrived
+            recording.meta["steps"] = [{"tool": s.tool, "args": s.args} for s in report.steps]
+    print(report.summary())
+    export_from_env()
+    return report
+
+
+if __name__ == "__main__":
+    with open("plan.json", "r") as f:
+        plan = json.load(f)
+    report = asyncio.run(execute_plan(4, plan["plan"]))
+    with open("plan_report.json", "w") as f:
+        json.dump(report.to_dict(), f, indent=4)
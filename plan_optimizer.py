@@ -0,0 +1,222 @@
+import json
+
+from tools.timeline_model import TimelineModel
+
+DEFAULT_TRANSITION_TIME = 1 # add_transition's default
+
+
+def _args(step):
+    return step.get("args") or {}
+
+
+def _transition_key(step):
+    args = _args(step)
+    return (str(args.get("transition_type", "")).lower(), float(args.get("transition_time", DEFAULT_TRANSITION_TIME)))
+
+
+def _touches(step):
+    """
+    What a step reads/writes on the timeline:
+    ('clip', i) for a clip, ('junction', j) for the cut after clip j, or 'all'.
+    """
+    tool, args = step.get("tool"), _args(step)
+    if tool == "change_duration":
+        return {("clip", args.get("image_idx"))}
+    if tool == "apply_effect":
+        i = args.get("image_idx")
+        # Effects are stretched over the clip as it is when applied, which
+        # depends on its duration and the transitions on both sides
+        return {("clip", i), ("junction", i - 1), ("junction", i)} if isinstance(i, int) else "all"
+    if tool == "add_transition":
+        if args.get("all_apply"):
+            return "all"
+        j = args.get("image1_idx")
+        return {("junction", j), ("clip", j), ("clip", j + 1)} if isinstance(j, int) else "all"
+    return "all"
+
+
+def _moves_clip(step, k):
+    """
+    Whether `step` moves or resizes clip k on the timeline: a duration or
+    transition change at or before it shifts everything after.
+    """
+    tool, args = step.get("tool"), _args(step)
+    if tool == "change_duration":
+        j = args.get("image_idx")
+    elif tool == "add_transition":
+        j = None if args.get("all_apply") else args.get("image1_idx")
+    else:
+        return False
+    return not isinstance(j, int) or j <= k
+
+
+def _conflicts(a, b):
+    ta, tb = _touches(a), _touches(b)
+    if ta == "all" or tb == "all":
+        return True
+    # An effect is an absolute span fixed when applied: whatever moves its
+    # clip has to stay on the same side of it
+    for effect, other in ((a, b), (b, a)):
+        k = _args(effect).get("image_idx")
+        if effect.get("tool") == "apply_effect" and isinstance(k, int) and _moves_clip(other, k):
+            return True
+    kinds = (a.get("tool"), b.get("tool"))
+    if kinds == ("change_duration", "change_duration") or kinds == ("apply_effect", "apply_effect"):
+        # Only the same clip matters (stack order / last write wins)
+        return bool({t for t in ta if t[0] == "clip"} & {t for t in tb if t[0] == "clip"})
+    if kinds == ("add_transition", "add_transition"):
+        return bool({t for t in ta if t[0] == "junction"} & {t for t in tb if t[0] == "junction"})
+    # Mixed kinds: any shared clip or junction orders them
+    return bool(ta & tb)
+
+
+def simulate(steps, num_clips):
+    """Final TimelineModel a plan produces (no device)."""
+    model = TimelineModel([TimelineModel.DEFAULT_DURATION] * num_clips)
+    for step in steps:
+        _apply(model, step)
+    return model
+
+
+def _apply(model, step):
+    tool, args = step.get("tool"), _args(step)
+    if tool == "change_duration" and model.valid(args.get("image_idx", 0)):
+        model.set_duration(args["image_idx"], args["duration"])
+    elif tool == "apply_effect" and model.valid(args.get("image_idx", 0)):
+        for name in args.get("effects_list", [])[:2]:
+            model.add_effect(args["image_idx"], name)
+    elif tool == "add_transition":
+        _, time = _transition_key(step)
+        if args.get("all_apply"):
+            model.set_all_transitions(time)
+        elif model.valid(args.get("image1_idx", 0)) and args.get("image2_idx") == args.get("image1_idx", 0) + 1:
+            model.set_transition(args["image1_idx"], time)
+
+
+def _position(model, step):
+    """Where the playhead has to go for this step, given the timeline so far."""
+    tool, args = step.get("tool"), _args(step)
+    if tool in ("change_duration", "apply_effect") and model.valid(args.get("image_idx", 0)):
+        return model.clip_midpoint(args["image_idx"])
+    if tool == "add_transition" and len(model) > 1:
+        j = 1 if args.get("all_apply") else args.get("image1_idx", 1)
+        return model.junction_time(max(1, min(len(model) - 1, j)))
+    return None
+
+
+def plan_cost(steps, num_clips):
+    """Seconds of timeline the playhead travels running `steps` in order from t=0."""
+    model = TimelineModel([TimelineModel.DEFAULT_DURATION] * num_clips)
+    playhead, seek = 0.0, 0.0
+    for step in steps:
+        target = _position(model, step)
+        if target is not None:
+            seek += abs(target - playhead)
+            playhead = target
+        _apply(model, step)
+    return seek
+
+
+class PlanOptimizer:
+    """
+    Rewrites a Director plan so the executor travels less:
+    1. Per-junction transitions that are identical on every cut become one all_apply.
+    2. Steps are reordered greedily (nearest playhead position) while
+       keeping every pair that touches the same clip or junction in its
+       original order. Panel grouping isn't worth anything: every tool
+       opens and closes its own toolbar panel.
+    The rewrite is only used if it simulates to the same final timeline.
+    """
+
+    def __init__(self, num_clips):
+        self.num_clips = num_clips
+
+    def fuse_transitions(self, steps):
+        idx = [i for i, s in enumerate(steps) if s.get("tool") == "add_transition"]
+        if self.num_clips < 3 or not idx or any(_args(steps[i]).get("all_apply") for i in idx):
+            return steps, 0
+
+        keys = {_transition_key(steps[i]) for i in idx}
+        junctions = {_args(steps[i]).get("image1_idx") for i in idx}
+        if len(keys) != 1 or junctions != set(range(1, self.num_clips)):
+            return steps, 0
+
+        # Something else between the transitions could see a different timeline
+        if any(steps[i].get("tool") != "add_transition" for i in range(idx[0], idx[-1] + 1)):
+            return steps, 0
+
+        transition_type, transition_time = keys.pop()
+        fused = {"tool": "add_transition", "args": {
+            "image1_idx": 1, "image2_idx": 2, "transition_type": _args(steps[idx[0]]).get("transition_type"),
+            "all_apply": True,
+        }}
+        if transition_time != DEFAULT_TRANSITION_TIME:
+            fused["args"]["transition_time"] = transition_time
+        return steps[:idx[0]] + [fused] + steps[idx[-1] + 1:], len(idx)
+
+    def reorder(self, steps):
+        n = len(steps)
+        preds = [set() for _ in range(n)]
+        for b in range(n):
+            for a in range(b):
+                if _conflicts(steps[a], steps[b]):
+                    preds[b].add(a)
+
+        model = TimelineModel([TimelineModel.DEFAULT_DURATION] * self.num_clips)
+        done, order = set(), []
+        playhead = 0.0
+        while len(order) < n:
+            ready = [i for i in range(n) if i not in done and preds[i] <= done]
+
+            def cost(i):
+                target = _position(model, steps[i])
+                return (abs(target - playhead) if target is not None else 0.0, i)
+
+            best = min(ready, key=cost)
+            target = _position(model, steps[best])
+            if target is not None:
+                playhead = target
+            _apply(model, steps[best])
+            done.add(best)
+            order.append(best)
+        return [steps[i] for i in order]
+
+    def optimize(self, steps):
+        """Returns (optimized_steps, report)."""
+        steps = list(steps)
+        fused, n_fused = self.fuse_transitions(steps)
+        optimized = self.reorder(fused)
+
+        equivalent = simulate(steps, self.num_clips).equivalent(simulate(optimized, self.num_clips))
+        if not equivalent:
+            optimized, n_fused = steps, 0
+
+        seek_before = plan_cost(steps, self.num_clips)
+        seek_after = plan_cost(optimized, self.num_clips)
+        report = {
+            "steps_before": len(steps),
+            "steps_after": len(optimized),
+            "fused_transitions": n_fused,
+            "seek_seconds_before": round(seek_before, 2),
+            "seek_seconds_after": round(seek_after, 2),
+            "estimated_cost_saved": round(seek_before - seek_after, 2),
+            "equivalent": equivalent,
+        }
+        return optimized, report
+
+
+def optimize_plan(steps, num_clips):
+    optimized, report = PlanOptimizer(num_clips).optimize(steps)
+    print(
+        f"🧭 Plan optimizer: {report['steps_before']} -> {report['steps_after']} steps, "
+        f"seek {report['seek_seconds_before']}s -> {report['seek_seconds_after']}s"
+    )
+    return optimized, report
+
+
+if __name__ == "__main__":
+    with open("plan.json", "r") as f:
+        plan = json.load(f)
+    optimized, report = optimize_plan(plan["plan"], 4)
+    print(json.dumps(report, indent=4))
+    print(json.dumps(optimized, indent=4))
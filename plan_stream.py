@@ -0,0 +1,123 @@
+import json
+import re
+
+PLAN_ARRAY = re.compile(r'(?<!\\)"plan"\s*:\s*\[')
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for the Director's reply. Feed it text chunks as they
+    stream in; every step object inside the top-level "plan" array is
+    returned as soon as its closing brace arrives. Code fences and the
+    other keys (thought_process, ...) are simply carried along in the buffer.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None # Scan position once the "plan" array has been found
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.step_start = None
+        self.done = False
+        self.steps = []
+
+    def feed(self, text):
+        """Returns the steps completed by this chunk."""
+        self.buffer += text or ""
+        if self.done:
+            return []
+        if self.pos is None:
+            match = PLAN_ARRAY.search(self.buffer)
+            if not match:
+                return []
+            self.pos = match.end()
+
+        emitted = []
+        buf = self.buffer
+        while self.pos < len(buf):
+            ch = buf[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0 and ch == "{":
+                    self.step_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    # End of the plan array
+                    self.done = True
+                    self.pos += 1
+                    break
+                self.depth -= 1
+                if self.depth == 0 and ch == "}":
+                    step = json.loads(buf[self.step_start:self.pos + 1])
+                    self.steps.append(step)
+                    emitted.append(step)
+            self.pos += 1
+        return emitted
+
+    def result(self):
+        """The whole reply as a dict, or just the streamed steps if it doesn't parse."""
+        clean_text = self.buffer.replace("```json", "").replace("```", "").strip()
+        try:
+            return json.loads(clean_text)
+        except json.JSONDecodeError:
+            return {"thought_process": "", "plan": list(self.steps)}
+
+
+class StubStreamingClient:
+    """
+    Stands in for genai.Client in streaming tests: replays `reply` in small
+    chunks with an optional delay between them. Only the pieces
+    VideoDirector touches are implemented.
+    """
+
+    class _Chunk:
+        def __init__(self, text):
+            self.text = text
+            self.usage_metadata = None
+
+    class _Models:
+        def __init__(self, reply, chunk_size, delay):
+            self.reply, self.chunk_size, self.delay = reply, chunk_size, delay
+
+        def generate_content_stream(self, model, contents):
+            import time
+            for i in range(0, len(self.reply), self.chunk_size):
+                if self.delay:
+                    time.sleep(self.delay)
+                yield StubStreamingClient._Chunk(self.reply[i:i + self.chunk_size])
+
+    class _Files:
+        def upload(self, file, config=None):
+            raise RuntimeError("StubStreamingClient does not upload")
+
+        def list(self):
+            return []
+
+    def __init__(self, reply, chunk_size=40, delay=0.0):
+        self.models = self._Models(reply, chunk_size, delay)
+        self.files = self._Files()
+
+
+if __name__ == "__main__":
+    import time
+
+    with open("plan.json", "r") as f:
+        reply = "```json\n" + json.dumps(json.load(f), indent=4) + "\n```"
+
+    client = StubStreamingClient(reply, chunk_size=25, delay=0.01)
+    parser = PlanStreamParser()
+    started = time.perf_counter()
+    for chunk in client.models.generate_content_stream(model="stub", contents=[]):
+        for step in parser.feed(chunk.text):
+            print(f"{time.perf_counter() - started:5.2f}s  {step['tool']} {step.get('args')}")
+    print(f"{time.perf_counter() - started:5.2f}s  done, {len(parser.result()['plan'])} steps")
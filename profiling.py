@@ -0,0 +1,335 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_ENV = "DROIDRUN_PROFILE"
+INTERVAL = 0.005 # Seconds between stack samples
+TOP = 15
+IDLE_FRAME = "(event loop idle: waiting on device / network)"
+# Frames every thread / task has; left out of the cumulative top list
+PLUMBING = ("threading.py", "thread.py", "base_events.py", "runners.py", "events.py", "profiling.py")
+
+# Phase of the running task / thread. Copied into asyncio.to_thread workers.
+_phase = contextvars.ContextVar("profile_phase", default=None)
+_profiler = None
+
+
+class _PhaseStats:
+    def __init__(self, name):
+        self.name = name
+        self.active = 0
+        self.started = None
+        self.seconds = 0.0
+        self.wall = Counter() # folded stack -> seconds
+        self.cpu = Counter()
+        self.samples = 0
+        self.memory_start = 0
+        self.memory_peak = 0
+        self.snapshots = [] # tracemalloc (start, end) pairs, diffed in write()
+        self.snapshot = None
+
+
+class Profiler:
+    """
+    Sampling profiler that splits one run into named phases (Planning,
+    Setup, Editing), even while they overlap on one event loop.
+
+    Every INTERVAL a background thread walks every other thread's stack.
+    On an event loop thread the sample goes to the phase of the task running
+    at that moment; while the loop is idle it counts as waiting for every
+    active phase. Other threads go to the phase() they are in (see bind()
+    for pool workers), or to the only active phase if just one is. Samples
+    are weighted by wall time and by the thread's CPU time since its last
+    sample. Child processes (the image conversion pool) are not sampled.
+    """
+
+    def __init__(self, out_dir, interval=INTERVAL, memory=True):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.memory = memory
+        self.phases = {}
+        self._loops = {} # thread id -> event loop
+        self._threads = {} # thread id -> phases entered on that (non event loop) thread
+        self._cpu_seen = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self.started = None
+
+    # --- Phases ---
+
+    def _enter(self, name):
+        thread_id = threading.get_ident()
+        try:
+            self._loops[thread_id] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._threads.setdefault(thread_id, []).append(name)
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        first = name not in self.phases or not self.phases[name].active
+        snapshot = tracemalloc.take_snapshot() if first and tracemalloc.is_tracing() else None
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = _PhaseStats(name)
+            if stats.active == 0:
+                stats.started = time.perf_counter()
+                stats.memory_start = memory
+                stats.snapshot = snapshot
+            stats.memory_peak = max(stats.memory_peak, memory)
+            stats.active += 1
+
+    def _exit(self, name):
+        thread_id = threading.get_ident()
+        if thread_id not in self._loops:
+            stack = self._threads.get(thread_id)
+            if stack:
+                stack.pop()
+                if not stack:
+                    self._threads.pop(thread_id)
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        with self._lock:
+            stats = self.phases[name]
+            stats.active -= 1
+            stats.memory_peak = max(stats.memory_peak, memory)
+            if stats.active:
+                return
+            stats.seconds += time.perf_counter() - stats.started
+            before, stats.snapshot = stats.snapshot, None
+        if before is not None:
+            stats.snapshots.append((before, tracemalloc.take_snapshot()))
+
+    # --- Sampling ---
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.seconds = time.perf_counter() - self.started
+        self.memory_peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        if self.memory:
+            tracemalloc.stop()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _cpu_delta(self, thread_id):
+        try:
+            clock = time.pthread_getcpuclockid(thread_id)
+            used = time.clock_gettime(clock)
+        except (AttributeError, OSError):
+            return 0.0 # No per-thread CPU clocks here: wall only
+        previous = self._cpu_seen.get(thread_id, used)
+        self._cpu_seen[thread_id] = used
+        return used - previous
+
+    def _sample(self, elapsed):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        with self._lock:
+            active = [s for s in self.phases.values() if s.active]
+            for stats in active:
+                stats.memory_peak = max(stats.memory_peak, memory)
+            if not active:
+                return
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                cpu = self._cpu_delta(thread_id)
+                thread = names.get(thread_id, str(thread_id))
+                for phase, stack in self._attribute(thread_id, frame, active):
+                    key = ";".join([thread] + stack)
+                    phase.wall[key] += elapsed
+                    phase.cpu[key] += cpu
+                    phase.samples += 1
+
+    def _attribute(self, thread_id, frame, active):
+        """[(phase stats, stack)] for one thread's sample."""
+        stack = _stack(frame)
+        loop = self._loops.get(thread_id)
+        if loop is not None and loop.is_running():
+            task = asyncio.current_task(loop)
+            if task is None:
+                # Loop is parked in select(): every phase on it is waiting
+                return [(s, [IDLE_FRAME]) for s in active]
+            name = task.get_context().get(_phase)
+            return [(self.phases[name], stack)] if name in self.phases else []
+
+        entered = self._threads.get(thread_id)
+        if entered and entered[-1] in self.phases:
+            return [(self.phases[entered[-1]], stack)]
+        if len(active) == 1 and not _parked(frame):
+            return [(active[0], stack)]
+        return []
+
+    # --- Output ---
+
+    def write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        report = {"seconds": round(self.seconds, 3), "memory_peak_mb": round(self.memory_peak / 1e6, 2), "phases": {}}
+        lines = [f"Profile: {self.seconds:.1f}s, tracemalloc peak {self.memory_peak / 1e6:.1f} MB"]
+
+        for stats in self.phases.values():
+            slug = re.sub(r"[^a-z0-9]+", "_", stats.name.lower()).strip("_")
+            for kind, counter in (("wall", stats.wall), ("cpu", stats.cpu)):
+                # flamegraph.pl / speedscope folded format, weights in microseconds
+                with open(os.path.join(self.out_dir, f"{slug}.{kind}.folded"), "w") as f:
+                    for stack, seconds in counter.most_common():
+                        if seconds > 0:
+                            f.write(f"{stack} {int(seconds * 1e6)}\n")
+
+            allocations = _allocations(stats.snapshots)
+            top = {
+                "self_wall": _top(stats.wall, leaf=True),
+                "self_cpu": _top(stats.cpu, leaf=True),
+                "total_wall": _top(stats.wall, leaf=False),
+                "total_cpu": _top(stats.cpu, leaf=False),
+            }
+            report["phases"][stats.name] = {
+                "seconds": round(stats.seconds, 3),
+                "cpu_seconds": round(sum(stats.cpu.values()), 3),
+                "samples": stats.samples,
+                "memory_start_mb": round(stats.memory_start / 1e6, 2),
+                "memory_peak_mb": round(stats.memory_peak / 1e6, 2),
+                "top": top,
+                "allocations": [{"site": s, "bytes": b, "count": c} for s, b, c in allocations],
+            }
+
+            lines.append("")
+            lines.append(
+                f"=== {stats.name}: {stats.seconds:.2f}s wall, {sum(stats.cpu.values()):.2f}s CPU, "
+                f"memory peak {stats.memory_peak / 1e6:.1f} MB (+{(stats.memory_peak - stats.memory_start) / 1e6:.1f} MB)"
+            )
+            for title, key in (("Top self CPU", "self_cpu"), ("Top self wall", "self_wall"), ("Top cumulative wall", "total_wall")):
+                lines.append(f"  {title}:")
+                lines.extend(f"    {seconds:8.3f}s  {function}" for function, seconds in top[key][:10])
+            if allocations:
+                lines.append("  Top allocation growth:")
+                lines.extend(f"    {b / 1e3:9.1f} KB  {s}" for s, b, _ in allocations[:10])
+
+        summary = "\n".join(lines)
+        with open(os.path.join(self.out_dir, "summary.txt"), "w") as f:
+            f.write(summary + "\n")
+        with open(os.path.join(self.out_dir, "profile.json"), "w") as f:
+            json.dump(report, f, indent=4)
+        return summary
+
+
+def _label(code):
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame):
+    """Root-first function labels."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _parked(frame):
+    # An idle pool worker waiting for its next job isn't part of any phase
+    code = frame.f_code
+    return code.co_name in ("wait", "get", "_worker") and os.path.basename(code.co_filename) in ("threading.py", "thread.py", "queue.py")
+
+
+def _allocations(snapshots):
+    """[(site, bytes, count)] that grew over the phase, summed over its runs. Overlapping phases' allocations are included."""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    growth = Counter()
+    counts = Counter()
+    for before, after in snapshots:
+        for d in after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno"):
+            site = str(d.traceback[0])
+            growth[site] += d.size_diff
+            counts[site] += d.count_diff
+    return [(site, size, counts[site]) for site, size in growth.most_common(TOP) if size > 0]
+
+
+def _top(counter, leaf):
+    totals = Counter()
+    for stack, seconds in counter.items():
+        frames = stack.split(";")[1:] # Drop the thread name
+        if leaf:
+            totals[frames[-1] if frames else "?"] += seconds
+        else:
+            for function in set(frames):
+                if function.rpartition("(")[2].partition(":")[0] not in PLUMBING:
+                    totals[function] += seconds
+    return [(function, round(seconds, 4)) for function, seconds in totals.most_common(TOP)]
+
+
+@contextmanager
+def phase(name):
+    """Marks the enclosed code (and the tasks / to_thread calls it starts) as part of `name`."""
+    token = _phase.set(name)
+    profiler = _profiler
+    if profiler is not None:
+        profiler._enter(name)
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler._exit(name)
+        _phase.reset(token)
+
+
+def bind(fn):
+    """Wraps `fn` for a worker thread (to_thread, pool.map) so it runs in the caller's current phase."""
+    name = _phase.get()
+    if name is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profile(out_dir=None, interval=INTERVAL, memory=True, log=print):
+    """
+    Profiles everything inside the block (out_dir defaults to
+    $DROIDRUN_PROFILE; neither set means no profiling). Writes per-phase
+    <phase>.wall.folded / <phase>.cpu.folded, summary.txt and profile.json.
+    """
+    global _profiler
+    out_dir = out_dir or os.environ.get(PROFILE_ENV)
+    if not out_dir or _profiler is not None:
+        yield None
+        return
+
+    profiler = Profiler(os.path.join(out_dir, time.strftime("%Y%m%d_%H%M%S")), interval, memory)
+    profiler.start()
+    _profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _profiler = None
+        profiler.stop()
+        log(profiler.write())
+        log(f"🔥 Profile written to {profiler.out_dir} (flamegraph.pl / speedscope read the .folded files)")
@@ -45,7 +45,10 @@ class RedisState:
             
         if val is None:
             return default
-            
+        return self._decode(val)
+
+    @staticmethod
+    def _decode(val):
         # Try to parse JSON, otherwise return raw string
         try:
             return json.loads(val)
@@ -58,6 +61,36 @@ class RedisState:
             except ValueError:
                 return val
 
+    def delete(self, key):
+        """Removes a single key."""
+        if self.r:
+            self.r.delete(self._get_key(key))
+        else:
+            self.local_store.pop(key, None)
+
+    def set_field(self, key, field, value):
+        """Sets one field of a hash. Atomic on its own, unlike get() / edit / set() of a dict."""
+        payload = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        if self.r:
+            self.r.hset(self._get_key(key), field, payload)
+        else:
+            self.local_store.setdefault(key, {})[field] = payload
+
+    def delete_field(self, key, field):
+        """Removes one field of a hash."""
+        if self.r:
+            self.r.hdel(self._get_key(key), field)
+        else:
+            self.local_store.get(key, {}).pop(field, None)
+
+    def get_fields(self, key):
+        """Every field of a hash, values decoded like get()."""
+        if self.r:
+            raw = self.r.hgetall(self._get_key(key))
+        else:
+            raw = dict(self.local_store.get(key, {}))
+        return {field: self._decode(val) for field, val in raw.items()}
+
     def clear(self):
         """Wipes memory for this session"""
         if self.r:
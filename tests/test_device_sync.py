@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from plan_cache import file_sha256
+from tools.device_sync import MANIFEST_NAME, DeviceSync, SyncPlan
+from tools.input_injector import MockTransport
+
+REMOTE_DIR = "/sdcard/Pictures/droidrun"
+STATE_COMMAND = (
+    f"mkdir -p {REMOTE_DIR} && ls -1a {REMOTE_DIR} && echo __MANIFEST__ && "
+    f"(cat {REMOTE_DIR}/{MANIFEST_NAME} 2>/dev/null || true)"
+)
+
+
+class DeviceSyncPlanTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i in range(1, 4):
+            path = os.path.join(self._tmp.name, f"image{i}.png")
+            with open(path, "wb") as f:
+                f.write(f"image {i}".encode())
+            self.files.append(path)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _sync(self, present, manifest):
+        listing = "\n".join([".", "..", MANIFEST_NAME, *present])
+        transport = MockTransport({STATE_COMMAND: f"{listing}\n__MANIFEST__\n{json.dumps(manifest)}\n"})
+        return DeviceSync(REMOTE_DIR, transport)
+
+    def _entry(self, path, position):
+        return {"sha256": file_sha256(path), "position": position}
+
+    def test_empty_folder_pushes_everything(self):
+        plan = self._sync([], {}).plan(self.files)
+        self.assertEqual(plan.push, self.files)
+        self.assertEqual(plan.touch, [("image1.png", 0), ("image2.png", 1), ("image3.png", 2)])
+        self.assertEqual(plan.delete, [])
+        self.assertEqual(plan.manifest["image2.png"], self._entry(self.files[1], 1))
+
+    def test_added_unchanged_and_removed_files(self):
+        present = ["image1.png", "image2.png", "old.png"]
+        manifest = {
+            "image1.png": self._entry(self.files[0], 0),
+            "image2.png": self._entry(self.files[1], 1),
+            "old.png": {"sha256": "0" * 64, "position": 2},
+        }
+        plan = self._sync(present, manifest).plan(self.files)
+        self.assertEqual(plan.push, [self.files[2]])
+        self.assertEqual(plan.touch, [("image3.png", 2)])
+        self.assertEqual(plan.delete, ["old.png"])
+        self.assertEqual(plan.unchanged, 2)
+        self.assertEqual(set(plan.manifest), {"image1.png", "image2.png", "image3.png"})
+
+    def test_same_files_in_the_same_order_is_empty(self):
+        manifest = {os.path.basename(p): self._entry(p, i) for i, p in enumerate(self.files)}
+        plan = self._sync(list(manifest), manifest).plan(self.files)
+        self.assertTrue(plan.empty)
+        self.assertEqual(plan.unchanged, 3)
+
+    def test_reordered_file_is_redated_not_pushed(self):
+        manifest = {os.path.basename(p): self._entry(p, i) for i, p in enumerate(self.files)}
+        plan = self._sync(list(manifest), manifest).plan([self.files[1], self.files[0], self.files[2]])
+        self.assertEqual(plan.push, [])
+        self.assertEqual(plan.touch, [("image2.png", 0), ("image1.png", 1)])
+        self.assertEqual(plan.unchanged, 1)
+
+    def test_changed_content_or_missing_remote_file_is_pushed(self):
+        manifest = {os.path.basename(p): self._entry(p, i) for i, p in enumerate(self.files)}
+        manifest["image1.png"]["sha256"] = "0" * 64
+        # image3.png is in the manifest but was deleted on the device
+        plan = self._sync(["image1.png", "image2.png"], manifest).plan(self.files)
+        self.assertEqual(plan.push, [self.files[0], self.files[2]])
+        self.assertEqual(plan.unchanged, 1)
+
+    def test_unreadable_manifest_pushes_everything(self):
+        listing = "\n".join([".", "..", "image1.png"])
+        sync = DeviceSync(REMOTE_DIR, MockTransport({STATE_COMMAND: f"{listing}\n__MANIFEST__\n{{not json\n"}))
+        self.assertEqual(sync.plan(self.files).push, self.files)
+
+
+class ScanCommandTest(unittest.TestCase):
+    def test_one_broadcast_on_the_folder(self):
+        plan = SyncPlan(touch=[("image1.png", 0), ("image2.png", 1)], delete=["old.png"])
+        command = DeviceSync(REMOTE_DIR, MockTransport()).scan_command(plan)
+
+        then, _, otherwise = command.partition("; else ")
+        self.assertEqual(re.findall(r"-d (\S+)", then), [f"file://{REMOTE_DIR}"])
+        # Pre-Android 10 scanners get every changed and deleted file
+        self.assertEqual(
+            re.findall(r"-d (\S+)", otherwise),
+            [f"file://{REMOTE_DIR}/{name}" for name in ("image1.png", "image2.png", "old.png")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
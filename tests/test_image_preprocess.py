@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from image_preprocess import export_pngs, list_sync_images, preprocess_images
+
+
+class ImagePreprocessTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        self.sources = []
+        for i in range(4):
+            path = os.path.join(self.dir, f"src{i}.jpg")
+            Image.new("RGB", (1600, 1200), (60 * i, 0, 0)).save(path)
+            self.sources.append(path)
+        self.out = os.path.join(self.dir, "images")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_export_writes_slots_in_selection_order(self):
+        paths = export_pngs(self.sources, self.out)
+        self.assertEqual(paths, list_sync_images(self.out))
+        for src, dest in zip(self.sources, paths):
+            with Image.open(src) as a, Image.open(dest) as b:
+                self.assertEqual(a.convert("RGB").getpixel((0, 0)), b.getpixel((0, 0)))
+
+    def test_export_drops_slots_past_the_selection(self):
+        export_pngs(self.sources, self.out)
+        export_pngs(self.sources[:2], self.out)
+        self.assertEqual([os.path.basename(p) for p in list_sync_images(self.out)], ["image1.png", "image2.png"])
+
+    def test_failed_conversion_raises_and_leaves_no_stale_slot(self):
+        export_pngs(self.sources, self.out)
+        broken = os.path.join(self.dir, "broken.jpg")
+        with open(broken, "w") as f:
+            f.write("not an image")
+
+        with self.assertRaisesRegex(RuntimeError, "1 of 4 image"):
+            export_pngs(self.sources[:2] + [broken] + self.sources[3:], self.out)
+        self.assertFalse(os.path.exists(os.path.join(self.out, "image3.png")))
+
+    def test_preprocess_keeps_order_and_shrinks(self):
+        uploads = os.path.join(self.dir, "uploads")
+        paths = preprocess_images(self.sources, out_dir=uploads, long_edge=256)
+        self.assertEqual(len(paths), 4)
+        for src, dest in zip(self.sources, paths):
+            with Image.open(dest) as img:
+                self.assertEqual(max(img.size), 256)
+        # Same content + settings -> same file
+        self.assertEqual(preprocess_images(self.sources, out_dir=uploads, long_edge=256), paths)
+
+    def test_preprocess_prunes_stale_copies_only(self):
+        uploads = os.path.join(self.dir, "uploads")
+        preprocess_images(self.sources, out_dir=uploads)
+        stale = os.path.join(uploads, "0" * 24 + ".jpg")
+        sheet = os.path.join(uploads, "contact_sheet_1.jpg")
+        for path in (stale, sheet):
+            open(path, "w").close()
+            os.utime(path, (0, 0))
+
+        kept = preprocess_images(self.sources[:1], out_dir=uploads)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(sheet))
+        self.assertTrue(os.path.exists(kept[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
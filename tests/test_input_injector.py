@@ -0,0 +1,179 @@
+import asyncio
+import unittest
+
+from tools.adb_transport import AdbTransportError
+from tools.input_injector import (
+    ABS_MT_POSITION_X, ABS_MT_POSITION_Y, ABS_MT_PRESSURE, ABS_MT_SLOT, ABS_MT_TRACKING_ID,
+    BTN_TOUCH, DELAY_FIFO, EV_ABS, EV_KEY, EV_SYN, FRAME_MS, SYN_REPORT, TRACKING_ID_NONE,
+    MockTransport, SendeventInjector, TouchProfile,
+)
+
+GETEVENT = """add device 1: /dev/input/event3
+  name:     "gpio-keys"
+  events:
+    KEY (0001): KEY_VOLUMEDOWN
+add device 2: /dev/input/event2
+  name:     "touchscreen"
+  events:
+    KEY (0001): BTN_TOUCH
+    ABS (0003): ABS_MT_SLOT           : value 0, min 0, max 9, fuzz 0, flat 0, resolution 0
+                ABS_MT_POSITION_X     : value 0, min 0, max 1079, fuzz 0, flat 0, resolution 0
+                ABS_MT_POSITION_Y     : value 0, min 0, max 2399, fuzz 0, flat 0, resolution 0
+                ABS_MT_TRACKING_ID    : value 0, min 0, max 65535, fuzz 0, flat 0, resolution 0
+                ABS_MT_PRESSURE       : value 0, min 0, max 255, fuzz 0, flat 0, resolution 0
+"""
+WM_SIZE = "Physical size: 1080x2400\n"
+MKSH = "@(#)MIRBSD KSH R59 2020/10/31 Android\n"
+
+SYN = (EV_SYN, SYN_REPORT, 0)
+
+
+def _profile(event_size=24, builtin_delay=False):
+    return TouchProfile(
+        "/dev/input/event2", (0, 1079), (0, 2399), (1080, 2400),
+        pressure_max=255, event_size=event_size, builtin_delay=builtin_delay,
+    )
+
+
+def _injector(event_size=24, builtin_delay=False):
+    transport = MockTransport()
+    return SendeventInjector(_profile(event_size, builtin_delay), transport), transport
+
+
+class TouchProfileTest(unittest.TestCase):
+    def test_parse_picks_the_multitouch_device(self):
+        profile = TouchProfile.parse(GETEVENT, WM_SIZE, "arm64-v8a\n")
+        self.assertEqual(profile.device, "/dev/input/event2")
+        self.assertEqual(profile.x_range, (0, 1079))
+        self.assertEqual(profile.y_range, (0, 2399))
+        self.assertEqual(profile.screen_size, (1080, 2400))
+        self.assertTrue(profile.has_slots)
+        self.assertTrue(profile.has_btn_touch)
+        self.assertEqual(profile.pressure_max, 255)
+        self.assertEqual(profile.event_size, 24)
+        self.assertFalse(profile.builtin_delay)
+
+    def test_parse_sizes_records_for_32_bit_userspace(self):
+        self.assertEqual(TouchProfile.parse(GETEVENT, WM_SIZE, "armeabi-v7a\n").event_size, 16)
+
+    def test_detect_reads_the_abi(self):
+        transport = MockTransport({"getevent -pl": GETEVENT, "wm size": WM_SIZE, "getprop ro.product.cpu.abi": "x86\n"})
+        self.assertEqual(TouchProfile.detect(transport).event_size, 16)
+
+    def test_detect_uses_builtin_delay_on_mksh(self):
+        transport = MockTransport({
+            "getevent -pl": GETEVENT, "wm size": WM_SIZE, "getprop ro.product.cpu.abi": "arm64-v8a\n",
+            "echo $KSH_VERSION": MKSH,
+        })
+        profile = TouchProfile.detect(transport)
+        self.assertTrue(profile.builtin_delay)
+        self.assertTrue(TouchProfile.from_dict(profile.to_dict()).builtin_delay)
+
+
+class EventSequenceTest(unittest.TestCase):
+    def test_tap(self):
+        injector, _ = _injector()
+        self.assertEqual(injector.tap_events(100, 200), [
+            (EV_ABS, ABS_MT_SLOT, 0),
+            (EV_ABS, ABS_MT_TRACKING_ID, 1),
+            (EV_KEY, BTN_TOUCH, 1),
+            (EV_ABS, ABS_MT_PRESSURE, 127),
+            (EV_ABS, ABS_MT_POSITION_X, 100),
+            (EV_ABS, ABS_MT_POSITION_Y, 200),
+            SYN,
+            ("sleep", 40),
+            (EV_ABS, ABS_MT_TRACKING_ID, TRACKING_ID_NONE),
+            (EV_KEY, BTN_TOUCH, 0),
+            SYN,
+        ])
+
+    def test_swipe_moves_one_finger_and_lifts_it(self):
+        injector, _ = _injector()
+        events = injector.drag_events([(100, 1000), (900, 1000)], duration_ms=160, hold_ms=100)
+
+        xs = [e[2] for e in events if e[:2] == (EV_ABS, ABS_MT_POSITION_X)]
+        self.assertEqual(xs[0], 100)
+        self.assertEqual(xs[-1], 900)
+        self.assertEqual(xs, sorted(xs))
+        # y never changes after the first frame
+        self.assertEqual([e for e in events if e[:2] == (EV_ABS, ABS_MT_POSITION_Y)], [(EV_ABS, ABS_MT_POSITION_Y, 1000)])
+
+        sleeps = [e[1] for e in events if e[0] == "sleep"]
+        self.assertAlmostEqual(sum(sleeps[:-1]), 160)
+        self.assertEqual(len(sleeps[:-1]), 160 // FRAME_MS)
+        self.assertEqual(sleeps[-1], 100) # Held still before the lift
+        self.assertEqual(events[-3:], [(EV_ABS, ABS_MT_TRACKING_ID, TRACKING_ID_NONE), (EV_KEY, BTN_TOUCH, 0), SYN])
+
+    def test_pinch_uses_two_slots(self):
+        injector, _ = _injector()
+        events = injector.pinch_events(540, 2100, 600, 200, duration_ms=160, hold_ms=100)
+
+        downs = [e for e in events if e[:2] == (EV_ABS, ABS_MT_TRACKING_ID) and e[2] != TRACKING_ID_NONE]
+        lifts = [e for e in events if e == (EV_ABS, ABS_MT_TRACKING_ID, TRACKING_ID_NONE)]
+        self.assertEqual(len(downs), 2)
+        self.assertEqual(len(lifts), 2)
+        self.assertIn((EV_ABS, ABS_MT_SLOT, 1), events)
+        self.assertEqual(events.count((EV_KEY, BTN_TOUCH, 1)), 1)
+        self.assertEqual(events.count((EV_KEY, BTN_TOUCH, 0)), 1)
+
+    def test_tracking_ids_advance_per_touch(self):
+        injector, _ = _injector()
+        first = injector.tap_events(10, 10)
+        second = injector.tap_events(10, 10)
+        self.assertIn((EV_ABS, ABS_MT_TRACKING_ID, 1), first)
+        self.assertIn((EV_ABS, ABS_MT_TRACKING_ID, 2), second)
+
+
+class ScriptTest(unittest.TestCase):
+    def test_gesture_is_one_command_with_one_writer(self):
+        injector, transport = _injector()
+        asyncio.run(injector.swipe(100, 1000, 900, 1000, duration_ms=300, hold_ms=100))
+
+        self.assertEqual(len(transport.commands), 1)
+        script = transport.commands[0]
+        self.assertNotIn("sendevent", script)
+        self.assertEqual(script.count("dd "), 1)
+        self.assertTrue(script.endswith("| dd of=/dev/input/event2 bs=4080 2>/dev/null"))
+
+    def test_builtin_delay_waits_on_the_fifo_instead_of_forking_sleep(self):
+        injector, transport = _injector(builtin_delay=True)
+        asyncio.run(injector.swipe(100, 1000, 900, 1000, duration_ms=300, hold_ms=100))
+
+        script = transport.commands[0]
+        self.assertNotIn("sleep", script)
+        self.assertTrue(script.startswith(f"{{ [ -p {DELAY_FIFO} ] || mkfifo {DELAY_FIFO}; }} && "))
+        self.assertIn("read -t 0.100 -u9; print -n", script)
+        self.assertIn(f" 9<>{DELAY_FIFO} | dd of=/dev/input/event2 ", script)
+
+    def test_script_decodes_to_the_generated_events(self):
+        for event_size, builtin_delay in ((24, False), (16, False), (24, True)):
+            with self.subTest(event_size=event_size, builtin_delay=builtin_delay):
+                injector, transport = _injector(event_size, builtin_delay)
+                expected = injector.drag_events([(100, 1000), (500, 1200), (900, 1000)], duration_ms=200, hold_ms=50)
+                injector._tracking_id = 0
+                asyncio.run(injector.drag([(100, 1000), (500, 1200), (900, 1000)], duration_ms=200, hold_ms=50))
+                # The script carries sleeps in whole milliseconds
+                expected = [("sleep", round(e[1])) if e[0] == "sleep" else e for e in expected]
+                self.assertEqual(transport.events(event_size), expected)
+
+    def test_records_are_split_only_at_sleeps(self):
+        injector, _ = _injector()
+        events = injector.tap_events(100, 200)
+        chunks = injector.to_records(events)
+        self.assertEqual([type(c) for c in chunks], [bytes, tuple, bytes])
+        self.assertEqual(len(chunks[0]), 7 * 24)
+        self.assertEqual(len(chunks[2]), 3 * 24)
+
+    def test_failed_write_raises(self):
+        class Refusing(MockTransport):
+            def run(self, command, timeout=10.0):
+                super().run(command, timeout)
+                return 1, "dd: /dev/input/event2: Permission denied"
+
+        injector = SendeventInjector(_profile(), Refusing())
+        with self.assertRaises(AdbTransportError):
+            asyncio.run(injector.tap(1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
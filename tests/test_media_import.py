@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+
+from tools.adb_transport import set_transport
+from tools.input_injector import MockTransport
+from tools.media_import import ID, fast_import
+
+REMOTE_DIR = "/sdcard/Pictures/droidrun"
+
+
+class FakeTools:
+    """droidrun Tools that serve one fixed UI tree (or raise from get_state)."""
+
+    def __init__(self, elements=None, error=None):
+        self.elements = elements or []
+        self.error = error
+        self.taps = []
+
+    async def get_state(self):
+        if self.error is not None:
+            raise self.error
+        return None, None, self.elements
+
+    async def tap_on_index(self, index):
+        self.taps.append(index)
+
+
+class FastImportTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = MockTransport({f"ls -1 {REMOTE_DIR}": "image1.png\nimage2.png\n"})
+        self._previous = set_transport(self.transport)
+
+    def tearDown(self):
+        set_transport(self._previous)
+
+    def test_broken_picker_tree_falls_back_to_the_agent(self):
+        # Picker already on the album, but the grid node has no index to walk from
+        tools = FakeTools([
+            {"resourceId": ID("selectDirectoryLayout"), "index": 1, "bounds": "0,0,1080,200"},
+            {"resourceId": ID("directoryTextView"), "index": 2, "text": "droidrun", "bounds": "0,0,540,200"},
+            {"resourceId": ID("wallRecyclerView"), "bounds": "0,200,1080,2400"},
+        ])
+        self.assertFalse(asyncio.run(fast_import(REMOTE_DIR, tools)))
+        self.assertEqual(tools.taps, [])
+        self.assertIn("am force-stop com.camerasideas.instashot", self.transport.commands)
+
+    def test_get_state_error_falls_back_to_the_agent(self):
+        tools = FakeTools(error=RuntimeError("Portal not responding"))
+        self.assertFalse(asyncio.run(fast_import(REMOTE_DIR, tools)))
+
+    def test_shell_failure_falls_back_to_the_agent(self):
+        class Failing(MockTransport):
+            def run(self, command, timeout=10.0):
+                super().run(command, timeout)
+                return 1, "ls: /sdcard/Pictures/droidrun: No such file or directory"
+
+        set_transport(Failing())
+        self.assertFalse(asyncio.run(fast_import(REMOTE_DIR, FakeTools())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from plan_cache import PlanCache, RedisPlanBackend, plan_key
+from redis_state import global_state
+
+PLAN = [{"tool": "change_duration", "args": {"image_idx": 1, "duration": 3.0}}]
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PlanKeyTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.clips = []
+        for i in range(2):
+            path = os.path.join(self._tmp.name, f"image{i + 1}.png")
+            with open(path, "wb") as f:
+                f.write(f"pixels {i}".encode())
+            self.clips.append(path)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_prompt_is_normalized(self):
+        self.assertEqual(
+            plan_key("Make it  punchy\n", self.clips, "m", "t"),
+            plan_key("make it punchy", self.clips, "m", "t"),
+        )
+
+    def test_everything_else_is_part_of_the_key(self):
+        base = plan_key("make it punchy", self.clips, "m", "images\nsystem")
+        variants = [
+            plan_key("make it calm", self.clips, "m", "images\nsystem"),
+            plan_key("make it punchy", self.clips[::-1], "m", "images\nsystem"),
+            plan_key("make it punchy", self.clips[:1], "m", "images\nsystem"),
+            plan_key("make it punchy", self.clips, "other-model", "images\nsystem"),
+            # The director passes "<mode>\n<system prompt>" as the template
+            plan_key("make it punchy", self.clips, "m", "video\nsystem"),
+            plan_key("make it punchy", self.clips, "m", "images\nsystem v2"),
+        ]
+        self.assertEqual(len({base, *variants}), len(variants) + 1)
+
+    def test_image_bytes_not_paths(self):
+        key = plan_key("p", self.clips, "m")
+        with open(self.clips[0], "ab") as f:
+            f.write(b"!")
+        self.assertNotEqual(plan_key("p", self.clips, "m"), key)
+
+
+class RedisPlanCacheTest(unittest.TestCase):
+    """Runs on global_state, i.e. the local-memory fallback when no Redis is up."""
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("plan_cache.time.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = RedisPlanBackend(global_state)
+        self.addCleanup(self._drop)
+        self.cache = PlanCache(self.backend, max_entries=3, max_age_s=100)
+
+    def _drop(self):
+        for key, _, _ in self.backend.entries():
+            self.backend.delete(key)
+        global_state.delete(RedisPlanBackend.INDEX_KEY)
+
+    def _keys(self):
+        return sorted(key for key, _, _ in self.backend.entries())
+
+    def test_round_trip(self):
+        self.cache.put("a", PLAN)
+        self.assertEqual(self.cache.get("a"), PLAN)
+        self.assertIsNone(self.cache.get("missing"))
+
+    def test_least_recently_used_are_evicted(self):
+        for key in ("a", "b", "c"):
+            self.cache.put(key, PLAN)
+            self.clock.now += 1
+        self.cache.get("a") # Now the most recently used
+        self.clock.now += 1
+        self.cache.put("d", PLAN)
+        self.assertEqual(self._keys(), ["a", "c", "d"])
+        self.assertIsNone(self.cache.get("b"))
+
+    def test_expired_entries_are_dropped(self):
+        self.cache.put("old", PLAN)
+        self.clock.now += 60
+        self.cache.put("new", PLAN)
+        self.clock.now += 60
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual(self._keys(), ["new"])
+        self.clock.now += 60
+        self.cache.evict()
+        self.assertEqual(self._keys(), [])
+
+    def test_delete_removes_the_index_entry_and_the_plan(self):
+        self.cache.put("a", PLAN)
+        self.cache.put("b", PLAN)
+        self.backend.delete("a")
+        self.assertEqual(self._keys(), ["b"])
+        self.assertNotIn("a", global_state.get_fields(RedisPlanBackend.INDEX_KEY))
+        self.assertIsNone(global_state.get("plan:a"))
+        self.assertEqual(self.cache.get("b"), PLAN)
+
+    def test_index_entry_without_a_plan_is_a_miss_and_still_evicted(self):
+        global_state.set_field(RedisPlanBackend.INDEX_KEY, "orphan", [self.clock.now - 1000, self.clock.now - 1000])
+        self.assertIsNone(self.cache.get("orphan"))
+        self.cache.evict()
+        self.assertEqual(self._keys(), [])
+
+    def test_read_refreshes_last_used(self):
+        self.cache.put("a", PLAN)
+        self.clock.now += 5
+        self.cache.get("a")
+        created, used = global_state.get_fields(RedisPlanBackend.INDEX_KEY)["a"]
+        self.assertEqual(used - created, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from plan_optimizer import PlanOptimizer, plan_cost, simulate
+
+
+def duration(i, seconds):
+    return {"tool": "change_duration", "args": {"image_idx": i, "duration": seconds}}
+
+
+def effect(i, name="Noise"):
+    return {"tool": "apply_effect", "args": {"image_idx": i, "effects_list": [name]}}
+
+
+def transition(j, kind="fade", all_apply=False):
+    return {"tool": "add_transition", "args": {"image1_idx": j, "image2_idx": j + 1, "transition_type": kind, "all_apply": all_apply}}
+
+
+class EffectOrderTest(unittest.TestCase):
+    def test_earlier_duration_change_is_not_hoisted_over_an_effect(self):
+        steps = [effect(2), duration(1, 8.0), effect(3)]
+        optimized, report = PlanOptimizer(4).optimize(steps)
+
+        self.assertTrue(report["equivalent"])
+        self.assertLess(optimized.index(effect(2)), optimized.index(duration(1, 8.0)))
+        # Noise stays where it landed on the original timeline: clip 2 at 5-10s
+        self.assertIn((5.0, 10.0, "Noise"), simulate(optimized, 4).effect_spans())
+
+    def test_equivalence_compares_where_effects_land(self):
+        original = simulate([effect(2), duration(1, 8.0)], 4)
+        hoisted = simulate([duration(1, 8.0), effect(2)], 4)
+        # Same per-clip effect lists, different spans on the timeline
+        self.assertEqual(original.effects, hoisted.effects)
+        self.assertFalse(original.equivalent(hoisted))
+
+    def test_earlier_transition_is_not_hoisted_over_an_effect(self):
+        steps = [effect(3), transition(1)]
+        optimized, _ = PlanOptimizer(4).optimize(steps)
+        self.assertEqual(optimized, steps)
+
+    def test_later_clip_edits_still_reorder_around_an_effect(self):
+        # Effect on clip 1 doesn't care about clip 4; nearest-first puts clip 1 first
+        steps = [duration(4, 3.0), effect(1)]
+        optimized, report = PlanOptimizer(4).optimize(steps)
+        self.assertEqual(optimized, [effect(1), duration(4, 3.0)])
+        self.assertTrue(report["equivalent"])
+        self.assertLess(report["seek_seconds_after"], report["seek_seconds_before"])
+
+
+class PlanOptimizerTest(unittest.TestCase):
+    def test_identical_transitions_on_every_cut_fuse_into_one(self):
+        steps = [transition(1), transition(2), transition(3)]
+        optimized, report = PlanOptimizer(4).optimize(steps)
+        self.assertEqual(len(optimized), 1)
+        self.assertTrue(optimized[0]["args"]["all_apply"])
+        self.assertEqual(report["fused_transitions"], 3)
+        self.assertTrue(report["equivalent"])
+
+    def test_plan_cost_is_playhead_travel(self):
+        # Midpoints of clips 1, 4 and 2 on four 5s clips: 2.5 + 15 + 10
+        self.assertEqual(plan_cost([duration(1, 5.0), duration(4, 5.0), duration(2, 5.0)], 4), 27.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
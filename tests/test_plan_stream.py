@@ -0,0 +1,84 @@
+import json
+import unittest
+
+from plan_stream import PlanStreamParser, StubStreamingClient
+
+STEPS = [
+    {"tool": "change_duration", "args": {"image_idx": 1, "duration": 3.5}},
+    # Braces, brackets, quotes and escapes inside string literals
+    {"tool": "apply_effect", "args": {"image_idx": 2, "effects_list": ["Glitch {v2}", "Say \"hi]\"", "back\\slash"]}},
+    {"tool": "add_transition", "args": {"image1_idx": 1, "image2_idx": 2, "transition_type": "fade", "all_apply": False}},
+]
+REPLY = {
+    # Looks like the plan array, but is inside a string
+    "thought_process": "First a \"plan\": [ {draft} ], then the real one.",
+    "plan": STEPS,
+}
+
+
+def _fenced(reply, indent=4):
+    return "```json\n" + json.dumps(reply, indent=indent) + "\n```"
+
+
+def _stream(text, chunk_size):
+    """Runs `text` through the stub client and the parser; returns (parser, steps emitted per chunk)."""
+    client = StubStreamingClient(text, chunk_size=chunk_size)
+    parser = PlanStreamParser()
+    emitted = [parser.feed(chunk.text) for chunk in client.models.generate_content_stream(model="stub", contents=[])]
+    return parser, emitted
+
+
+class PlanStreamParserTest(unittest.TestCase):
+    def test_every_chunk_size_emits_the_same_steps(self):
+        text = _fenced(REPLY)
+        for chunk_size in (1, 2, 3, 7, 16, 40, len(text)):
+            with self.subTest(chunk_size=chunk_size):
+                parser, emitted = _stream(text, chunk_size)
+                self.assertEqual([step for chunk in emitted for step in chunk], STEPS)
+                self.assertEqual(parser.steps, STEPS)
+                self.assertTrue(parser.done)
+                self.assertEqual(parser.result(), REPLY)
+
+    def test_step_is_emitted_when_its_closing_brace_arrives(self):
+        text = _fenced(REPLY, indent=None)
+        first = json.dumps(STEPS[0])
+        end = text.index(first) + len(first)
+
+        parser = PlanStreamParser()
+        self.assertEqual(parser.feed(text[:end - 1]), [])
+        self.assertEqual(parser.feed(text[end - 1:end]), [STEPS[0]])
+        self.assertEqual(parser.feed(text[end:]), STEPS[1:])
+
+    def test_split_inside_string_literals(self):
+        text = _fenced(REPLY, indent=None)
+        for needle in ("{v2}", "hi]", '\\"', "\\\\slash", "{draft}"):
+            cut = text.index(needle) + 1
+            with self.subTest(needle=needle):
+                parser = PlanStreamParser()
+                steps = parser.feed(text[:cut]) + parser.feed(text[cut:])
+                self.assertEqual(steps, STEPS)
+
+    def test_split_inside_the_plan_key(self):
+        text = _fenced(REPLY, indent=None)
+        cut = text.index('"plan": [') + 3
+        parser = PlanStreamParser()
+        self.assertEqual(parser.feed(text[:cut]), [])
+        self.assertEqual(parser.feed(text[cut:]), STEPS)
+
+    def test_nothing_after_the_plan_array_is_parsed(self):
+        parser = PlanStreamParser()
+        steps = parser.feed('{"plan": [{"tool": "calibrate", "args": {"num_images": 4}}], "extra": [{"tool": "x"}]}')
+        self.assertEqual(steps, [{"tool": "calibrate", "args": {"num_images": 4}}])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.feed('{"tool": "y"}'), [])
+
+    def test_truncated_reply_falls_back_to_streamed_steps(self):
+        text = _fenced(REPLY, indent=None)
+        cut = text.index(json.dumps(STEPS[2])) + 5
+        parser, _ = _stream(text[:cut], chunk_size=16)
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.result(), {"thought_process": "", "plan": STEPS[:2]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import random
+import unittest
+
+from redis_state import global_state
+from tools.seek_controller import SeekController
+
+PX_PER_SEC = 200.0
+# What the "device" really does: a bit faster than calibrated, plus momentum
+TRUE_GAIN = 1.3 / PX_PER_SEC
+TRUE_FLING = 0.4
+
+
+def _moved(px, duration_ms, hold_ms, noise=0.0):
+    drag, fling = SeekController._features(px, duration_ms, hold_ms)
+    return drag * TRUE_GAIN + fling * TRUE_FLING + noise
+
+
+def _swipes(rng, count):
+    """Synthetic (px, duration_ms, hold_ms): coarse flicks and held fine drags, both directions."""
+    for _ in range(count):
+        px = rng.choice([-1, 1]) * rng.uniform(50, 900)
+        if rng.random() < 0.5:
+            yield px, max(150, abs(px) / SeekController.COARSE_SPEED), 0
+        else:
+            yield px, max(150, abs(px) / SeekController.FINE_SPEED), SeekController.FINE_HOLD_MS
+
+
+def _assert_bounded(test, controller):
+    prior = controller._prior()
+    P = controller.P
+    for i in range(2):
+        test.assertLessEqual(P[i][i], prior[i] * (1 + 1e-9))
+        test.assertGreater(P[i][i], 0)
+    test.assertAlmostEqual(P[0][1], P[1][0])
+    test.assertGreater(P[0][0] * P[1][1] - P[0][1] * P[1][0], 0) # Still positive definite
+
+
+class SeekControllerTest(unittest.TestCase):
+    def test_fit_converges_to_the_device(self):
+        rng = random.Random(7)
+        controller = SeekController(PX_PER_SEC)
+        for px, duration_ms, hold_ms in _swipes(rng, 60):
+            controller.update(px, duration_ms, hold_ms, _moved(px, duration_ms, hold_ms, rng.gauss(0, 0.02)))
+            _assert_bounded(self, controller)
+
+        self.assertAlmostEqual(controller.theta[0], TRUE_GAIN, delta=0.03 * TRUE_GAIN)
+        self.assertAlmostEqual(controller.theta[1], TRUE_FLING, delta=0.05)
+        self.assertEqual(controller.samples, 60)
+
+    def test_held_swipes_do_not_wind_up_the_fling_variance(self):
+        controller = SeekController(PX_PER_SEC)
+        for _ in range(500):
+            controller.update(300, 300, SeekController.FINE_HOLD_MS, _moved(300, 300, SeekController.FINE_HOLD_MS))
+        _assert_bounded(self, controller)
+        self.assertEqual(controller.P[1][1], controller._prior()[1])
+        self.assertAlmostEqual(controller.theta[0], TRUE_GAIN)
+
+    def test_repeated_identical_flicks_stay_bounded(self):
+        # One direction in feature space only: the unexcited one must not blow up
+        controller = SeekController(PX_PER_SEC)
+        for _ in range(500):
+            controller.update(600, 240, 0, _moved(600, 240, 0))
+            _assert_bounded(self, controller)
+        self.assertAlmostEqual(controller.predict(600, 240), _moved(600, 240, 0), places=6)
+
+    def test_closed_loop_seek_converges(self):
+        rng = random.Random(3)
+        controller = SeekController(PX_PER_SEC)
+        for target in (37.0, -12.5, 4.2, -0.6, 80.0):
+            remaining = target
+            for _ in range(30):
+                if abs(remaining) < 0.05:
+                    break
+                px, duration_ms, hold_ms = controller.plan(remaining, 800, 800)
+                moved = _moved(px, duration_ms, hold_ms, rng.gauss(0, 0.01))
+                controller.update(px, duration_ms, hold_ms, moved)
+                remaining -= moved
+            self.assertLess(abs(remaining), 0.05, f"seek to {target:+}s stopped {remaining:+.3f}s short")
+
+    def test_bad_reading_keeps_the_fit_physical(self):
+        controller = SeekController(PX_PER_SEC)
+        controller.update(500, 200, 0, 1000.0)
+        nominal = 1.0 / PX_PER_SEC
+        self.assertLessEqual(controller.theta[0], 3 * nominal)
+        self.assertLessEqual(controller.theta[1], nominal * SeekController.FLING_MAX_MS)
+        controller.update(500, 200, 0, -1000.0)
+        self.assertGreaterEqual(controller.theta[0], nominal / 3)
+        self.assertGreaterEqual(controller.theta[1], 0.0)
+
+    def test_wound_up_saved_covariance_is_bounded_on_load(self):
+        controller = SeekController(PX_PER_SEC, [TRUE_GAIN, TRUE_FLING], [[1.0, 0.5], [0.5, 40.0]], 9)
+        _assert_bounded(self, controller)
+
+    def test_save_load_and_rescale(self):
+        device = "test-seek-controller"
+        controller = SeekController(PX_PER_SEC, [TRUE_GAIN, TRUE_FLING])
+        controller.save(device)
+        try:
+            same = SeekController.load(PX_PER_SEC * 1.02, device)
+            self.assertEqual(same.theta, [TRUE_GAIN, TRUE_FLING])
+
+            zoomed = SeekController.load(PX_PER_SEC * 2, device)
+            self.assertEqual(zoomed.px_per_sec, PX_PER_SEC * 2)
+            self.assertAlmostEqual(zoomed.theta[0], TRUE_GAIN / 2)
+            self.assertAlmostEqual(zoomed.theta[1], TRUE_FLING / 2)
+            self.assertEqual(zoomed.P, zoomed._prior_covariance())
+        finally:
+            models = global_state.get(SeekController.STATE_KEY) or {}
+            models.pop(device, None)
+            global_state.set(SeekController.STATE_KEY, models)
+
+    def test_reach_is_one_capped_coarse_swipe(self):
+        controller = SeekController(PX_PER_SEC, [TRUE_GAIN, TRUE_FLING])
+        self.assertAlmostEqual(controller.reach(800), _moved(800, 800 / SeekController.COARSE_SPEED, 0))
+        px, _, _ = controller.plan(controller.reach(800) * 3, 800, 800)
+        self.assertEqual(px, 800)
+
+
+if __name__ == "__main__":
+    unittest.main()
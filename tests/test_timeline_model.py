@@ -0,0 +1,137 @@
+import json
+import random
+import unittest
+
+from redis_state import global_state
+from tools.timeline_model import FenwickTree, TimelineModel
+
+
+def _spans(durations, overlaps):
+    """Clip spans the slow way: duration minus half of each neighbouring overlap."""
+    return [
+        d - (overlaps[i - 1] / 2 if i > 0 else 0.0) - (overlaps[i] / 2 if i < len(overlaps) else 0.0)
+        for i, d in enumerate(durations)
+    ]
+
+
+class FenwickTreeTest(unittest.TestCase):
+    def test_prefix_sums_follow_point_updates(self):
+        rng = random.Random(5)
+        values = [rng.uniform(0.5, 6.0) for _ in range(37)]
+        tree = FenwickTree(values)
+        for _ in range(200):
+            i = rng.randrange(len(values))
+            delta = rng.uniform(-0.4, 0.4)
+            values[i] += delta
+            tree.add(i + 1, delta)
+            k = rng.randrange(len(values) + 1)
+            self.assertAlmostEqual(tree.prefix(k), sum(values[:k]))
+
+    def test_lower_bound(self):
+        tree = FenwickTree([1.0, 2.0, 3.0])
+        self.assertEqual(tree.lower_bound(0.0), 1)
+        self.assertEqual(tree.lower_bound(0.99), 1)
+        self.assertEqual(tree.lower_bound(1.0), 2) # Boundaries belong to the next clip
+        self.assertEqual(tree.lower_bound(5.5), 3)
+        self.assertEqual(tree.lower_bound(6.0), 4)
+
+
+class TimelineModelTest(unittest.TestCase):
+    def test_ranges_after_duration_and_transition_edits(self):
+        rng = random.Random(11)
+        model = TimelineModel([5.0] * 12)
+        durations, overlaps = [5.0] * 12, [0.0] * 11
+        for _ in range(100):
+            if rng.random() < 0.6:
+                i = rng.randrange(12)
+                durations[i] = round(rng.uniform(1.0, 9.0), 1)
+                model.set_duration(i + 1, durations[i])
+            else:
+                j = rng.randrange(11)
+                overlaps[j] = round(rng.uniform(0.0, 0.9), 1)
+                model.set_transition(j + 1, overlaps[j])
+
+            spans = _spans(durations, overlaps)
+            k = rng.randrange(1, 13)
+            start, end = model.clip_range(k)
+            self.assertAlmostEqual(start, sum(spans[:k - 1]))
+            self.assertAlmostEqual(end, sum(spans[:k]))
+            self.assertAlmostEqual(model.junction_time(k), sum(spans[:k]))
+        self.assertAlmostEqual(model.total_duration(), sum(_spans(durations, overlaps)))
+
+    def test_set_all_transitions(self):
+        model = TimelineModel([4.0, 4.0, 4.0])
+        model.set_all_transitions(1.0)
+        self.assertEqual(model.clip_range(1), (0.0, 3.5))
+        self.assertEqual(model.clip_range(2), (3.5, 6.5))
+        self.assertEqual(model.total_duration(), 10.0)
+
+    def test_clip_at(self):
+        model = TimelineModel([2.0, 3.0, 1.0])
+        self.assertEqual([model.clip_at(t) for t in (0.0, 1.9, 2.0, 4.99, 5.0, 5.9)], [1, 1, 2, 2, 3, 3])
+        # Clamped outside the timeline
+        self.assertEqual(model.clip_at(-1.0), 1)
+        self.assertEqual(model.clip_at(60.0), 3)
+        model.set_duration(1, 4.0)
+        self.assertEqual(model.clip_at(3.0), 1)
+        self.assertEqual(model.clip_at(4.0), 2)
+        self.assertIsNone(TimelineModel([]).clip_at(1.0))
+
+    def test_effect_spans_stay_where_they_were_applied(self):
+        model = TimelineModel([5.0, 5.0])
+        model.add_effect(2, "Glitch")
+        model.set_duration(1, 3.0)
+        self.assertEqual(model.effect_spans(), [(5.0, 10.0, "Glitch")])
+        self.assertEqual(model.clip_range(2), (3.0, 8.0))
+
+
+class TimelineModelPersistenceTest(unittest.TestCase):
+    def setUp(self):
+        self._saved = {key: global_state.get(key) for key in (TimelineModel.STATE_KEY, TimelineModel.VERSION_KEY)}
+        TimelineModel.forget()
+
+    def tearDown(self):
+        for key, value in self._saved.items():
+            if value is None:
+                global_state.delete(key)
+            else:
+                global_state.set(key, value)
+        TimelineModel.forget()
+
+    def test_round_trip(self):
+        model = TimelineModel([5.0, 2.5, 4.0])
+        model.set_transition(1, 0.6)
+        model.add_effect(3, "Blur")
+        # Through JSON like Redis: effect keys come back as strings
+        loaded = TimelineModel.from_record(json.loads(json.dumps(model.to_record())))
+        self.assertTrue(model.equivalent(loaded))
+        self.assertEqual(loaded.effects, {3: ["Blur"]})
+
+    def test_load_keeps_the_in_memory_model_until_the_version_changes(self):
+        model = TimelineModel.create(3)
+        self.assertIs(TimelineModel.load(), model)
+        # Someone edits the record without bumping the version: not re-read
+        global_state.set(TimelineModel.STATE_KEY, TimelineModel([1.0]).to_record())
+        self.assertIs(TimelineModel.load(), model)
+
+    def test_load_rereads_when_another_process_saves(self):
+        TimelineModel.create(3)
+        other = TimelineModel([5.0, 7.0, 5.0])
+        # What another process's save() does to the shared state
+        global_state.set(TimelineModel.STATE_KEY, other.to_record())
+        global_state.set(TimelineModel.VERSION_KEY, global_state.get(TimelineModel.VERSION_KEY) + 1)
+
+        loaded = TimelineModel.load()
+        self.assertEqual(loaded.durations, [5.0, 7.0, 5.0])
+        self.assertEqual(loaded.clip_at(6.0), 2)
+        self.assertIs(TimelineModel.load(), loaded)
+
+    def test_cleared_state_means_no_model(self):
+        TimelineModel.create(3)
+        global_state.delete(TimelineModel.STATE_KEY)
+        global_state.delete(TimelineModel.VERSION_KEY)
+        self.assertIsNone(TimelineModel.load())
+
+
+if __name__ == "__main__":
+    unittest.main()
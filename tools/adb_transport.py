@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+
+class AdbTransportError(Exception):
+    pass
+
+
+class AdbShellSession:
+    """
+    One long-lived `adb shell` process that we feed commands through stdin.
+    Each command is followed by a numbered end marker carrying its exit code,
+    so every reply is matched to the request that produced it. If the session
+    dies (cable pulled, adb server restarted) the next call reconnects.
+    """
+
+    MARKER = "__DROIDRUN_END__"
+
+    def __init__(self, serial=None, adb_path="adb"):
+        self.serial = serial or os.environ.get("ANDROID_SERIAL")
+        self.adb_path = adb_path
+        self._proc = None
+        self._lines = None
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # --- Connection ---
+
+    def _adb_cmd(self, *args):
+        cmd = [self.adb_path]
+        if self.serial:
+            cmd += ["-s", self.serial]
+        return cmd + list(args)
+
+    def _connect(self):
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        try:
+            self._proc = subprocess.Popen(
+                self._adb_cmd("shell"),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                startupinfo=startupinfo,
+            )
+        except FileNotFoundError:
+            raise AdbTransportError("ADB not found. Install Android SDK platform-tools.")
+
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines), daemon=True).start()
+
+        # Remote stderr would otherwise be lost; fold it into the reply
+        self._proc.stdin.write("exec 2>&1\n")
+        self._proc.stdin.flush()
+        print("🔌 ADB shell session opened")
+
+    @staticmethod
+    def _pump(proc, lines):
+        for line in proc.stdout:
+            lines.put(line.rstrip("\r\n"))
+        lines.put(None) # EOF: session is gone
+
+    def _alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+        self._proc = None
+        self._lines = None
+
+    # --- Commands ---
+
+    def run(self, command, timeout=10.0):
+        """
+        Runs a shell command on the device. Returns (exit_code, output).
+        Raises AdbTransportError if the session can't be (re)established or times out.
+        """
+        if "\n" in command:
+            raise ValueError("Shell commands must be a single line.")
+
+        with self._lock:
+            for attempt in range(2):
+                if not self._alive():
+                    self._connect()
+                try:
+                    return self._send(command, timeout)
+                except (BrokenPipeError, OSError, EOFError) as e:
+                    print(f"⚠️ ADB session lost ({e}). Reconnecting...")
+                    self._close()
+            raise AdbTransportError(f"ADB session unavailable for: {command}")
+
+    def _send(self, command, timeout):
+        seq = next(self._seq)
+        marker = f"{self.MARKER}{seq}"
+        self._proc.stdin.write(f"{command}; __rc=$?; printf '\\n{marker} %s\\n' \"$__rc\"\n")
+        self._proc.stdin.flush()
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                # The shell is stuck on this command; drop it so the next call starts clean
+                self._close()
+                raise AdbTransportError(f"Timed out after {timeout}s: {command}")
+
+            if line is None:
+                raise EOFError("adb shell exited")
+
+            if line.startswith(self.MARKER):
+                tag, _, rc = line.partition(" ")
+                if tag == marker:
+                    return int(rc or 0), "\n".join(output).rstrip("\n")
+                # Leftover reply of an earlier request; not ours
+                output = []
+                continue
+
+            output.append(line)
+
+    def run_args(self, args, timeout=10.0):
+        """Like run(), but quotes each argument (e.g. ['touch', '-t', ts, path])."""
+        return self.run(" ".join(shlex.quote(str(a)) for a in args), timeout=timeout)
+
+    async def run_async(self, command, timeout=10.0):
+        return await asyncio.to_thread(self.run, command, timeout)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_transport():
+    """Process-wide shell session shared by the GUI and the tools."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = AdbShellSession()
+        return _session
+
+
+def set_transport(session):
+    """Replaces the shared session (e.g. with a simulator); returns the previous one."""
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+        return previous
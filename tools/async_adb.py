@@ -0,0 +1,80 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.adb_transport import AdbTransportError, get_transport
+
+
+class AsyncAdb:
+    """
+    Coroutine-friendly ADB commands. Shell commands run on the persistent
+    session from a small worker pool, pushes use asyncio subprocesses, and
+    every call has a timeout so a stuck device can't hang the agent loop.
+    """
+
+    def __init__(self, transport=None, max_workers=2, timeout=10.0):
+        self.transport = transport or get_transport()
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adb")
+
+    async def shell(self, command, timeout=None):
+        """Returns (exit_code, output). Raises AdbTransportError on timeout."""
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self._pool, self.transport.run, command, timeout)
+        try:
+            # The session enforces the timeout itself; the margin covers waiting for its lock
+            return await asyncio.wait_for(job, timeout + 1.0)
+        except asyncio.TimeoutError:
+            raise AdbTransportError(f"Timed out after {timeout}s: {command}")
+
+    async def _input(self, command, timeout=None):
+        exit_code, output = await self.shell(command, timeout)
+        if exit_code != 0:
+            raise AdbTransportError(output or f"'{command}' exited with {exit_code}")
+        return output
+
+    async def tap(self, x, y, timeout=None):
+        return await self._input(f"input tap {int(x)} {int(y)}", timeout)
+
+    async def swipe(self, x1, y1, x2, y2, duration_ms=300, timeout=None):
+        # The swipe itself takes duration_ms on the device
+        timeout = (timeout or self.timeout) + duration_ms / 1000
+        return await self._input(
+            f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration_ms)}", timeout
+        )
+
+    async def push(self, local_path, remote_path, timeout=60.0):
+        cmd = [self.transport.adb_path]
+        if self.transport.serial:
+            cmd += ["-s", self.transport.serial]
+        cmd += ["push", os.fspath(local_path), remote_path]
+
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+            )
+        except FileNotFoundError:
+            raise AdbTransportError("ADB not found. Install Android SDK platform-tools.")
+
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise AdbTransportError(f"Push timed out after {timeout}s: {local_path}")
+
+        output = stdout.decode(errors="replace").strip()
+        if proc.returncode != 0:
+            raise AdbTransportError(output or f"adb push exited with {proc.returncode}")
+        return output
+
+
+_async_adb = None
+
+
+def get_async_adb():
+    global _async_adb
+    if _async_adb is None:
+        _async_adb = AsyncAdb()
+    return _async_adb
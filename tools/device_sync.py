@@ -0,0 +1,154 @@
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from plan_cache import file_sha256
+from tools.adb_transport import AdbTransportError, get_transport
+
+MANIFEST_NAME = ".droidrun_manifest.json"
+BASE_TIMESTAMP = datetime(2025, 1, 1, 12, 0, 0) # File i gets BASE + i seconds: gallery order = selection order
+DIRECTORY_SCAN_SDK = 29 # Android 10's media scanner walks a directory given to SCAN_FILE
+SCAN_FILE = "am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE -d {} > /dev/null"
+
+
+def _touch_stamp(position):
+    return (BASE_TIMESTAMP + timedelta(seconds=position)).strftime("%Y%m%d%H%M.%S")
+
+
+@dataclass
+class SyncPlan:
+    push: list = field(default_factory=list) # local paths
+    touch: list = field(default_factory=list) # (remote name, position) whose content or order changed
+    delete: list = field(default_factory=list) # remote names
+    unchanged: int = 0
+    manifest: dict = field(default_factory=dict)
+
+    @property
+    def empty(self):
+        return not (self.push or self.touch or self.delete)
+
+
+class DeviceSync:
+    """
+    Mirrors a list of local files into one device folder.
+
+    The folder keeps a manifest {remote name: {sha256, position}}. Only new or
+    changed files are pushed (one multi-file `adb push`), files no longer
+    selected are deleted, timestamps for everything that changed go out as
+    one shell invocation, and the folder is media-scanned with one broadcast.
+    """
+
+    def __init__(self, remote_dir, transport=None):
+        self.remote_dir = remote_dir.rstrip("/")
+        self.transport = transport or get_transport()
+
+    def _remote(self, name):
+        return f"{self.remote_dir}/{name}"
+
+    def _shell(self, command, timeout=30.0):
+        exit_code, output = self.transport.run(command, timeout)
+        if exit_code != 0:
+            raise AdbTransportError(output.strip() or f"'{command[:80]}' exited with {exit_code}")
+        return output
+
+    def remote_state(self):
+        """(manifest, names actually present in the folder)"""
+        d = shlex.quote(self.remote_dir)
+        output = self._shell(f"mkdir -p {d} && ls -1a {d} && echo __MANIFEST__ && (cat {d}/{MANIFEST_NAME} 2>/dev/null || true)")
+        listing, _, manifest_text = output.partition("__MANIFEST__")
+        present = {line.strip() for line in listing.splitlines()} - {"", ".", "..", MANIFEST_NAME}
+        try:
+            manifest = json.loads(manifest_text.strip() or "{}")
+        except json.JSONDecodeError:
+            manifest = {}
+        return (manifest if isinstance(manifest, dict) else {}), present
+
+    def plan(self, local_files):
+        manifest, present = self.remote_state()
+        plan = SyncPlan()
+
+        for position, path in enumerate(local_files):
+            name = os.path.basename(path)
+            entry = {"sha256": file_sha256(path), "position": position}
+            plan.manifest[name] = entry
+
+            old = manifest.get(name)
+            if name not in present or not old or old.get("sha256") != entry["sha256"]:
+                plan.push.append(path)
+                plan.touch.append((name, position))
+            elif old.get("position") != position:
+                plan.touch.append((name, position))
+            else:
+                plan.unchanged += 1
+
+        plan.delete = sorted(present - set(plan.manifest))
+        return plan
+
+    def _push(self, paths):
+        cmd = [self.transport.adb_path]
+        if self.transport.serial:
+            cmd += ["-s", self.transport.serial]
+        cmd += ["push", *paths, self.remote_dir + "/"]
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise AdbTransportError((e.stderr or e.stdout or "").strip() or "adb push failed")
+        except FileNotFoundError:
+            raise AdbTransportError("ADB not found. Install Android SDK platform-tools.")
+
+    def apply(self, plan):
+        if plan.delete:
+            self._shell("rm -f " + " ".join(shlex.quote(self._remote(n)) for n in plan.delete))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_path = os.path.join(tmp, MANIFEST_NAME)
+            with open(manifest_path, "w") as f:
+                json.dump(plan.manifest, f)
+            # The manifest rides along with the changed files: still a single push
+            self._push(plan.push + [manifest_path])
+
+        if plan.touch:
+            self._shell(" && ".join(
+                f"touch -t {_touch_stamp(position)} {shlex.quote(self._remote(name))}" for name, position in plan.touch
+            ))
+
+        if plan.touch or plan.delete:
+            self._shell(self.scan_command(plan), timeout=max(30.0, 0.5 * (len(plan.touch) + len(plan.delete))))
+
+    def scan_command(self, plan):
+        """
+        One SCAN_FILE broadcast on the folder: from Android 10 the scanner
+        walks it and drops rows for files that are gone. Older scanners only
+        take files, so there every changed and deleted file gets its own.
+        """
+        # Deleted files are scanned too so MediaStore drops them
+        names = [name for name, _ in plan.touch] + plan.delete
+        per_file = "; ".join(SCAN_FILE.format(shlex.quote("file://" + self._remote(name))) for name in names)
+        return (
+            f'if [ "$(getprop ro.build.version.sdk)" -ge {DIRECTORY_SCAN_SDK} ]; '
+            f"then {SCAN_FILE.format(shlex.quote('file://' + self.remote_dir))}; "
+            f"else {per_file}; fi"
+        )
+
+    def sync(self, local_files, status_callback=None):
+        started = time.perf_counter()
+        report = status_callback or (lambda msg, progress: None)
+
+        report("Comparing with device...", 10)
+        plan = self.plan(local_files)
+        if plan.empty:
+            report(f"Device already up to date ({plan.unchanged} files)", 90)
+            return plan
+
+        report(f"Pushing {len(plan.push)} new/changed, deleting {len(plan.delete)} stale, {plan.unchanged} unchanged...", 30)
+        self.apply(plan)
+        print(
+            f"📲 Synced {len(local_files)} files in {time.perf_counter() - started:.1f}s: "
+            f"{len(plan.push)} pushed, {len(plan.touch)} re-dated, {len(plan.delete)} deleted, {plan.unchanged} unchanged"
+        )
+        return plan
@@ -0,0 +1,375 @@
+import math
+import os
+import re
+import struct
+
+from redis_state import global_state
+from tools.adb_transport import AdbTransportError, get_transport
+from tools.async_adb import get_async_adb
+
+# linux/input-event-codes.h
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+SYN_REPORT = 0
+BTN_TOUCH = 330
+ABS_MT_SLOT = 47
+ABS_MT_TOUCH_MAJOR = 48
+ABS_MT_POSITION_X = 53
+ABS_MT_POSITION_Y = 54
+ABS_MT_TRACKING_ID = 57
+ABS_MT_PRESSURE = 58
+TRACKING_ID_NONE = 4294967295 # -1 as sendevent expects it
+
+# struct input_event: struct timeval, __u16 type, __u16 code, __s32 value.
+# The kernel stamps the time itself, so we send zeros.
+EVENT_FORMATS = {24: "<qqHHI", 16: "<iiHHI"} # By size: 64-bit / 32-bit userspace
+RECORDS_PER_BLOCK = 170 # dd block size in records; keeps every read record-aligned
+
+FRAME_MS = 32 # One finger move every two display frames: enough samples for the fling velocity
+DELAY_FIFO = "/data/local/tmp/.droidrun_delay" # Never written: `read -t` on it is a builtin sleep
+
+
+class TouchProfile:
+    """
+    What we need to know about the touchscreen to speak its raw protocol:
+    the /dev/input node, the ABS axis ranges and the screen size they map to.
+    Calibrated once per device from `getevent -pl` and `wm size`.
+    """
+
+    def __init__(self, device, x_range, y_range, screen_size, has_slots=True,
+                 has_btn_touch=True, pressure_max=None, touch_major_max=None, event_size=24,
+                 builtin_delay=False):
+        self.device = device
+        self.x_range = tuple(x_range)
+        self.y_range = tuple(y_range)
+        self.screen_size = tuple(screen_size)
+        self.has_slots = has_slots
+        self.has_btn_touch = has_btn_touch
+        self.pressure_max = pressure_max
+        self.touch_major_max = touch_major_max
+        self.event_size = event_size # sizeof(struct input_event) for the writing process
+        self.builtin_delay = builtin_delay # The shell is mksh: wait with `read -t`, not an external `sleep`
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_device(self, x, y):
+        """Screen pixels -> raw ABS values (assumes natural portrait orientation)."""
+        width, height = self.screen_size
+        x_min, x_max = self.x_range
+        y_min, y_max = self.y_range
+        dev_x = x_min + round(x * (x_max - x_min) / max(1, width - 1))
+        dev_y = y_min + round(y * (y_max - y_min) / max(1, height - 1))
+        return max(x_min, min(x_max, dev_x)), max(y_min, min(y_max, dev_y))
+
+    @classmethod
+    def parse(cls, getevent_output, wm_size_output, abi_output="", shell_version=""):
+        """Picks the first input device that reports multi-touch X/Y axes."""
+        size_match = re.findall(r"(\d+)x(\d+)", wm_size_output)
+        if not size_match:
+            return None
+        # 'Override size' comes last when present and is what apps see
+        screen_size = tuple(int(v) for v in size_match[-1])
+
+        devices = []
+        for line in getevent_output.splitlines():
+            added = re.match(r"add device \d+: (\S+)", line)
+            if added:
+                devices.append({"device": added.group(1), "abs": {}, "btn_touch": False})
+                continue
+            if not devices:
+                continue
+            if "BTN_TOUCH" in line:
+                devices[-1]["btn_touch"] = True
+            axis = re.search(r"(ABS_MT_\w+)\s*:.*min (-?\d+), max (-?\d+)", line)
+            if axis:
+                devices[-1]["abs"][axis.group(1)] = (int(axis.group(2)), int(axis.group(3)))
+
+        for dev in devices:
+            axes = dev["abs"]
+            if "ABS_MT_POSITION_X" in axes and "ABS_MT_POSITION_Y" in axes:
+                return cls(
+                    device=dev["device"],
+                    x_range=axes["ABS_MT_POSITION_X"],
+                    y_range=axes["ABS_MT_POSITION_Y"],
+                    screen_size=screen_size,
+                    has_slots="ABS_MT_SLOT" in axes,
+                    has_btn_touch=dev["btn_touch"],
+                    pressure_max=axes.get("ABS_MT_PRESSURE", (0, None))[1],
+                    touch_major_max=axes.get("ABS_MT_TOUCH_MAJOR", (0, None))[1],
+                    # dd runs as the primary ABI; its timeval is 8 or 16 bytes
+                    event_size=24 if "64" in abi_output or not abi_output.strip() else 16,
+                    builtin_delay="MIRBSD KSH" in shell_version,
+                )
+        return None
+
+    @classmethod
+    def detect(cls, transport):
+        _, events = transport.run("getevent -pl", timeout=5.0)
+        _, size = transport.run("wm size", timeout=5.0)
+        _, abi = transport.run("getprop ro.product.cpu.abi", timeout=5.0)
+        _, shell = transport.run("echo $KSH_VERSION", timeout=5.0)
+        return cls.parse(events, size, abi, shell)
+
+
+class SendeventInjector:
+    """
+    Injects touches by writing raw multi-touch events (what `sendevent`
+    speaks) to the touchscreen node. A whole gesture is one shell line over
+    the persistent session: the shell's builtin `print` feeds prebuilt
+    input_event records, one frame at a time, into a single `dd` that holds
+    the node open. No `input` JVM start and no process per event; on mksh
+    the gaps between frames are builtin `read -t` waits on an idle FIFO, so
+    no process per frame either.
+    """
+
+    def __init__(self, profile: TouchProfile, transport=None):
+        self.profile = profile
+        self.transport = transport or get_transport()
+        self._tracking_id = 0
+
+    # --- Event generation (pure, so a mock transport can check the output) ---
+
+    def frames_to_events(self, frames):
+        """
+        frames: list of (contacts, hold_ms) where contacts maps slot -> (x, y)
+        for every finger down in that frame. A slot missing from the next frame
+        is lifted. Returns a list of (type, code, value) or ('sleep', ms).
+        """
+        p = self.profile
+        events = []
+        down = {}
+        current_slot = None
+
+        def select(slot):
+            nonlocal current_slot
+            if p.has_slots and slot != current_slot:
+                events.append((EV_ABS, ABS_MT_SLOT, slot))
+                current_slot = slot
+
+        for contacts, hold_ms in frames:
+            was_down = bool(down)
+            for slot in sorted(down):
+                if slot not in contacts:
+                    select(slot)
+                    events.append((EV_ABS, ABS_MT_TRACKING_ID, TRACKING_ID_NONE))
+                    del down[slot]
+            if was_down and not contacts and p.has_btn_touch:
+                events.append((EV_KEY, BTN_TOUCH, 0))
+
+            for slot, (x, y) in sorted(contacts.items()):
+                dev_x, dev_y = p.to_device(x, y)
+                select(slot)
+                if slot not in down:
+                    self._tracking_id = (self._tracking_id + 1) % 65535
+                    events.append((EV_ABS, ABS_MT_TRACKING_ID, self._tracking_id))
+                    if not down and p.has_btn_touch:
+                        events.append((EV_KEY, BTN_TOUCH, 1))
+                    if p.touch_major_max:
+                        events.append((EV_ABS, ABS_MT_TOUCH_MAJOR, max(1, p.touch_major_max // 20)))
+                    if p.pressure_max:
+                        events.append((EV_ABS, ABS_MT_PRESSURE, max(1, p.pressure_max // 2)))
+                if down.get(slot, (None, None))[0] != dev_x:
+                    events.append((EV_ABS, ABS_MT_POSITION_X, dev_x))
+                if down.get(slot, (None, None))[1] != dev_y:
+                    events.append((EV_ABS, ABS_MT_POSITION_Y, dev_y))
+                down[slot] = (dev_x, dev_y)
+
+            events.append((EV_SYN, SYN_REPORT, 0))
+            if hold_ms > 0:
+                events.append(("sleep", hold_ms))
+        return events
+
+    @staticmethod
+    def _path(points, duration_ms):
+        """Splits a polyline into ~FRAME_MS steps, timed by segment length."""
+        lengths = [math.dist(a, b) for a, b in zip(points, points[1:])]
+        total = sum(lengths) or 1.0
+        path = [points[0]]
+        for (a, b), length in zip(zip(points, points[1:]), lengths):
+            steps = max(1, round(duration_ms * length / total / FRAME_MS))
+            for i in range(1, steps + 1):
+                t = i / steps
+                path.append((a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t))
+        return path
+
+    def tap_events(self, x, y, hold_ms=40):
+        return self.frames_to_events([({0: (x, y)}, hold_ms), ({}, 0)])
+
+    def drag_events(self, points, duration_ms=300, hold_ms=0):
+        path = self._path(points, duration_ms)
+        frame_ms = duration_ms / max(1, len(path) - 1)
+        frames = [({0: pt}, frame_ms) for pt in path[:-1]]
+        frames.append(({0: path[-1]}, hold_ms))
+        frames.append(({}, 0))
+        return self.frames_to_events(frames)
+
+    def pinch_events(self, cx, cy, start_span, end_span, duration_ms=400, hold_ms=100):
+        """Two fingers on a horizontal line around (cx, cy). end < start zooms out."""
+        steps = max(1, round(duration_ms / FRAME_MS))
+        frames = []
+        for i in range(steps + 1):
+            half = (start_span + (end_span - start_span) * i / steps) / 2
+            frames.append(({0: (cx - half, cy), 1: (cx + half, cy)}, duration_ms / steps if i < steps else hold_ms))
+        frames.append(({}, 0))
+        return self.frames_to_events(frames)
+
+    def to_records(self, events):
+        """[bytes | ('sleep', ms)]: the events packed as input_event records, one chunk per frame run between sleeps."""
+        record = struct.Struct(EVENT_FORMATS[self.profile.event_size])
+        chunks, pending = [], b""
+        for event in events:
+            if event[0] == "sleep":
+                if pending:
+                    chunks.append(pending)
+                    pending = b""
+                chunks.append(event)
+            else:
+                pending += record.pack(0, 0, event[0], event[1], event[2] & 0xFFFFFFFF)
+        if pending:
+            chunks.append(pending)
+        return chunks
+
+    def to_script(self, events):
+        delay = "read -t {:.3f} -u9" if self.profile.builtin_delay else "sleep {:.3f}"
+        parts = []
+        for chunk in self.to_records(events):
+            if isinstance(chunk, tuple):
+                parts.append(delay.format(chunk[1] / 1000))
+            else:
+                parts.append(f"print -n '{_octal(chunk)}'")
+        block = self.profile.event_size * RECORDS_PER_BLOCK
+        writer = f"| dd of={self.profile.device} bs={block} 2>/dev/null"
+        if not self.profile.builtin_delay:
+            return f"{{ {'; '.join(parts)}; }} {writer}"
+        # fd 9 opened read-write never sees EOF, so each read waits out its timeout
+        return f"{{ [ -p {DELAY_FIFO} ] || mkfifo {DELAY_FIFO}; }} && {{ {'; '.join(parts)}; }} 9<>{DELAY_FIFO} {writer}"
+
+    # --- Gestures ---
+
+    async def _send(self, events, duration_ms=0):
+        script = self.to_script(events)
+        exit_code, output = await self.transport.run_async(script, timeout=5.0 + duration_ms / 1000)
+        if exit_code != 0:
+            raise AdbTransportError(output or f"Event write exited with {exit_code}")
+
+    async def tap(self, x, y):
+        await self._send(self.tap_events(x, y))
+
+    async def swipe(self, x1, y1, x2, y2, duration_ms=300, hold_ms=0):
+        await self.drag([(x1, y1), (x2, y2)], duration_ms, hold_ms)
+
+    async def drag(self, points, duration_ms=300, hold_ms=0):
+        await self._send(self.drag_events(points, duration_ms, hold_ms), duration_ms + hold_ms)
+
+    async def pinch(self, cx, cy, start_span, end_span, duration_ms=400, hold_ms=100):
+        await self._send(self.pinch_events(cx, cy, start_span, end_span, duration_ms, hold_ms), duration_ms + hold_ms)
+
+
+def _octal(data):
+    """Bytes as a single-quoted mksh `print` argument: letters as-is, everything else \\0ooo."""
+    return "".join(chr(b) if chr(b).isalpha() and b < 128 else f"\\0{b:03o}" for b in data)
+
+
+def _unoctal(text):
+    return bytes(int(m[2:], 8) if m.startswith("\\") else ord(m) for m in re.findall(r"\\0[0-7]{3}|.", text))
+
+
+class MockTransport:
+    """
+    Stands in for the shell session: records every command and answers with
+    canned output, so the emitted event sequences can be checked offline.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.commands = []
+
+    def run(self, command, timeout=10.0):
+        self.commands.append(command)
+        return 0, self.responses.get(command, "")
+
+    async def run_async(self, command, timeout=10.0):
+        return self.run(command, timeout)
+
+    def events(self, event_size=24):
+        """Decodes every injector script sent so far back into event tuples."""
+        record = struct.Struct(EVENT_FORMATS[event_size])
+        decoded = []
+        for command in self.commands:
+            for kind, arg in re.findall(r"(print -n|sleep|read -t) ('[^']*'|[\d.]+)", command):
+                if kind != "print -n":
+                    decoded.append(("sleep", round(float(arg) * 1000)))
+                    continue
+                for _, _, type_, code, value in record.iter_unpack(_unoctal(arg.strip("'"))):
+                    decoded.append((type_, code, value))
+        return decoded
+
+
+class InputCommandBackend:
+    """
+    Fallback: the stock `input` command (one app_process JVM per gesture).
+    Single finger only, so there is no pinch.
+    """
+
+    async def tap(self, x, y):
+        await get_async_adb().tap(x, y)
+
+    async def swipe(self, x1, y1, x2, y2, duration_ms=300, hold_ms=0):
+        await get_async_adb().swipe(x1, y1, x2, y2, duration_ms + hold_ms)
+
+    async def drag(self, points, duration_ms=300, hold_ms=0):
+        # `input` can't chain segments, so each one is its own swipe
+        lengths = [math.dist(a, b) for a, b in zip(points, points[1:])]
+        total = sum(lengths) or 1.0
+        for (a, b), length in zip(zip(points, points[1:]), lengths):
+            await get_async_adb().swipe(a[0], a[1], b[0], b[1], max(1, int(duration_ms * length / total)))
+
+
+_backend = None
+
+
+def get_input_backend():
+    """
+    sendevent injector when the touchscreen can be calibrated, else `input`.
+    Set DROIDRUN_INPUT=input to force the stock command.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    if os.environ.get("DROIDRUN_INPUT", "sendevent") == "sendevent":
+        try:
+            cached = global_state.get("touch_profile")
+            # Profiles cached before builtin_delay existed are re-detected once
+            profile = TouchProfile.from_dict(cached) if isinstance(cached, dict) and "builtin_delay" in cached else None
+            if profile is None:
+                profile = TouchProfile.detect(get_transport())
+                if profile:
+                    global_state.set("touch_profile", profile.to_dict())
+            if profile:
+                print(f"👆 Input: sendevent on {profile.device} (screen {profile.screen_size[0]}x{profile.screen_size[1]})")
+                _backend = SendeventInjector(profile)
+                return _backend
+        except AdbTransportError as e:
+            print(f"⚠️ Touch calibration failed: {e}")
+
+    print("👆 Input: falling back to 'input' command")
+    _backend = InputCommandBackend()
+    return _backend
+
+
+def use_input_command():
+    """Drops to the `input` backend, e.g. after sendevent was refused by the device."""
+    global _backend
+    _backend = InputCommandBackend()
+
+
+def set_input_backend(backend):
+    """Installs `backend` (e.g. a simulator's) process-wide; returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
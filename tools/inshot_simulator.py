@@ -0,0 +1,703 @@
+import asyncio
+import json
+import math
+import random
+from contextlib import contextmanager
+
+from redis_state import global_state
+from tools.adb_transport import set_transport
+from tools.input_injector import set_input_backend
+from tools.inshot_tools import InshotTools
+from tools.timeline_model import TimelineModel
+
+PACKAGE = "com.camerasideas.instashot"
+SCREEN_W, SCREEN_H = 1080, 2400
+
+# Editor geometry, taken from a real dump (test_ui_state.json)
+TOOLBAR = (0, 1930, 1080, 2098)
+TOOLBAR_ITEM_W = 166
+TIMELINE = (0, 2098, 1080, 2361)
+TRACK_TOP, TRACK_BOTTOM = 2114, 2229
+EFFECT_ROW = (2236, 2296)
+JUNCTION_HIT_PX = 40 # Transition icon sits on the track's bottom edge at each junction
+HANDLE_HIT_PX = 30
+
+MAIN_TOOLBAR = [
+    ("btn_canvas", "Canvas"), ("btn_music", "Audio"), ("btn_sticker", "Sticker"), ("btn_text", "Text"),
+    ("btn_effect", "Effect"), ("btn_filter", "Filter"), ("btn_pip", "PIP"), ("btn_adjust", "Adjust"),
+    ("btn_background", "Background"),
+]
+CLIP_TOOLBAR = [
+    ("btn_canvas", "Canvas"), ("btn_precut", "Precut"), ("btn_split", "Split"), ("btn_speed", "Speed"),
+    ("btn_volume", "Volume"), ("btn_animation", "Animation"), ("btn_filter", "Filter"), ("btn_effect", "Effect"),
+    ("btn_duration", "Duration"), ("btn_crop", "Crop"), ("btn_delete", "Delete"), ("btn_copy", "Copy"),
+]
+
+# BASIC transitions in on-screen order (transitions.json counts from the label)
+TRANSITIONS = [
+    "none", "mix", "fade", "blur", "circlefade", "wipe right", "wipe left",
+    "wipe down", "wipe up", "slide right", "slide left", "slide down", "slide up",
+]
+TRANSITION_ITEM_W = 148
+TRANSITION_VISIBLE = 7
+TRANSITION_PAGE = 4 # The row snaps by this many items per swipe
+TRANSITION_ROW = (2060, 2208)
+
+CATEGORY_ROW = (1960, 2030)
+CATEGORY_W = 170
+EFFECT_TILE_ROW = (2060, 2290)
+EFFECT_TILE_W, EFFECT_TILE_PITCH = 220, 230
+
+# Written by calibration / seeking; saved and restored around install()
+CALIBRATION_KEYS = (
+    "px/sec", "zoom_base_px/sec", InshotTools.ZOOM_LEVELS_KEY, "timeline_center", "y_width",
+    TimelineModel.STATE_KEY, TimelineModel.VERSION_KEY, "seek_model",
+)
+
+
+def _format_time(seconds):
+    seconds = round(max(0.0, seconds), 1)
+    return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+
+def _inside(bounds, x, y):
+    x1, y1, x2, y2 = bounds
+    return x1 <= x <= x2 and y1 <= y <= y2
+
+
+class InshotSimulator:
+    """
+    Offline stand-in for a phone running the InShot editor, speaking the
+    droidrun Tools surface (get_state, tap_on_index, swipe, input_text) plus
+    the raw tap / swipe / pinch gestures InshotTools sends through the input
+    backend. Use `install()` to route InshotTools to it.
+
+    The editor opens with `num_clips` photo clips of `clip_seconds` each and
+    the playhead at 0. Screens, resource IDs and geometry follow real dumps:
+    toolbar, timeline track, Duration panel and dialog, Effect track and
+    picker, Transition panel and the "apply to all" confirmation.
+
+    Physics: a timeline drag moves 1px = 1/px_per_sec s. Released without a
+    hold, the timeline flings fling_gain_ms * velocity px further (with
+    fling_noise relative jitter) and eases into place with time constant
+    settle_tau. Screen changes show up ui_latency after the tap that caused
+    them and every UI dump costs dump_latency. All of it runs on a virtual
+    clock (`now`), so thousands of edits take seconds of wall time.
+
+    Ground truth lives in a private TimelineModel (never saved) plus the
+    effect blocks; `summary()` reports it for comparison with what the tools
+    believe.
+    """
+
+    def __init__(self, num_clips=4, px_per_sec=100.8, clip_seconds=5.0, fling_gain_ms=150.0,
+                 fling_noise=0.25, min_fling_velocity=0.3, settle_tau=0.05, ui_latency=0.12,
+                 dump_latency=0.25, tap_latency=0.04, transition_seconds=1.0, effect_seconds=3.0,
+                 effects_path="effects.json", seed=0):
+        self.px_per_sec = float(px_per_sec)
+        self.clip_seconds = float(clip_seconds)
+        self.fling_gain_ms = fling_gain_ms
+        self.fling_noise = fling_noise
+        self.min_fling_velocity = min_fling_velocity
+        self.settle_tau = settle_tau
+        self.ui_latency = ui_latency
+        self.dump_latency = dump_latency
+        self.tap_latency = tap_latency
+        self.transition_seconds = transition_seconds
+        self.effect_seconds = effect_seconds
+        self.rng = random.Random(seed)
+
+        with open(effects_path, "r") as f:
+            effects = json.load(f)["Effects"]
+        self.categories = {}
+        for name, group in effects.items():
+            self.categories.setdefault(group, []).append(name)
+
+        self.truth = TimelineModel([self.clip_seconds] * num_clips)
+        self.transition_types = {}
+        self.effects = [] # [start, end, name]
+
+        self.now = 0.0
+        self.playhead_x = TIMELINE[2] // 2
+        self._position = 0.0
+        self._fling = None # (release time, released at, comes to rest at)
+        self._pending = [] # (ready at, screen change)
+        self._last_elements = []
+
+        self.mode = "editor"
+        self.selected_clip = None
+        self.junction = None
+        self.pending_duration = None
+        self.dialog_text = ""
+        self.selected_block = None
+        self.clip_end_chip = False
+        self.category = next(iter(self.categories))
+        self.picked_effect = None
+        self.picked_transition = None
+        self.toolbar_scroll = {"editor": 0, "clip": 0}
+        self.category_scroll = 0
+        self.grid_scroll = 0
+        self.transition_scroll = 0
+
+        self.stats = {
+            "get_state": 0, "taps": 0, "swipes": 0, "pinches": 0, "inputs": 0,
+            "sleeps": 0, "sleep_seconds": 0.0, "edits": 0,
+        }
+
+    # --- Clock ---
+
+    def _later(self, change):
+        self._pending.append((self.now + self.ui_latency, change))
+
+    def _advance(self):
+        while self._pending and self._pending[0][0] <= self.now:
+            _, change = self._pending.pop(0)
+            change()
+
+    def settle(self):
+        """Lets every pending screen change and fling finish."""
+        if self._pending:
+            self.now = max(self.now, self._pending[-1][0])
+        if self._fling:
+            self.now = max(self.now, self._fling[0] + 8 * self.settle_tau)
+        self._advance()
+        self._stop_fling()
+
+    async def sleep(self, seconds):
+        self.stats["sleeps"] += 1
+        self.stats["sleep_seconds"] += seconds
+        self.now += seconds
+        await asyncio.sleep(0)
+
+    # --- Timeline physics ---
+
+    @property
+    def position(self):
+        if self._fling:
+            released, start, rest = self._fling
+            elapsed = self.now - released
+            if elapsed > 8 * self.settle_tau:
+                self._position, self._fling = rest, None
+            else:
+                return rest + (start - rest) * math.exp(-elapsed / self.settle_tau)
+        return self._position
+
+    def _stop_fling(self):
+        self._position = self.position
+        self._fling = None
+
+    def _clamp_time(self, t):
+        return max(0.0, min(self.truth.total_duration(), t))
+
+    def _x_of(self, t):
+        return self.playhead_x + (t - self.position) * self.px_per_sec
+
+    def _time_of(self, x):
+        return self.position + (x - self.playhead_x) / self.px_per_sec
+
+    def _drag_timeline(self, x1, x2, duration_ms, hold_ms):
+        self._stop_fling()
+        dx = x2 - x1
+        released = self._clamp_time(self._position - dx / self.px_per_sec)
+        velocity = abs(dx) / max(1.0, duration_ms)
+        if hold_ms or velocity < self.min_fling_velocity:
+            self._position = released
+            return
+        fling_px = self.fling_gain_ms * velocity * max(0.0, 1.0 + self.rng.gauss(0.0, self.fling_noise))
+        rest = self._clamp_time(released - math.copysign(fling_px, dx) / self.px_per_sec)
+        self._position = released
+        self._fling = (self.now, released, rest)
+
+    # --- Rendering ---
+
+    def _render(self):
+        """[(bounds, resource id, class name, text, on_tap)] for the current screen."""
+        nodes = []
+
+        def add(bounds, rid="", cls="android.view.View", text=None, on_tap=None, clip=(0, 0, SCREEN_W, SCREEN_H)):
+            x1, y1, x2, y2 = (int(round(v)) for v in bounds)
+            x1, y1, x2, y2 = max(x1, clip[0]), max(y1, clip[1]), min(x2, clip[2]), min(y2, clip[3])
+            if x2 > x1 and y2 > y1:
+                nodes.append(((x1, y1, x2, y2), rid, cls, text, on_tap))
+
+        noop = lambda x, y: None
+        add((0, 0, 1080, 2400), cls="android.widget.FrameLayout")
+        add((0, 78, 147, 209), "btn_back", "android.widget.ImageButton", on_tap=lambda x, y: self._set_mode("editor"))
+        add((147, 78, 278, 209), "btn_help", "android.widget.ImageView", on_tap=noop)
+        add((866, 78, 1080, 209), "text_save", "android.widget.TextView", "Export", on_tap=noop)
+        add((0, 356, 1080, 1799), "middle_layout", "android.widget.FrameLayout")
+        add((0, 537, 1080, 1617), "video_view", "android.widget.FrameLayout")
+        add((0, 537, 1080, 1617), "item_view", "android.view.View")
+        add((26, 1799, 89, 1930), "ivOpBack", "android.widget.ImageView", on_tap=noop)
+        add((121, 1799, 184, 1930), "ivOpForward", "android.widget.ImageView", on_tap=noop)
+        add((475, 1799, 606, 1930), "btn_ctrl", "android.widget.ImageView", on_tap=noop)
+        add((893, 1799, 959, 1930), "btn_keyframe", "android.widget.ImageView", on_tap=noop)
+        add((991, 1799, 1054, 1930), "btn_preview", "android.widget.ImageView", on_tap=noop)
+
+        getattr(self, f"_render_{self.mode}")(add, noop)
+        return nodes
+
+    def _render_toolbar(self, add, items, scroll):
+        add(TOOLBAR, "hs_video_toolbar", "android.widget.HorizontalScrollView")
+        for i, (rid, title) in enumerate(items):
+            x1 = i * TOOLBAR_ITEM_W - scroll
+            if x1 + TOOLBAR_ITEM_W <= 0 or x1 >= SCREEN_W:
+                continue
+            add((x1, 1930, x1 + TOOLBAR_ITEM_W, 2098), rid, "android.view.ViewGroup",
+                on_tap=lambda x, y, t=title: self._on_tool(t), clip=TOOLBAR)
+            add((x1, 2038, x1 + TOOLBAR_ITEM_W, 2075), "title", "android.widget.TextView", title, clip=TOOLBAR)
+
+    def _render_timeline(self, add, noop, hint=None):
+        add(TIMELINE, "timeline_seekBar", "androidx.recyclerview.widget.RecyclerView", on_tap=self._on_track)
+        thumb_w = self.clip_seconds * self.px_per_sec / 3
+        start_x = self._x_of(0.0)
+        add((start_x - self.playhead_x, TRACK_TOP, start_x, TRACK_BOTTOM), "layout", "android.view.ViewGroup", clip=TIMELINE)
+        for i in range(1, len(self.truth) + 1):
+            start, end = self.truth.clip_range(i)
+            x1, x2 = self._x_of(start), self._x_of(end)
+            if x2 < 0 or x1 > SCREEN_W:
+                continue
+            for k in range(max(1, math.ceil((x2 - x1) / thumb_w - 1e-6))):
+                left = x1 + k * thumb_w
+                add((left, TRACK_TOP, min(left + thumb_w, x2), TRACK_BOTTOM), "layout", "android.view.ViewGroup", clip=TIMELINE)
+        end_x = self._x_of(self.truth.total_duration())
+        add((end_x, TRACK_TOP, end_x + self.playhead_x, TRACK_BOTTOM), "layout", "android.view.ViewGroup", clip=TIMELINE)
+        if hint:
+            add((400, 2240, 680, 2276), "title", "android.widget.TextView", hint)
+        add((45, 2119, 150, 2224), "btn_fam", "android.widget.ImageView", on_tap=noop)
+        add((409, 2329, 672, 2361), "current_position", "android.widget.TextView", _format_time(self.position))
+        add((984, 2329, 1054, 2361), "total_clips_duration", "android.widget.TextView", _format_time(self.truth.total_duration()))
+
+    def _render_editor(self, add, noop):
+        self._render_toolbar(add, MAIN_TOOLBAR, self.toolbar_scroll["editor"])
+        self._render_timeline(add, noop, hint="Select one track to edit.")
+
+    def _render_clip(self, add, noop):
+        self._render_toolbar(add, CLIP_TOOLBAR, self.toolbar_scroll["clip"])
+        self._render_timeline(add, noop)
+
+    def _render_duration(self, add, noop):
+        value = self.pending_duration if self.pending_duration is not None else self.truth.durations[self.selected_clip - 1]
+        add((0, 1900, 1080, 2400), "duration_layout", "android.widget.FrameLayout")
+        add((60, 1960, 500, 2030), "", "android.widget.TextView", "Duration")
+        add((560, 1960, 880, 2030), "text_duration", "android.widget.TextView", f"{value:.1f}s")
+        add((880, 1940, 990, 2050), "btn_edit_duration", "android.widget.ImageView", on_tap=lambda x, y: self._set_mode("duration_dialog"))
+        add((60, 2080, 1020, 2180), "seek_bar", "android.widget.SeekBar", on_tap=noop)
+        add((960, 2250, 1060, 2350), "btn_apply", "android.widget.ImageView", on_tap=lambda x, y: self._apply_duration())
+
+    def _render_duration_dialog(self, add, noop):
+        add((90, 1000, 990, 1500), "", "android.widget.FrameLayout")
+        add((140, 1050, 940, 1110), "", "android.widget.TextView", "Duration")
+        add((140, 1160, 940, 1280), "edit_text", "android.widget.EditText", self.dialog_text, on_tap=noop)
+        add((520, 1360, 720, 1460), "btn_cancel", "android.widget.TextView", "Cancel", on_tap=lambda x, y: self._set_mode("duration"))
+        add((760, 1360, 940, 1460), "btn_ok", "android.widget.TextView", "OK", on_tap=lambda x, y: self._confirm_duration())
+
+    def _render_effect(self, add, noop):
+        add(TOOLBAR, "effect_tool_layout", "android.widget.FrameLayout")
+        add((40, 1950, 240, 2080), "btn_add_effect", "android.widget.TextView", "Effect", on_tap=lambda x, y: self._set_mode("effect_picker"))
+        add((960, 1950, 1060, 2080), "btn_apply", "android.widget.ImageView", on_tap=lambda x, y: self._close_effects())
+        self._render_timeline(add, noop)
+        add((0, EFFECT_ROW[0], SCREEN_W, EFFECT_ROW[1]), "effect_track", "android.view.ViewGroup", on_tap=self._on_effect_row)
+        for block in self.effects:
+            x1, x2 = self._x_of(block[0]), self._x_of(block[1])
+            if x2 < 0 or x1 > SCREEN_W:
+                continue
+            bounds = (x1, EFFECT_ROW[0], x2, EFFECT_ROW[1])
+            add(bounds, "", "android.view.ViewGroup")
+            add(bounds, "", "android.view.View")
+            add((x1 + 10, EFFECT_ROW[0] + 8, x2 - 10, EFFECT_ROW[1] - 8), "", "android.widget.TextView", block[2])
+        if self.clip_end_chip and self.selected_block is not None:
+            x = self._x_of(self.selected_block[1])
+            add((x - 80, 1840, x + 80, 1920), "textClipEnd", "android.widget.TextView", "Clip end", on_tap=lambda x, y: self._extend_to_clip_end())
+
+    def _render_effect_picker(self, add, noop):
+        add((0, 1820, 1080, 2400), "effect_layout", "android.widget.FrameLayout")
+        add((960, 1840, 1060, 1930), "btn_apply", "android.widget.ImageView", on_tap=lambda x, y: self._apply_picked_effect())
+        add((0, CATEGORY_ROW[0], SCREEN_W, CATEGORY_ROW[1]), "tab_layout", "androidx.recyclerview.widget.RecyclerView")
+        for i, group in enumerate(self.categories):
+            x1 = 20 + i * CATEGORY_W - self.category_scroll
+            add((x1, CATEGORY_ROW[0], x1 + CATEGORY_W - 10, CATEGORY_ROW[1]), "", "android.widget.TextView", group,
+                on_tap=lambda x, y, g=group: self._pick_category(g))
+        add((0, EFFECT_TILE_ROW[0], SCREEN_W, EFFECT_TILE_ROW[1]), "recycler_view", "androidx.recyclerview.widget.RecyclerView")
+        for i, name in enumerate(self.categories[self.category]):
+            x1 = 20 + i * EFFECT_TILE_PITCH - self.grid_scroll
+            add((x1, EFFECT_TILE_ROW[0], x1 + EFFECT_TILE_W, EFFECT_TILE_ROW[1]), "", "android.widget.TextView", name.upper(),
+                on_tap=lambda x, y, n=name: setattr(self, "picked_effect", n))
+
+    def _render_transition(self, add, noop):
+        add((0, 1830, 1080, 2400), "transition_layout", "android.widget.FrameLayout")
+        add((40, 1990, 200, 2040), "", "android.widget.TextView", "BASIC")
+        for i, name in enumerate(TRANSITIONS[self.transition_scroll:self.transition_scroll + TRANSITION_VISIBLE]):
+            x1 = 40 + i * TRANSITION_ITEM_W
+            add((x1, TRANSITION_ROW[0], x1 + TRANSITION_ITEM_W - 8, TRANSITION_ROW[1]), "", "android.widget.ImageView",
+                on_tap=lambda x, y, n=name: setattr(self, "picked_transition", n))
+        add((40, 2260, 400, 2350), "btnApplyAll", "android.widget.TextView", "Apply to all", on_tap=lambda x, y: self._set_mode("apply_all_confirm"))
+        add((960, 2250, 1060, 2350), "btnApply", "android.widget.ImageView", on_tap=lambda x, y: self._apply_transition(all_junctions=False))
+
+    def _render_apply_all_confirm(self, add, noop):
+        add((90, 1000, 990, 1400), "", "android.widget.FrameLayout")
+        add((140, 1060, 940, 1160), "", "android.widget.TextView", "Apply the transition to all clips?")
+        add((140, 1260, 500, 1360), "cancelTextView", "android.widget.TextView", "Cancel", on_tap=lambda x, y: self._set_mode("transition"))
+        add((580, 1260, 940, 1360), "applyAllTextView", "android.widget.TextView", "Apply to all", on_tap=lambda x, y: self._apply_transition(all_junctions=True))
+
+    def _elements(self, nodes):
+        elements = []
+        for index, (bounds, rid, cls, text, _) in enumerate(nodes, 1):
+            full_id = f"{PACKAGE}:id/{rid}" if rid else ""
+            elements.append({
+                "index": index,
+                "resourceId": full_id,
+                "className": cls.rsplit(".", 1)[-1],
+                "text": text if text else (full_id or cls),
+                "bounds": ",".join(str(v) for v in bounds),
+                "children": [],
+            })
+        return elements
+
+    # --- Screen logic ---
+
+    def _set_mode(self, mode):
+        self.mode = mode
+
+    def _edit(self):
+        self.stats["edits"] += 1
+        self._position = self._clamp_time(self.position)
+        self._fling = None
+
+    def _on_tool(self, title):
+        if title == "Effect":
+            self.selected_block, self.clip_end_chip = None, False
+            self._set_mode("effect")
+        elif title == "Duration" and self.mode == "clip":
+            self.pending_duration = None
+            self._set_mode("duration")
+
+    def _on_track(self, x, y):
+        if not TRACK_TOP <= y <= TRACK_BOTTOM + 10 or self.mode not in ("editor", "clip"):
+            return
+        t = self._time_of(x)
+        if y >= TRACK_BOTTOM - 20:
+            for j in range(1, len(self.truth)):
+                if abs(self._x_of(self.truth.junction_time(j)) - x) <= JUNCTION_HIT_PX:
+                    self.junction, self.picked_transition, self.transition_scroll = j, None, 0
+                    self._set_mode("transition")
+                    return
+        if 0.0 <= t <= self.truth.total_duration():
+            self.selected_clip = self.truth.clip_at(t)
+            self._set_mode("clip")
+        else:
+            self.selected_clip = None
+            self._set_mode("editor")
+
+    def _confirm_duration(self):
+        try:
+            value = float(self.dialog_text)
+        except ValueError:
+            return
+        if value > 0:
+            self.pending_duration = min(600.0, max(0.1, value))
+            self._set_mode("duration")
+
+    def _apply_duration(self):
+        if self.pending_duration is not None:
+            self.truth.set_duration(self.selected_clip, self.pending_duration)
+            self._edit()
+        self._set_mode("clip")
+
+    def _pick_category(self, group):
+        self.category, self.grid_scroll = group, 0
+
+    def _apply_picked_effect(self):
+        if self.picked_effect:
+            start = self.position
+            block = [start, min(start + self.effect_seconds, self.truth.total_duration()), self.picked_effect]
+            self.effects.append(block)
+            self.effects.sort(key=lambda b: b[0])
+            self.selected_block, self.clip_end_chip, self.picked_effect = block, False, None
+            self._edit()
+        self._set_mode("effect")
+
+    def _block_with_handle_at(self, x):
+        for block in self.effects:
+            right = self._x_of(block[1])
+            if right - 5 <= x <= right + HANDLE_HIT_PX:
+                return block
+        return None
+
+    def _on_effect_row(self, x, y):
+        block = self._block_with_handle_at(x)
+        if block is not None:
+            self.selected_block, self.clip_end_chip = block, True
+            return
+        t = self._time_of(x)
+        self.selected_block = next((b for b in self.effects if b[0] <= t <= b[1]), None)
+        self.clip_end_chip = False
+
+    def _extend_to_clip_end(self):
+        block = self.selected_block
+        if block is not None:
+            _, clip_end = self.truth.clip_range(self.truth.clip_at(block[0] + 1e-3))
+            block[1] = clip_end
+            self._edit()
+        self.clip_end_chip = False
+
+    def _close_effects(self):
+        self.selected_block, self.clip_end_chip = None, False
+        self._set_mode("editor")
+
+    def _apply_transition(self, all_junctions):
+        if self.picked_transition is not None:
+            length = 0.0 if self.picked_transition == "none" else self.transition_seconds
+            junctions = range(1, len(self.truth)) if all_junctions else [self.junction]
+            for j in junctions:
+                self.truth.set_transition(j, length)
+                self.transition_types[j] = self.picked_transition
+            self._edit()
+        self.junction = None
+        self._set_mode("editor")
+
+    async def back(self):
+        parents = {
+            "clip": "editor", "duration": "clip", "duration_dialog": "duration", "effect": "editor",
+            "effect_picker": "effect", "transition": "editor", "apply_all_confirm": "transition",
+        }
+        if self.mode in parents:
+            parent = parents[self.mode]
+            self._later(lambda: self._set_mode(parent))
+        return True
+
+    # --- Gestures (what reaches the touchscreen) ---
+
+    def inject_tap(self, x, y):
+        self._advance()
+        self.stats["taps"] += 1
+        self.now += self.tap_latency
+        if _inside(TIMELINE, x, y):
+            self._stop_fling()
+        for bounds, _, _, _, on_tap in reversed(self._render()):
+            if on_tap is not None and _inside(bounds, x, y):
+                self._later(lambda: on_tap(x, y))
+                break
+
+    def inject_swipe(self, x1, y1, x2, y2, duration_ms=300, hold_ms=0):
+        self._advance()
+        self.stats["swipes"] += 1
+        mode = self.mode
+        dx = x2 - x1
+
+        if mode == "effect" and EFFECT_ROW[0] <= y1 <= EFFECT_ROW[1] and self._block_with_handle_at(x1):
+            block = self._block_with_handle_at(x1)
+            block[1] = max(block[0] + 0.1, min(self.truth.total_duration(), block[1] + dx / self.px_per_sec))
+            self._edit()
+        elif mode in ("editor", "clip", "effect") and _inside(TIMELINE, x1, y1):
+            self._stop_fling() # Touching the track catches a running fling
+            self.now += duration_ms / 1000
+            self._drag_timeline(x1, x2, duration_ms, hold_ms)
+            self.now += hold_ms / 1000
+            return
+        elif mode in ("editor", "clip") and _inside(TOOLBAR, x1, y1):
+            items = MAIN_TOOLBAR if mode == "editor" else CLIP_TOOLBAR
+            limit = max(0, len(items) * TOOLBAR_ITEM_W - SCREEN_W)
+            self.toolbar_scroll[mode] = max(0, min(limit, self.toolbar_scroll[mode] - dx))
+        elif mode == "effect_picker" and CATEGORY_ROW[0] <= y1 <= CATEGORY_ROW[1]:
+            limit = max(0, 20 + len(self.categories) * CATEGORY_W - SCREEN_W)
+            self.category_scroll = max(0, min(limit, self.category_scroll - dx))
+        elif mode == "effect_picker" and EFFECT_TILE_ROW[0] <= y1 <= EFFECT_TILE_ROW[1]:
+            limit = max(0, 40 + len(self.categories[self.category]) * EFFECT_TILE_PITCH - SCREEN_W)
+            self.grid_scroll = max(0, min(limit, self.grid_scroll - dx))
+        elif mode == "transition" and TRANSITION_ROW[0] <= y1 <= TRANSITION_ROW[1] and abs(dx) > 50:
+            step = TRANSITION_PAGE if dx < 0 else -TRANSITION_PAGE
+            limit = len(TRANSITIONS) - TRANSITION_VISIBLE
+            self.transition_scroll = max(0, min(limit, self.transition_scroll + step))
+        self.now += (duration_ms + hold_ms) / 1000
+
+    def inject_pinch(self, cx, cy, start_span, end_span, duration_ms=400, hold_ms=100):
+        self._advance()
+        self.stats["pinches"] += 1
+        self.now += (duration_ms + hold_ms) / 1000
+        if self.mode in ("editor", "clip", "effect") and _inside(TIMELINE, cx, cy) and start_span > 0:
+            self._stop_fling()
+            self.px_per_sec = max(10.0, min(1000.0, self.px_per_sec * end_span / start_span))
+
+    # --- droidrun Tools surface ---
+
+    async def get_state(self, *args, **kwargs):
+        self.stats["get_state"] += 1
+        self.now += self.dump_latency
+        self._advance()
+        self._last_elements = self._elements(self._render())
+        phone_state = {"currentApp": "InShot", "packageName": PACKAGE, "keyboardVisible": self.mode == "duration_dialog"}
+        return "", "", self._last_elements, phone_state
+
+    def _element(self, index):
+        """Like droidrun: indices refer to the last dumped tree, even if the screen moved on."""
+        for el in self._last_elements:
+            if el["index"] == index:
+                return el
+        return None
+
+    async def tap_on_index(self, index, *args, **kwargs):
+        element = self._element(index)
+        if element is None:
+            return f"Error: No element found with index {index}"
+        x1, y1, x2, y2 = (int(v) for v in element["bounds"].split(","))
+        self.inject_tap((x1 + x2) / 2, (y1 + y2) / 2)
+        return f"Tapped element with index {index} at ({(x1 + x2) // 2}, {(y1 + y2) // 2})"
+
+    tap_by_index = tap_on_index
+
+    async def swipe(self, start_x, start_y, end_x, end_y, duration_ms=300):
+        self.inject_swipe(start_x, start_y, end_x, end_y, duration_ms)
+        return True
+
+    async def input_text(self, text, index=None, *args, **kwargs):
+        self.stats["inputs"] += 1
+        self._advance()
+        self.now += self.tap_latency
+        if index is not None:
+            element = self._element(index)
+            if element is None or element["className"] != "EditText":
+                return f"Error: Element {index} is not an input field"
+        if self.mode != "duration_dialog":
+            return "Error: No focused input field"
+        self.dialog_text = str(text)
+        return f"Text input completed: {text}"
+
+    # --- Reporting ---
+
+    def clip_effects(self, tolerance=0.25):
+        """{clip index: [effect names fully covering it]}"""
+        covered = {}
+        for i in range(1, len(self.truth) + 1):
+            start, end = self.truth.clip_range(i)
+            names = [b[2] for b in self.effects if b[0] <= start + tolerance and b[1] >= end - tolerance]
+            if names:
+                covered[i] = names
+        return covered
+
+    def summary(self):
+        self.settle()
+        return {
+            "durations": list(self.truth.durations),
+            "overlaps": list(self.truth.overlaps),
+            "transitions": dict(self.transition_types),
+            "effects": [tuple(b) for b in self.effects],
+            "clip_effects": self.clip_effects(),
+            "total": self.truth.total_duration(),
+            "position": round(self.position, 2),
+            "px_per_sec": self.px_per_sec,
+            "mode": self.mode,
+            "virtual_seconds": round(self.now, 2),
+            **self.stats,
+        }
+
+    @contextmanager
+    def install(self):
+        """
+        Routes InshotTools to this simulator: input backend, shell transport,
+        settle sleeps (virtual clock) and no calibration dump. Calibration
+        keys in global_state start empty (the seek model learns from scratch,
+        so runs are reproducible) and are restored afterwards.
+        """
+        saved = {key: global_state.get(key) for key in CALIBRATION_KEYS}
+        for key in CALIBRATION_KEYS:
+            global_state.delete(key)
+        previous_backend = set_input_backend(SimInputBackend(self))
+        previous_transport = set_transport(SimTransport(self))
+        previous_sleeper, previous_dump = InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE
+        InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE = self.sleep, False
+        TimelineModel.forget()
+        try:
+            yield self
+        finally:
+            InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE = previous_sleeper, previous_dump
+            set_transport(previous_transport)
+            set_input_backend(previous_backend)
+            for key, value in saved.items():
+                if value is None:
+                    global_state.delete(key)
+                else:
+                    global_state.set(key, value)
+            TimelineModel.forget()
+
+
+class SimInputBackend:
+    """Input backend (same surface as SendeventInjector) that touches the simulator."""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    async def tap(self, x, y):
+        self.sim.inject_tap(x, y)
+
+    async def swipe(self, x1, y1, x2, y2, duration_ms=300, hold_ms=0):
+        self.sim.inject_swipe(x1, y1, x2, y2, duration_ms, hold_ms)
+
+    async def drag(self, points, duration_ms=300, hold_ms=0):
+        lengths = [math.dist(a, b) for a, b in zip(points, points[1:])]
+        total = sum(lengths) or 1.0
+        for i, ((a, b), length) in enumerate(zip(zip(points, points[1:]), lengths)):
+            last = i == len(lengths) - 1
+            self.sim.inject_swipe(a[0], a[1], b[0], b[1], max(1, duration_ms * length / total), hold_ms if last else 1)
+
+    async def pinch(self, cx, cy, start_span, end_span, duration_ms=400, hold_ms=100):
+        self.sim.inject_pinch(cx, cy, start_span, end_span, duration_ms, hold_ms)
+
+
+class SimTransport:
+    """Shell session stand-in: understands `input tap/swipe` and `wm size`, accepts everything else."""
+
+    serial = "sim"
+    adb_path = "adb"
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.commands = []
+
+    def run(self, command, timeout=10.0):
+        self.commands.append(command)
+        for part in command.split(";"):
+            fields = part.split()
+            if fields[:2] == ["input", "tap"] and len(fields) >= 4:
+                self.sim.inject_tap(float(fields[2]), float(fields[3]))
+            elif fields[:2] == ["input", "swipe"] and len(fields) >= 6:
+                duration = float(fields[6]) if len(fields) > 6 else 300
+                self.sim.inject_swipe(*(float(v) for v in fields[2:6]), duration_ms=duration)
+            elif fields[:2] == ["wm", "size"]:
+                return 0, f"Physical size: {SCREEN_W}x{SCREEN_H}\n"
+        return 0, ""
+
+    def run_args(self, args, timeout=10.0):
+        return self.run(" ".join(str(a) for a in args), timeout)
+
+    async def run_async(self, command, timeout=10.0):
+        return self.run(command, timeout)
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import sys
+    import time
+
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    async def session(sim):
+        await InshotTools.calibrate(len(sim.truth), tools=sim)
+        for i in range(edits):
+            clip = i % len(sim.truth) + 1
+            kind = i % 3
+            if kind == 0:
+                await InshotTools.change_duration(clip, 3.0 + i % 4, tools=sim)
+            elif kind == 1:
+                await InshotTools.apply_effect(clip, ["Noise"], tools=sim)
+            elif clip < len(sim.truth):
+                await InshotTools.add_transition(clip, clip + 1, "fade", False, tools=sim)
+
+    sim = InshotSimulator(num_clips=6)
+    started = time.perf_counter()
+    with sim.install(), contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(session(sim))
+    wall = time.perf_counter() - started
+
+    print(json.dumps(sim.summary(), indent=4, default=str))
+    print(f"{edits} edits in {wall:.2f}s wall ({sim.now:.0f}s simulated): {edits / wall * 60:.0f} edits/min")
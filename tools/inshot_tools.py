@@ -2,66 +2,90 @@ from droidrun import DroidAgent, Tools
 from redis_state import global_state
 import asyncio
 import json
-import subprocess
+from tools.ui_snapshot import UiSnapshot
+from tools.state_cache import CachedTools, bump_epoch
+from tools.adb_transport import AdbTransportError, get_transport
+from tools.seek_controller import SeekController
+from tools.timeline_model import TimelineModel
+from tools.input_injector import InputCommandBackend, get_input_backend, use_input_command
+from tools.metrics import timed, tool_call
 
 class InshotTools:
+    # Swapped out by the offline simulator (virtual clock, no calibration dump)
+    _sleeper = asyncio.sleep
+    DUMP_CALIBRATION_STATE = True
+    PINCH_SPANS = (150, 1000) # Closest / widest finger spacing (px) one pinch uses
+    ZOOM_LEVELS_KEY = "zoom_levels_px/sec" # Zoom scale -> measured px/sec, since calibration
+
+    @staticmethod
+    async def _settle(seconds):
+        """Waits for the UI to catch up after a gesture."""
+        with timed("sleep", purpose="settle", requested=f"{seconds:g}"):
+            await InshotTools._sleeper(seconds)
+
     @staticmethod
-    def _adb_tap(x, y):
+    async def _adb_tap(x, y):
         """
         Bypasses DroidRun tools to tap raw coordinates using ADB.
         """
         try:
-            # 'input tap X Y' is the standard Android shell command
-            cmd = f"adb shell input tap {int(x)} {int(y)}"
-            subprocess.run(cmd, shell=True, check=True)
-            print(f"🔨 ADB Executed: input tap {int(x)} {int(y)}")
+            bump_epoch()
+            await InshotTools._inject("tap", x, y)
+            print(f"🔨 ADB Executed: tap {int(x)} {int(y)}")
         except Exception as e:
             print(f"❌ ADB Error: {e}")
 
     @staticmethod
-    async def _find_node_by_id(tools: Tools, target_id, return_element=False):
-        ui_state = (await tools.get_state())[2]
-        for element in ui_state:
-            if element.get('resourceId') == target_id:
-                if return_element:
-                    return element
-                return element.get("index")
-        return -1
+    async def _swipe(x1, y1, x2, y2, duration_ms=300, hold_ms=0):
+        """
+        Raw swipe through the low-latency input backend (no `input` JVM start).
+        hold_ms keeps the finger still at the end so the timeline doesn't fling.
+        """
+        bump_epoch()
+        await InshotTools._inject("swipe", x1, y1, x2, y2, duration_ms=duration_ms, hold_ms=hold_ms)
+        bump_epoch()
 
     @staticmethod
-    def _get_current_time(ui_state):
-        target_id = "com.camerasideas.instashot:id/current_position"
-        
-        for element in ui_state:
-            if element.get('resourceId') == target_id:
-                time_text = element.get('text', "0:00.0")
-                return InshotTools._parse_inshot_time(time_text)
-                
-        return 0.0
+    async def _inject(gesture, *args, **kwargs):
+        with timed(gesture, via="adb"):
+            try:
+                await getattr(get_input_backend(), gesture)(*args, **kwargs)
+            except AdbTransportError as e:
+                if isinstance(get_input_backend(), InputCommandBackend):
+                    raise
+                print(f"⚠️ sendevent failed ({e}). Switching to 'input' command.")
+                use_input_command()
+                await getattr(get_input_backend(), gesture)(*args, **kwargs)
+
+    @staticmethod
+    def _find_node_by_id(snapshot: UiSnapshot, target_id, return_element=False):
+        element = snapshot.find_by_id(target_id)
+        if element is None:
+            return -1
+        if return_element:
+            return element
+        return element.get("index")
+
+    @staticmethod
+    def _get_current_time(snapshot: UiSnapshot):
+        element = snapshot.find_by_id("com.camerasideas.instashot:id/current_position")
+        if element is None:
+            return 0.0
+        return InshotTools._parse_inshot_time(element.get('text', "0:00.0"))
 
     @staticmethod
     def _get_clip_midpoint(image_idx: int):
-        timeline_map = global_state.get("timeline_map")
-        if not timeline_map:
-            print("❌ Error: Timeline map not found (Calibrate first).")
+        timeline = TimelineModel.load()
+        if not timeline:
+            print("❌ Error: Timeline model not found (Calibrate first).")
             return None
 
-        # Convert 1-based index to 0-based
-        list_idx = image_idx - 1
-
-        if list_idx < 0 or list_idx >= len(timeline_map):
-            print(f"❌ Error: Index {image_idx} out of bounds (Total clips: {len(timeline_map)}).")
+        if not timeline.valid(image_idx):
+            print(f"❌ Error: Index {image_idx} out of bounds (Total clips: {len(timeline)}).")
             return None
 
-        # Calculate Start Time (Sum of all previous clips)
-        start_time = sum(timeline_map[:list_idx])
-        
-        # Get Duration of target clip
-        duration = timeline_map[list_idx]
-        
-        # Calculate Midpoint
-        midpoint = start_time + (duration / 2.0)
-        end_time = start_time + duration
+        start_time, end_time = timeline.clip_range(image_idx)
+        midpoint = timeline.clip_midpoint(image_idx)
 
         print(f"📍 Clip {image_idx} Range: {start_time:.2f}s - {end_time:.2f}s")
         print(f"📍 Calculated Midpoint: {midpoint:.2f}s")
@@ -69,30 +93,20 @@ class InshotTools:
         return midpoint
     
     @staticmethod
-    def _get_total_duration_from_state(ui_state):
-        target_id = "com.camerasideas.instashot:id/total_clips_duration"
-        
-        for element in ui_state:
-            if element.get('resourceId') == target_id:
-                time_text = element.get('text', "0:00.0")
-                return InshotTools._parse_inshot_time(time_text)
-        return 0.0
+    def _get_total_duration_from_state(snapshot: UiSnapshot):
+        element = snapshot.find_by_id("com.camerasideas.instashot:id/total_clips_duration")
+        if element is None:
+            return 0.0
+        return InshotTools._parse_inshot_time(element.get('text', "0:00.0"))
 
     @staticmethod
     def _get_clip_range(image_idx: int):
         """
         Returns (start_time, end_time) for a given clip index.
         """
-        timeline_map = global_state.get("timeline_map")
-        if not timeline_map: return None, None
-        
-        # Convert 1-based to 0-based
-        idx = image_idx - 1
-        if idx < 0 or idx >= len(timeline_map): return None, None
-        
-        start_time = sum(timeline_map[:idx])
-        duration = timeline_map[idx]
-        return start_time, start_time + duration
+        timeline = TimelineModel.load()
+        if not timeline or not timeline.valid(image_idx): return None, None
+        return timeline.clip_range(image_idx)
 
     @staticmethod
     def _parse_inshot_time(time_str):
@@ -106,7 +120,7 @@ class InshotTools:
         except:
             return 0.0
 
-    def _calibrate(ui_state, num_images: int):
+    def _calibrate(snapshot: UiSnapshot, num_images: int):
         """
         1. Initializes Timeline Map.
         2. Calculates px/sec (Physics).
@@ -116,40 +130,35 @@ class InshotTools:
         DEFAULT_DURATION = 5.0 
         
         # --- 1. Map Initialization ---
-        timeline_map = [DEFAULT_DURATION] * num_images
-
-        global_state.set("timeline_map", timeline_map)
-        global_state.set("raw_image_duration", timeline_map.copy())
-        print(f"🗺️ Initialized Timeline Map for {num_images} clips.")
+        TimelineModel.create(num_images, DEFAULT_DURATION)
+        print(f"🗺️ Initialized Timeline Model for {num_images} clips.")
 
-        timeline_segments = [
-            el for el in ui_state 
-            if el.get('resourceId') == target_id
-        ]
+        timeline_segments = snapshot.find_all_by_id(target_id)
 
         if len(timeline_segments) < 4:
             print(f"⚠️ Calibration Warning: Found {len(timeline_segments)} segments. Needed at least 4.")
-            return
+            return False
 
         try:
             # --- 2. Physics Calculation (px/sec) ---
             total_width = 0.0
             print("📏 Measuring UI Chunks:")
             for i in [1, 2, 3]:
-                segment = timeline_segments[i]
-                bounds_str = segment.get('bounds', "")
-                coords = [int(x) for x in bounds_str.split(',')]
-                width = coords[2] - coords[0]
+                x1, _, x2, _ = snapshot.bounds_of(timeline_segments[i])
+                width = x2 - x1
                 total_width += width
                 print(f"   - Chunk {i} width: {width}px")
 
             px_per_sec = total_width / DEFAULT_DURATION
             global_state.set("px/sec", px_per_sec)
+            # Zoom level InShot opened with; zoom scales are relative to this
+            global_state.set("zoom_base_px/sec", px_per_sec)
+            global_state.set(InshotTools.ZOOM_LEVELS_KEY, {InshotTools._zoom_key(1.0): px_per_sec})
 
             # --- 3. Geometry Calculation (Center Point) ---
             # We use the 1st segment (Index 0) to find the playhead line
             first_segment = timeline_segments[0]
-            bounds = [int(x) for x in first_segment.get('bounds', "0,0,0,0").split(',')]
+            bounds = snapshot.bounds_of(first_segment)
             
             # The playhead is at the Right edge of the first element
             center_x = bounds[2] 
@@ -163,10 +172,132 @@ class InshotTools:
             print(f"✅ CALIBRATION COMPLETE")
             print(f"   Physics: 1s = {px_per_sec:.2f} px")
             print(f"   Geometry: Playhead Fixed at ({center_x}, {center_y})")
+            return True
             
         except Exception as e:
             print(f"❌ Calibration Error: {e}")
+            return False
     
+    @staticmethod
+    async def _measure_px_per_sec(tools: Tools):
+        """
+        Re-measures the timeline scale with a held probe swipe (no fling),
+        then swipes back to where we were.
+        """
+        px_per_sec = global_state.get("px/sec")
+        center_x, center_y = global_state.get("timeline_center")
+        probe_px = min(200, center_x - 100)
+
+        snapshot = await UiSnapshot.capture(tools)
+        before = InshotTools._get_current_time(snapshot)
+        total = InshotTools._get_total_duration_from_state(snapshot)
+        # Probe backward when too close to the end to move forward
+        direction = -1 if total and (total - before) * px_per_sec < probe_px * 1.5 else 1
+
+        await InshotTools._swipe(center_x, center_y, center_x - direction * probe_px, center_y, duration_ms=400, hold_ms=80)
+        await InshotTools._settle(0.2)
+        snapshot = await UiSnapshot.capture(tools)
+        after = InshotTools._get_current_time(snapshot)
+
+        await InshotTools._swipe(center_x, center_y, center_x + direction * probe_px, center_y, duration_ms=400, hold_ms=80)
+        await InshotTools._settle(0.2)
+
+        moved = abs(after - before)
+        if moved < 0.05:
+            print("⚠️ Zoom probe did not move the timeline. Keeping old scale.")
+            return px_per_sec
+        return probe_px / moved
+
+    @staticmethod
+    def _zoom_scale():
+        base = global_state.get("zoom_base_px/sec")
+        px_per_sec = global_state.get("px/sec")
+        return px_per_sec / base if base and px_per_sec else 1.0
+
+    @staticmethod
+    def _zoom_key(scale):
+        return f"{scale:.2f}"
+
+    @staticmethod
+    def _zoom_scale_for(purpose, total_time):
+        """
+        'navigate': whole project within two max-length swipes (never zooms in).
+        'precise':  the zoom InShot opened with, which handle drags are tuned for.
+        """
+        base = global_state.get("zoom_base_px/sec")
+        center_x, _ = global_state.get("timeline_center")
+        if purpose == "navigate" and base and total_time:
+            max_travel = center_x - 100
+            return min(1.0, (2 * max_travel / total_time) / base)
+        return 1.0
+
+    @staticmethod
+    @tool_call("zoom_timeline")
+    async def zoom_timeline(scale: float, tools: Tools = None, **kwargs):
+        """
+        Pinch-zooms the timeline to `scale` x the calibrated zoom in one
+        gesture (InShot's zoom follows the finger spread), then takes px/sec
+        from the levels measured since calibration or probes it once.
+        """
+        tools = CachedTools.wrap(tools)
+        base = global_state.get("zoom_base_px/sec")
+        center_coords = global_state.get("timeline_center")
+        if not base or not center_coords:
+            return "❌ Error: Run calibration first."
+
+        backend = get_input_backend()
+        if not hasattr(backend, "pinch"):
+            return "❌ Error: Pinch zoom needs the sendevent input backend."
+
+        center_x, center_y = center_coords
+        target = float(scale)
+        ratio = target / InshotTools._zoom_scale()
+
+        if abs(ratio - 1.0) >= 0.15:
+            low, high = InshotTools.PINCH_SPANS
+            step = max(low / high, min(high / low, ratio))
+            start_span = high if step < 1 else low
+            end_span = start_span * step
+            print(f"🔍 Pinch {start_span}px -> {end_span:.0f}px (zoom x{step:.2f})")
+
+            bump_epoch()
+            await backend.pinch(center_x, center_y, start_span, end_span)
+            bump_epoch()
+            await InshotTools._settle(0.3)
+
+            levels = global_state.get(InshotTools.ZOOM_LEVELS_KEY)
+            levels = levels if isinstance(levels, dict) else {}
+            key = InshotTools._zoom_key(target)
+            if step == ratio and key in levels:
+                global_state.set("px/sec", levels[key])
+            else:
+                px_per_sec = await InshotTools._measure_px_per_sec(tools)
+                global_state.set("px/sec", px_per_sec)
+                if step == ratio:
+                    levels[key] = px_per_sec
+                    global_state.set(InshotTools.ZOOM_LEVELS_KEY, levels)
+
+        # Track height / vertical center can change with zoom; the playhead x doesn't
+        snapshot = await UiSnapshot.capture(tools)
+        segments = snapshot.find_all_by_id("com.camerasideas.instashot:id/layout")
+        if segments:
+            _, y1, _, y2 = snapshot.bounds_of(segments[0])
+            global_state.set("timeline_center", [center_x, (y1 + y2) // 2])
+            global_state.set("y_width", y2 - y1)
+
+        px_per_sec = global_state.get("px/sec")
+        print(f"✅ Timeline zoom {InshotTools._zoom_scale():.2f}x: 1s = {px_per_sec:.2f} px")
+        return px_per_sec
+
+    @staticmethod
+    async def _ensure_zoom(purpose, tools: Tools, total_time=None):
+        if total_time is None:
+            snapshot = await UiSnapshot.capture(tools)
+            total_time = InshotTools._get_total_duration_from_state(snapshot)
+        scale = InshotTools._zoom_scale_for(purpose, total_time)
+        if abs(scale / InshotTools._zoom_scale() - 1.0) >= 0.15:
+            await InshotTools.zoom_timeline(scale, tools=tools)
+
     @staticmethod
     async def _drag_gesture(tools, start_x, start_y, start_time, end_time):
         """
@@ -187,8 +318,8 @@ class InshotTools:
 
         print(f"🤏 Dragging Handle: {start_x} -> {target_x} (Duration: {duration_needed:.2f}s)")
 
-        await tools.swipe(start_x, start_y, target_x, start_y, duration_ms=2000)
-        await asyncio.sleep(1.0) # Wait for UI to settle
+        await InshotTools._swipe(start_x, start_y, target_x, start_y, duration_ms=2000)
+        await InshotTools._settle(1.0) # Wait for UI to settle
 
     @staticmethod
     async def _seek_and_select_text(tools: Tools, target_text, anchor_text=None, swipe_area="menu"):
@@ -197,32 +328,33 @@ class InshotTools:
         swipe_area: 'menu' (category bar) or 'content' (effect grid).
         """
         MAX_SWIPES = 5
-        target_lower = target_text.lower()
+        swipe_y = 1250 # Roughly middle of screen, if anchor not found
+
+        def visible(el):
+            return swipe_area != "content" or el.get("text", "").isupper()
             
         for attempt in range(MAX_SWIPES):
-            ui_state = (await tools.get_state())[2]
-            for el in ui_state:
-                txt = el.get("text", "")
-                if swipe_area == "content" and not txt.isupper():
-                    continue
-
-                txt = txt.lower()
-                if anchor_text and anchor_text.lower() == txt:
-                    bounds = [int(x) for x in el.get("bounds", "0,0,0,0").split(',')]
-                    swipe_y = (bounds[1] + bounds[3]) // 2
-                    
-                # Check for Match
-                if txt == target_lower:
-                    print(f"✅ Found '{target_text}' at Index {el.get('index')}")
-                    await tools.tap_on_index(el.get("index"))
-                    return True
+            snapshot = await UiSnapshot.capture(tools)
+
+            if anchor_text:
+                anchors = [el for el in snapshot.find_all_by_text(anchor_text) if visible(el)]
+                if anchors:
+                    swipe_y = snapshot.center_of(anchors[-1])[1]
+
+            # Check for Match
+            matches = [el for el in snapshot.find_all_by_text(target_text) if visible(el)]
+            if matches:
+                el = matches[0]
+                print(f"✅ Found '{target_text}' at Index {el.get('index')}")
+                await tools.tap_on_index(el.get("index"))
+                return True
             
             # 2. Not found? Swipe.
             print(f"   '{target_text}' not visible. left (Y={swipe_y})...")
             
             # Swipe Left (Right to Left)
             await tools.swipe(900, swipe_y, 200, swipe_y, duration_ms=600)
-            await asyncio.sleep(1.0)
+            await InshotTools._settle(1.0)
             
         return False
 
@@ -302,10 +434,15 @@ class InshotTools:
     #     return False
 
     @staticmethod
-    async def seek_timeline(time, allowed_error = 0.2, tools: Tools = None, shared_state=None, **kwargs):
+    @tool_call("seek_timeline")
+    async def seek_timeline(time, allowed_error = 0.2, tools: Tools = None, shared_state=None, auto_zoom=False, **kwargs):
         """
         Seeks using stored Physics AND stored Geometry.
+        With auto_zoom, jumps too long for the capped swipes' iteration budget
+        are done zoomed out, then the zoom is restored for the final approach.
+        Off by default: on the simulator the pinches cost more than they save.
         """
+        tools = CachedTools.wrap(tools)
         # 1. READ Physics & Geometry
         px_per_sec = global_state.get("px/sec")
         center_coords = global_state.get("timeline_center") # Returns [x, y]
@@ -316,92 +453,108 @@ class InshotTools:
         start_x, start_y = center_coords
         screen_width = start_x * 2 # Heuristic: Playhead is centered
         safe_margin = 100
+        max_forward = start_x - safe_margin # Forward -> Drag Left
+        max_backward = (screen_width - start_x) - safe_margin # Backward -> Drag Right
 
         target_time = float(time)
         max_iterations = 10
+        approach_iterations = 3 # Kept for the fine, held swipes at the end
+        device = get_transport().serial or "default"
+        controller = SeekController.load(px_per_sec, device)
+
+        if auto_zoom and hasattr(get_input_backend(), "pinch"):
+            snapshot = await UiSnapshot.capture(tools)
+            diff = target_time - InshotTools._get_current_time(snapshot)
+            reach = controller.reach(max_forward if diff > 0 else max_backward) * (max_iterations - approach_iterations)
+            if abs(diff) > reach:
+                total_time = InshotTools._get_total_duration_from_state(snapshot)
+                restore_scale = InshotTools._zoom_scale()
+                print(f"🔭 Long jump ({abs(diff):.1f}s, coarse swipes reach {reach:.1f}s). Navigating zoomed out.")
+                await InshotTools._ensure_zoom("navigate", tools, total_time)
+                await InshotTools.seek_timeline(time, allowed_error=max(allowed_error, 1.0), tools=tools, auto_zoom=False)
+                await InshotTools.zoom_timeline(restore_scale, tools=tools)
+                px_per_sec = global_state.get("px/sec")
+                start_x, start_y = global_state.get("timeline_center")
+                controller = SeekController.load(px_per_sec, device)
         
         print(f"🎯 Seeking {target_time}s using Origin({start_x}, {start_y})...")
 
+        # A. Measure Reality
+        snapshot = await UiSnapshot.capture(tools)
+        current_time = InshotTools._get_current_time(snapshot)
+
         for i in range(max_iterations):
-            
-            # A. Measure Reality
-            ui_state = (await tools.get_state())[2]
-            current_time = InshotTools._get_current_time(ui_state)
-            
             diff = target_time - current_time
             
             if abs(diff) < allowed_error:
-                print(f"✅ Arrived at {current_time}s (Target: {target_time}s)")
+                print(f"✅ Arrived at {current_time}s (Target: {target_time}s) in {i} swipe(s)")
+                controller.save(device)
                 return current_time
 
-            print(f"   🔄 Step {i+1}: Current={current_time}s | Error={diff:.2f}s")
-
-            # B. Calculate Swipe using CONSTANT geometry
-            pixels_needed = int(abs(diff) * px_per_sec)
-            
-            if diff > 0: 
-                # Forward -> Drag Left
-                max_travel = start_x - safe_margin
-                actual_swipe = min(pixels_needed, max_travel)
-                end_x = start_x - actual_swipe
-            else:
-                # Backward -> Drag Right
-                max_travel = (screen_width - start_x) - safe_margin
-                actual_swipe = min(pixels_needed, max_travel)
-                end_x = start_x + actual_swipe
+            # B. Size the swipe with the learned gain / fling model
+            px, duration_ms, hold_ms = controller.plan(diff, max_forward, max_backward)
+            phase = "fine" if hold_ms else "coarse"
+            print(f"   🔄 Step {i+1}: Current={current_time}s | Error={diff:.2f}s | {phase} swipe {px}px in {duration_ms}ms")
 
             # C. Execute
-            # Note: access controller via tools.agent.controller
-            distance_to_move = abs(start_x - end_x)
-            
-            # CONSTANT SPEED LOGIC
-            # We want a steady 'drag' speed, roughly 2px per ms
-            # Minimum duration 300ms (to avoid fling), Max 2000ms (to avoid timeout)
-            safe_speed = 2.0 
-            calculated_duration = int(distance_to_move / safe_speed)
-            
-            # Clamp limits
-            actual_duration = max(300, min(2000, calculated_duration))
-            if diff < 0.3:
-                actual_duration = 600
-            await tools.swipe(start_x, start_y, end_x, start_y, duration_ms=actual_duration)
-            await asyncio.sleep(0.2) 
-
-        ui_state = (await tools.get_state())[2]
-        current_time = InshotTools._get_current_time(ui_state)
+            with timed("seek_iteration", phase=phase):
+                end_x = start_x - px
+                await InshotTools._swipe(start_x, start_y, end_x, start_y, duration_ms=duration_ms, hold_ms=hold_ms)
+                await InshotTools._settle(0.2) 
+
+                # D. Learn from what actually happened
+                snapshot = await UiSnapshot.capture(tools)
+            new_time = InshotTools._get_current_time(snapshot)
+            total_time = InshotTools._get_total_duration_from_state(snapshot)
+            clamped = new_time <= 0.0 or (total_time and new_time >= total_time - 0.05)
+            if px and not clamped:
+                controller.update(px, duration_ms, hold_ms, new_time - current_time)
+            current_time = new_time
+
+        controller.save(device)
         print(f"⚠️ Stopped after {max_iterations} steps. Landed at {current_time}s.")
         return current_time
 
     @staticmethod
+    @tool_call("calibrate")
     async def calibrate(num_images: int, tools: Tools = None, shared_state=None, **kwargs):
-        ui_state = (await tools.get_state())[2]
-        with open("test_ui_state.json", "w") as f:
-            json.dump(ui_state, f, indent=4)
-        InshotTools._calibrate(ui_state=ui_state, num_images=num_images)
+        tools = CachedTools.wrap(tools)
+        snapshot = await UiSnapshot.capture(tools)
+        if InshotTools.DUMP_CALIBRATION_STATE:
+            with open("test_ui_state.json", "w") as f:
+                json.dump(snapshot.elements, f, indent=4)
+        if not InshotTools._calibrate(snapshot=snapshot, num_images=num_images):
+            return "❌ Error: Calibration failed. Is the InShot editor timeline visible?"
+        return f"✅ Calibrated timeline for {num_images} clips."
 
     @staticmethod
+    @tool_call("add_transition")
     async def add_transition(image1_idx: int, image2_idx: int, transition_type: str, all_apply: bool, transition_time=1, tools: Tools = None, **kwargs):
+        tools = CachedTools.wrap(tools)
         # 1. Validation & State Retrieval
         if image2_idx != image1_idx + 1:
             return "❌ Error: Can only transition adjacent clips."
             
-        timeline_map = global_state.get("timeline_map") 
+        timeline = TimelineModel.load()
         px_per_sec = global_state.get("px/sec")
         center_coords = global_state.get("timeline_center") # [center_x, center_y]
         y_width = global_state.get("y_width")
 
-        if not timeline_map or not px_per_sec or not center_coords: 
+        if not timeline or not px_per_sec or not center_coords: 
             return "❌ Error: Run calibration first."
 
+        if not timeline.valid(image1_idx) or not timeline.valid(image2_idx):
+            return f"❌ Error: Junction {image1_idx}-{image2_idx} out of bounds (Total clips: {len(timeline)})."
+
         # 2. Seek to the Junction
-        junction_time = sum(timeline_map[:image1_idx])
+        junction_time = timeline.junction_time(image1_idx)
         print(f"📍 Seeking junction at {junction_time}s...")
         
         await InshotTools.seek_timeline(junction_time, allowed_error=3.5, tools=tools)
 
         # 3. MEASURE REALITY (Calculate Shift)
-        ui_state = (await tools.get_state())[2]
-        current_time = InshotTools._get_current_time(ui_state)
+        snapshot = await UiSnapshot.capture(tools)
+        current_time = InshotTools._get_current_time(snapshot)
         
         diff = current_time - junction_time 
         pixel_offset = int(diff * px_per_sec)
@@ -417,55 +570,42 @@ class InshotTools:
             
         final_x = tap_x - 5
         final_y = best_y
-        InshotTools._adb_tap(final_x, final_y)
+        await InshotTools._adb_tap(final_x, final_y)
         
         # Wait a moment for the menu to open
-        await asyncio.sleep(0.5)
+        await InshotTools._settle(0.5)
 
         # Select the transition
-        ui_state = (await tools.get_state())[2]
+        snapshot = await UiSnapshot.capture(tools)
 
         idx_basic = -1
-        idxApply = None
-        idxApplyAll = None
         
         # We will store the actual transition elements here
         transition_row_elements = []
         reference_top = -1
 
-        for i, element in enumerate(ui_state):
-            text = element.get("text", "")
-            rid = element.get("resourceId", "")
-            
-            # 1. Find "BASIC" Label
-            if text == "BASIC":
-                idx_basic = i
-                
-                if i + 2 < len(ui_state):
-                    ref_element = ui_state[i+2]
-                    bounds_str = ref_element.get("bounds", "0,0,0,0")
-                    reference_top = int(bounds_str.split(',')[1])
-            
-            # 2. Find Apply Buttons
-            if rid == "com.camerasideas.instashot:id/btnApply":
-                idxApply = element.get("index")
-            elif rid == "com.camerasideas.instashot:id/btnApplyAll":
-                idxApplyAll = element.get("index")
-
-            if idx_basic != -1 and reference_top != -1:
-                bounds_str = element.get("bounds", "0,0,0,0")
-                curr_parts = bounds_str.split(',')
-                if len(curr_parts) == 4:
-                    curr_top = int(curr_parts[1]) 
-                    
-                    # Check if this element is on the same line (allowing small pixel jitter)
-                    if abs(curr_top - reference_top) < 2:
-                        # Exclude the "BASIC" text itself if it shares alignment
-                        if text != "BASIC":
-                            transition_row_elements.append(element)
+        # 1. Find "BASIC" Label (case-sensitive, the tab title)
+        basic_labels = [el for el in snapshot.find_all_by_text("BASIC") if el.get("text") == "BASIC"]
+        if basic_labels:
+            idx_basic = snapshot.position_of(basic_labels[-1])
+            if idx_basic + 2 < len(snapshot):
+                reference_top = snapshot.bounds_of(snapshot.elements[idx_basic + 2])[1]
+
+        # 2. Find Apply Buttons
+        apply_buttons = snapshot.find_all_by_id("com.camerasideas.instashot:id/btnApply")
+        apply_all_buttons = snapshot.find_all_by_id("com.camerasideas.instashot:id/btnApplyAll")
+        idxApply = apply_buttons[-1].get("index") if apply_buttons else None
+        idxApplyAll = apply_all_buttons[-1].get("index") if apply_all_buttons else None
+
+        if reference_top != -1:
+            # Elements on the same line after the label (allowing small pixel jitter)
+            transition_row_elements = [
+                el for el in snapshot.row(reference_top, tolerance=2)
+                if snapshot.position_of(el) >= idx_basic and el.get("text") != "BASIC"
+            ]
 
         if idx_basic == -1:
-            return
+            return "❌ Error: Transition menu (BASIC) not found."
         
         print(f"Total Elements in View: {len(transition_row_elements)}")
 
@@ -487,38 +627,32 @@ class InshotTools:
 
         if all_apply:
             await tools.tap_on_index(idxApplyAll)
-            ui_state = (await tools.get_state())[2]
-            target_element = ""
-            for elements in ui_state:
-                if elements.get("resourceId", "") == "com.camerasideas.instashot:id/applyAllTextView":
-                    target_element = elements
+            snapshot = await UiSnapshot.capture(tools)
+            matches = snapshot.find_all_by_id("com.camerasideas.instashot:id/applyAllTextView")
                 
-            if target_element:
+            if matches:
+                target_element = matches[-1]
                 idxApp = target_element.get("index")
                 print(f"✅ Found Confirmation Text at Index: {idxApp}")
 
-                bounds = target_element.get("bounds", "0,0,0,0")
-                if isinstance(bounds, str):
-                    coords = [int(x) for x in bounds.split(',')]
-                    x1, y1, x2, y2 = coords
-                    
-                    # Calculate Center
-                    click_x = (x1 + x2) // 2
-                    click_y = (y1 + y2) // 2
-                    
-                    print(f"🔨 Force Tapping 'Apply to All' at ({click_x}, {click_y})")
-                    InshotTools._adb_tap(click_x, click_y)
+                click_x, click_y = snapshot.center_of(target_element)
+                
+                print(f"🔨 Force Tapping 'Apply to All' at ({click_x}, {click_y})")
+                await InshotTools._adb_tap(click_x, click_y)
         else:
             await tools.tap_on_index(idxApply)
 
-        current_map = global_state.get("timeline_map")
-        current_map[image1_idx-1] -= transition_time / 2
-        current_map[image2_idx-1] -= transition_time / 2
-        global_state.set("timeline_map", current_map)
+        # The transition overlaps both neighbours; later clips shift left
+        if all_apply:
+            timeline.set_all_transitions(transition_time)
+        else:
+            timeline.set_transition(image1_idx, transition_time)
+        timeline.save()
         return f"ADB Tapped ({final_x}, {final_y}) for junction {image1_idx}-{image2_idx}."
 
     @staticmethod
     async def seek_toolbar(targetTool: str, tools: Tools = None):
+        tools = CachedTools.wrap(tools)
         TOOLBAR_ID = "com.camerasideas.instashot:id/title"
         START_MARKER = "CANVAS" # The guaranteed first item
         MAX_SWIPES = 8 # Total swipes allocated
@@ -532,30 +666,27 @@ class InshotTools:
         # We swipe RIGHT (Left -> Right) until we see 'CANVAS'
         
         for _ in range(5): # Max 5 rewind swipes
-            ui_state = (await tools.get_state())[2]
+            snapshot = await UiSnapshot.capture(tools)
+            toolbar_items = snapshot.find_all_by_id(TOOLBAR_ID)
             
             found_start = False
-            current_view_has_toolbar = False
+            current_view_has_toolbar = bool(toolbar_items)
             
             # Scan current view
-            for el in ui_state:
-                rid = el.get("resourceId", "")
+            if toolbar_items and toolbar_y == -1:
+                # Update Y cache
+                toolbar_y = snapshot.center_of(toolbar_items[0])[1]
+
+            for el in toolbar_items:
                 text = el.get("text", "").upper()
                 
-                if rid == TOOLBAR_ID:
-                    current_view_has_toolbar = True
-                    # Update Y cache
-                    if toolbar_y == -1:
-                        bounds = [int(x) for x in el.get("bounds", "0,0,0,0").split(',')]
-                        toolbar_y = (bounds[1] + bounds[3]) // 2
-                    
-                    # Optimization: If we find target while rewinding, just return it!
-                    if text == targetTool.upper():
-                        print(f"✅ Found '{targetTool}' (during reset) at Index {el.get('index')}")
-                        return el.get("index")
-                    
-                    if text == START_MARKER:
-                        found_start = True
+                # Optimization: If we find target while rewinding, just return it!
+                if text == targetTool.upper():
+                    print(f"✅ Found '{targetTool}' (during reset) at Index {el.get('index')}")
+                    return el.get("index")
+                
+                if text == START_MARKER:
+                    found_start = True
 
             if found_start:
                 print("📍 Found Start Marker (CANVAS). Ready to scan forward.")
@@ -565,7 +696,7 @@ class InshotTools:
                 print(f"   'CANVAS' not visible. Rewinding menu (Swipe Right)...")
                 # Swipe Left -> Right (200 to 900) to reveal items on the LEFT
                 await tools.swipe(200, toolbar_y, 900, toolbar_y, duration_ms=600)
-                await asyncio.sleep(1.0)
+                await InshotTools._settle(1.0)
             else:
                 # If no toolbar items are visible, we can't swipe.
                 break
@@ -574,22 +705,18 @@ class InshotTools:
         # Now we scan forward (Swipe Left)
         
         for attempt in range(MAX_SWIPES):
-            ui_state = (await tools.get_state())[2]
+            snapshot = await UiSnapshot.capture(tools)
+            toolbar_items = snapshot.find_all_by_id(TOOLBAR_ID)
             found_index = -1
-            
-            for el in ui_state:
-                rid = el.get("resourceId", "")
-                text = el.get("text", "").upper()
-                
-                if rid == TOOLBAR_ID:
-                    # Update Y cache if we missed it in Phase 1
-                    if toolbar_y == -1:
-                         bounds = [int(x) for x in el.get("bounds", "0,0,0,0").split(',')]
-                         toolbar_y = (bounds[1] + bounds[3]) // 2
 
-                    if text == targetTool.upper():
-                        found_index = el.get("index")
-                        break
+            # Update Y cache if we missed it in Phase 1
+            if toolbar_items and toolbar_y == -1:
+                toolbar_y = snapshot.center_of(toolbar_items[0])[1]
+            
+            for el in toolbar_items:
+                if el.get("text", "").upper() == targetTool.upper():
+                    found_index = el.get("index")
+                    break
             
             if found_index != -1:
                 print(f"✅ Found '{targetTool}' at Index {found_index}")
@@ -599,34 +726,36 @@ class InshotTools:
                 print(f"   Target not visible. Swiping menu LEFT (Row Y={toolbar_y})...")
                 # Swipe Right -> Left (900 to 200) to reveal items on the RIGHT
                 await tools.swipe(900, toolbar_y, 200, toolbar_y, duration_ms=600)
-                await asyncio.sleep(1.0)
+                await InshotTools._settle(1.0)
             else:
                 return "❌ Error: Toolbar row not visible."
 
         return f"❌ Error: Tool '{targetTool}' not found after bidirectional search."
 
     @staticmethod
+    @tool_call("change_duration")
     async def change_duration(image_idx: int, duration: float, tools: Tools = None, **kwargs):
         """
         Changes the duration of a specific clip.
         Logic: Seek to clip center -> Tap clip -> Tap Duration -> Type value.
         """
+        tools = CachedTools.wrap(tools)
         # 1. Validation & State Retrieval
-        timeline_map = global_state.get("timeline_map") 
+        timeline = TimelineModel.load()
         center_coords = global_state.get("timeline_center") # [center_x, center_y]
         px_per_sec = global_state.get("px/sec")
 
-        if not timeline_map or not center_coords: 
+        if not timeline or not center_coords: 
             return "❌ Error: Run calibration first."
 
-        if image_idx > len(timeline_map):
-            return f"❌ Error: Image index {image_idx} out of bounds (Max {len(timeline_map)-1})."
+        if not timeline.valid(image_idx):
+            return f"❌ Error: Image index {image_idx} out of bounds (Max {len(timeline)})."
 
         midpoint = InshotTools._get_clip_midpoint(image_idx)
         await InshotTools.seek_timeline(midpoint, allowed_error=3.5, tools=tools)
 
-        ui_state = (await tools.get_state())[2]
-        current_time = InshotTools._get_current_time(ui_state)
+        snapshot = await UiSnapshot.capture(tools)
+        current_time = InshotTools._get_current_time(snapshot)
         
         diff = current_time - midpoint
         pixel_offset = int(diff * px_per_sec)
@@ -642,35 +771,23 @@ class InshotTools:
             
         final_x = tap_x - 5
         final_y = best_y
-        InshotTools._adb_tap(final_x, final_y)
+        await InshotTools._adb_tap(final_x, final_y)
         
         idx = await InshotTools.seek_toolbar("Duration", tools)
         await tools.tap_on_index(idx)
 
-        ui_state = (await tools.get_state())[2]
-
-        target_id = "com.camerasideas.instashot:id/btn_edit_duration"
-
-        pencil_idx = -1
-        for el in ui_state:
-            if el.get("resourceId") == target_id:
-                pencil_idx = el.get("index")
-                break
+        snapshot = await UiSnapshot.capture(tools)
+        pencil_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_edit_duration")
         
         if pencil_idx == -1:
             return "❌ Error: Pencil edit icon (btn_edit_duration) not found."
         
         print(f"✏️ Tapping Pencil Edit (Index {pencil_idx})")
         await tools.tap_on_index(pencil_idx)
-        await asyncio.sleep(0.1)
+        await InshotTools._settle(0.1)
 
-        ui_state = (await tools.get_state())[2]
-        
-        input_idx = -1
-        for el in ui_state:
-            if el.get("resourceId", "") == "com.camerasideas.instashot:id/edit_text":
-                input_idx = el.get("index")
-                break
+        snapshot = await UiSnapshot.capture(tools)
+        input_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/edit_text")
         
         if input_idx == -1:
             return "❌ Error: Duration input field not found."
@@ -678,42 +795,29 @@ class InshotTools:
         print(f"⌨️ Entering duration: {duration}")
         await tools.input_text(str(duration), input_idx)
         
-        ui_state = (await tools.get_state())[2]
-        confirm_idx = -1
-        for el in ui_state:
-            rid = el.get("resourceId", "")
-            if rid == "com.camerasideas.instashot:id/btn_ok":
-                confirm_idx = el.get("index")
-                break
+        snapshot = await UiSnapshot.capture(tools)
+        confirm_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_ok")
         
         if confirm_idx != -1:
             await tools.tap_on_index(confirm_idx)
         else:
             print("⚠️ Confirm button ID not found, using fallback tap.")
 
-        list_idx = image_idx - 1
-        if 0 <= list_idx < len(timeline_map):
-            print(f"🔄 Updating Internal Map: Clip {image_idx} changed from {timeline_map[list_idx]}s to {duration}s")
-            timeline_map[list_idx] = float(duration)
-            global_state.set("timeline_map", timeline_map)
-        
-        await asyncio.sleep(0.5)
-        apply_id = "com.camerasideas.instashot:id/btn_apply"
-        ui_state = (await tools.get_state())[2]
-        confirm_idx = -1
-        for el in ui_state:
-            rid = el.get("resourceId", "")
-            if rid == apply_id:
-                confirm_idx = el.get("index")
-                break
+        print(f"🔄 Updating Timeline Model: Clip {image_idx} changed from {timeline.durations[image_idx - 1]}s to {duration}s")
+        timeline.set_duration(image_idx, duration)
+        timeline.save()
+        
+        await InshotTools._settle(0.5)
+        snapshot = await UiSnapshot.capture(tools)
+        confirm_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_apply")
         
         await tools.tap_on_index(confirm_idx)
-        await asyncio.sleep(0.5)
+        await InshotTools._settle(0.5)
         
         midpoint = InshotTools._get_clip_midpoint(image_idx)
         await InshotTools.seek_timeline(midpoint, allowed_error=3.5, tools=tools)
-        ui_state = (await tools.get_state())[2]
-        current_time = InshotTools._get_current_time(ui_state)
+        snapshot = await UiSnapshot.capture(tools)
+        current_time = InshotTools._get_current_time(snapshot)
         
         diff = current_time - midpoint
         pixel_offset = int(diff * px_per_sec)
@@ -725,30 +829,38 @@ class InshotTools:
             
         final_x = tap_x - 5
         final_y = best_y
-        InshotTools._adb_tap(final_x, final_y)
+        await InshotTools._adb_tap(final_x, final_y)
 
         return f"✅ Changed clip {image_idx} duration to {duration}s."
 
     @staticmethod
+    @tool_call("apply_effect")
     async def apply_effect(image_idx: int, effects_list: list[str], tools: Tools = None, **kwargs):
-        timeline_map = global_state.get("timeline_map") 
+        tools = CachedTools.wrap(tools)
+        timeline = TimelineModel.load()
         center_coords = global_state.get("timeline_center")
         px_per_sec = global_state.get("px/sec")
 
         if len(effects_list) > 2:
-            return "At max 2 effects can be stacked"
+            return "❌ Error: At max 2 effects can be stacked"
 
-        if not timeline_map or not center_coords: 
+        if not timeline or not center_coords: 
             return "❌ Error: Run calibration first."
 
-        if image_idx > len(timeline_map):
-            return f"❌ Error: Image index {image_idx} out of bounds (Max {len(timeline_map)-1})."
+        if not timeline.valid(image_idx):
+            return f"❌ Error: Image index {image_idx} out of bounds (Max {len(timeline)})."
+
+        # Handle drags below are tuned for the calibrated zoom
+        if hasattr(get_input_backend(), "pinch"):
+            await InshotTools._ensure_zoom("precise", tools)
+            px_per_sec = global_state.get("px/sec")
+            center_coords = global_state.get("timeline_center")
 
         midpoint = InshotTools._get_clip_midpoint(image_idx)
         await InshotTools.seek_timeline(midpoint, allowed_error=3.5, tools=tools)
 
-        ui_state = (await tools.get_state())[2]
-        current_time = InshotTools._get_current_time(ui_state)
+        snapshot = await UiSnapshot.capture(tools)
+        current_time = InshotTools._get_current_time(snapshot)
         
         diff = current_time - midpoint
         pixel_offset = int(diff * px_per_sec)
@@ -764,7 +876,7 @@ class InshotTools:
             
         final_x = tap_x - 5
         final_y = best_y
-        InshotTools._adb_tap(final_x, final_y)
+        await InshotTools._adb_tap(final_x, final_y)
 
         with open("effects.json", "r") as f:
             effects_map = json.load(f)["Effects"]
@@ -779,7 +891,8 @@ class InshotTools:
             print(f"📍 Seeking to Clip Start: {start_time}s")
             actual_start_time = await InshotTools.seek_timeline(start_time, allowed_error=0.25, tools=tools)
 
-            effect_idx = await InshotTools._find_node_by_id(tools, "com.camerasideas.instashot:id/btn_add_effect")
+            snapshot = await UiSnapshot.capture(tools)
+            effect_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_add_effect")
             await tools.tap_on_index(effect_idx)
 
             target_effect_lower = effects.lower()
@@ -838,35 +951,25 @@ class InshotTools:
             # 51. Confirm (Checkmark)
             # await asyncio.sleep(0.5)
             # Find the checkmark/confirm button
-            confirm_idx = await InshotTools._find_node_by_id(tools, "com.camerasideas.instashot:id/btn_apply")
+            snapshot = await UiSnapshot.capture(tools)
+            confirm_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_apply")
             await tools.tap_on_index(confirm_idx)
             # await asyncio.sleep(0.2)
 
-            ui_state = (await tools.get_state())[2]
+            snapshot = await UiSnapshot.capture(tools)
             
-            # A. Find the Element with Effect Text
-            effect_label_idx = -1
-            for el in ui_state:
-                # Check text equality (case-insensitive)
-                if el.get("text", "").lower() == real_effect_name.lower():
-                    effect_label_idx = el.get("index")
-                    break
+            # A. Find the Element with Effect Text (case-insensitive)
+            effect_label = snapshot.find_by_text(real_effect_name)
             
-            if effect_label_idx == -1:
+            if effect_label is None:
                 return f"⚠️ Warning: Applied effect but could not find label '{real_effect_name}' to extend it."
 
             # B. Find Parent (Index - 2)
-            parent_idx = effect_label_idx - 2
-            
-            # Locate parent in the list (assuming list is sorted by index, but safer to search)
-            parent_element = None
-            for el in ui_state:
-                if el.get("index") == parent_idx:
-                    parent_element = el
-                    break
+            parent_idx = effect_label.get("index") - 2
+            parent_element = snapshot.get(parent_idx)
             
             if parent_element:
-                bounds = [int(x) for x in parent_element.get("bounds", "0,0,0,0").split(',')]
+                bounds = snapshot.bounds_of(parent_element)
                 right_edge = bounds[2]
                 top = bounds[1]
                 bottom = bounds[3]
@@ -876,12 +979,12 @@ class InshotTools:
                 
                 if end_time - start_time > 3.5: 
                     print(f"👉 Tapping Right Handle at ({tap_x}, {mid_y})")
-                    InshotTools._adb_tap(tap_x, mid_y)
-                    ui_state = (await tools.get_state())[2]
-                    clip_end_idx = await InshotTools._find_node_by_id(tools, "com.camerasideas.instashot:id/textClipEnd", return_element=True)
+                    await InshotTools._adb_tap(tap_x, mid_y)
+                    snapshot = await UiSnapshot.capture(tools)
+                    clip_end_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/textClipEnd", return_element=True)
                     print(f"Tapping on {clip_end_idx.get("index")}")
-                    bounds = [int(x) for x in clip_end_idx.get("bounds", "0,0,0,0").split(',')]
-                    InshotTools._adb_tap((bounds[0] + bounds[2])/2, (bounds[1] + bounds[3])/2)
+                    bounds = snapshot.bounds_of(clip_end_idx)
+                    await InshotTools._adb_tap((bounds[0] + bounds[2])/2, (bounds[1] + bounds[3])/2)
                 else:
                     print(f"📏 Short Clip ({end_time - start_time:.1f}s). Using precision drag.")
                     await InshotTools._drag_gesture(tools, tap_x, mid_y, actual_start_time, end_time)
@@ -889,10 +992,12 @@ class InshotTools:
             else:
                 print(f"⚠️ Parent element (Index {parent_idx}) not found. Skipping extension.")
 
+            timeline.add_effect(image_idx, real_effect_name)
+            timeline.save()
             print(f"✅ Applied effect '{real_effect_name}' and extended to full clip.")
 
-        ui_state = (await tools.get_state())[2]
-        final_apply_idx = await InshotTools._find_node_by_id(tools, "com.camerasideas.instashot:id/btn_apply")
+        snapshot = await UiSnapshot.capture(tools)
+        final_apply_idx = InshotTools._find_node_by_id(snapshot, "com.camerasideas.instashot:id/btn_apply")
         await tools.tap_on_index(final_apply_idx)
 
         return f"Done Applying Effects"
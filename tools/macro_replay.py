@@ -0,0 +1,255 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass, field, asdict
+
+from tools.adb_transport import AdbTransportError, get_transport
+from tools.inshot_tools import InshotTools
+from tools.metrics import timed
+from tools.state_cache import CachedTools, new_tools
+from tools.ui_snapshot import UiSnapshot, parse_bounds
+
+SETTLE_TIMEOUT = 4.0 # How long a recorded element may take to show up
+POLL_INTERVAL = 0.25
+MAX_DRIFT_PX = 400 # Re-resolved candidates further than this from the recording are rejected
+
+
+def _has_text(element_text):
+    """droidrun fills `text` with the class name or resourceId when a node has none."""
+    return bool(element_text) and not element_text.startswith("android.") and ":id/" not in element_text
+
+
+def _center(bounds):
+    x1, y1, x2, y2 = bounds
+    return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+def _distance(a, b):
+    (ax, ay), (bx, by) = _center(a), _center(b)
+    return abs(ax - bx) + abs(ay - by)
+
+
+@dataclass
+class ReplayStep:
+    index: int
+    action: str
+    description: str
+    status: str # verified | re-resolved | done | diverged
+    detail: str = ""
+    seconds: float = 0.0
+
+
+@dataclass
+class ReplayReport:
+    macro: str
+    steps: list = field(default_factory=list)
+    seconds: float = 0.0
+    handed_off: bool = False
+    agent_success: bool = None
+
+    @property
+    def diverged_at(self):
+        for s in self.steps:
+            if s.status == "diverged":
+                return s.index
+        return None
+
+    @property
+    def success(self):
+        return self.diverged_at is None or bool(self.agent_success)
+
+    def to_dict(self):
+        return {**asdict(self), "diverged_at": self.diverged_at, "success": self.success}
+
+
+def load_macro(run_dir):
+    """
+    Reads <run_dir>/macro.json and, when the run kept its ui_states, tags each
+    tap with the resourceId of the element it hit so replay can re-resolve it.
+    """
+    with open(os.path.join(run_dir, "macro.json"), "r") as f:
+        macro = json.load(f)
+
+    recorded = {}
+    for path in sorted(glob.glob(os.path.join(run_dir, "ui_states", "*.json"))):
+        try:
+            with open(path, "r") as f:
+                elements = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        for el in elements if isinstance(elements, list) else []:
+            key = (el.get("index"), el.get("text"), el.get("bounds"))
+            if el.get("resourceId"):
+                recorded.setdefault(key, el["resourceId"])
+
+    for action in macro.get("actions", []):
+        if action.get("type") == "TapActionEvent" and "resource_id" not in action:
+            key = (action.get("element_index"), action.get("element_text"), action.get("element_bounds"))
+            action["resource_id"] = recorded.get(key, "")
+    return macro
+
+
+class MacroReplayer:
+    """
+    Replays a recorded macro over ADB with no LLM in the loop.
+
+    StartAppEvent  -> am start, then wait for the package's UI
+    SwipeActionEvent -> the same swipe through the input backend
+    TapActionEvent -> verified against the live tree first: the node at the
+                      recorded index must still carry the recorded text and
+                      bounds. Otherwise it is re-resolved by resourceId or
+                      text (closest to the recorded bounds). If nothing
+                      matches the replay stops there as diverged.
+    """
+
+    def __init__(self, tools, transport=None, settle_timeout=SETTLE_TIMEOUT, log=print):
+        self.tools = CachedTools.wrap(tools)
+        self.transport = transport or get_transport()
+        self.settle_timeout = settle_timeout
+        self.log = log
+
+    async def _snapshot(self):
+        self.tools.invalidate()
+        return await UiSnapshot.capture(self.tools)
+
+    def _resolve(self, snapshot, action):
+        """(element, status) for a recorded tap; (None, reason) when it can't be found."""
+        text = action.get("element_text", "")
+        bounds = parse_bounds(action.get("element_bounds", ""))
+        resource_id = action.get("resource_id", "")
+
+        at_index = snapshot.get(action.get("element_index"))
+        if at_index is not None and at_index.get("text") == text and snapshot.bounds_of(at_index) == bounds:
+            return at_index, "verified"
+
+        candidates = []
+        if resource_id:
+            candidates = snapshot.find_all_by_id(resource_id)
+            if _has_text(text):
+                candidates = [el for el in candidates if el.get("text") == text] or candidates
+        if not candidates and _has_text(text):
+            candidates = snapshot.find_all_by_text(text)
+        if not candidates:
+            # Text-less nodes (gallery tiles etc.): same geometry is the only evidence left
+            candidates = [el for el in snapshot if snapshot.bounds_of(el) == bounds]
+
+        candidates = [el for el in candidates if _distance(snapshot.bounds_of(el), bounds) <= MAX_DRIFT_PX]
+        if not candidates:
+            return None, f"'{text}' not on screen"
+        best = min(candidates, key=lambda el: _distance(snapshot.bounds_of(el), bounds))
+        return best, "re-resolved"
+
+    async def _tap(self, action):
+        deadline = time.monotonic() + self.settle_timeout
+        while True:
+            snapshot = await self._snapshot()
+            element, status = self._resolve(snapshot, action)
+            if element is not None or time.monotonic() > deadline:
+                break
+            with timed("sleep", purpose="work", requested=f"{POLL_INTERVAL:g}"):
+                await asyncio.sleep(POLL_INTERVAL)
+
+        if element is None:
+            return "diverged", status
+        x, y = snapshot.center_of(element)
+        await InshotTools._adb_tap(x, y)
+        moved = "" if (x, y) == (action.get("x"), action.get("y")) else f" (recorded {action.get('x')},{action.get('y')})"
+        return status, f"tap {x},{y}{moved}"
+
+    async def _start_app(self, action):
+        package, activity = action["package"], action.get("activity") or ""
+        component = f"{package}/{activity}" if activity else package
+        try:
+            if activity:
+                exit_code, output = self.transport.run(f"am start -W -n {component}", 15.0)
+            else:
+                exit_code, output = self.transport.run(f"monkey -p {package} -c android.intent.category.LAUNCHER 1", 15.0)
+        except AdbTransportError as e:
+            return "diverged", str(e)
+        if exit_code != 0:
+            return "diverged", output.strip()
+
+        deadline = time.monotonic() + self.settle_timeout
+        while time.monotonic() <= deadline:
+            snapshot = await self._snapshot()
+            if any(el.get("resourceId", "").startswith(f"{package}:") for el in snapshot):
+                return "done", f"started {component}"
+            with timed("sleep", purpose="work", requested=f"{POLL_INTERVAL:g}"):
+                await asyncio.sleep(POLL_INTERVAL)
+        return "diverged", f"{package} did not come to the foreground"
+
+    async def _swipe(self, action):
+        await InshotTools._swipe(
+            action["start_x"], action["start_y"], action["end_x"], action["end_y"],
+            duration_ms=action.get("duration_ms", 300),
+        )
+        return "done", f"swipe {action['start_x']},{action['start_y']} -> {action['end_x']},{action['end_y']}"
+
+    async def run(self, macro, name=""):
+        handlers = {
+            "StartAppEvent": self._start_app,
+            "TapActionEvent": self._tap,
+            "SwipeActionEvent": self._swipe,
+        }
+        report = ReplayReport(macro=name)
+        started = time.perf_counter()
+
+        for index, action in enumerate(macro.get("actions", [])):
+            step_started = time.perf_counter()
+            handler = handlers.get(action.get("type"))
+            if handler is None:
+                status, detail = "diverged", f"unsupported action {action.get('type')}"
+            else:
+                status, detail = await handler(action)
+
+            step = ReplayStep(index, action.get("type"), action.get("description", ""), status, detail,
+                              time.perf_counter() - step_started)
+            report.steps.append(step)
+            self.log(f"{'❌' if status == 'diverged' else '✅'} Replay {index}: {status} {detail}")
+            if status == "diverged":
+                break
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def handoff_goal(macro, report):
+    done = [s.description for s in report.steps if s.status != "diverged"]
+    done_text = "\n".join(f"- {d}" for d in done) or "- nothing"
+    return f"""
+        {macro.get('description', '').strip()}
+
+        A recorded macro for this task already ran these steps on the device:
+        {done_text}
+        It stopped at: {report.steps[-1].description} ({report.steps[-1].detail}).
+        Continue from the CURRENT screen; do not redo steps that already happened.
+        """
+
+
+async def replay_macro(run_dir, tools=None, fallback_to_agent=True, log=print):
+    """Replays trajectories/<run>/macro.json; hands the rest to the agent on divergence."""
+    macro = load_macro(run_dir)
+    replayer = MacroReplayer(tools or new_tools(), log=log)
+    report = await replayer.run(macro, name=os.path.basename(os.path.normpath(run_dir)))
+
+    if report.diverged_at is not None and fallback_to_agent:
+        # Imported here: the agent stack is only needed on divergence
+        from agents_functions import run_goal
+
+        log(f"🤖 Macro diverged at step {report.diverged_at}; handing off to the agent...")
+        report.handed_off = True
+        report.agent_success = await run_goal(handoff_goal(macro, report))
+
+    log(f"⏱️ Replay {'succeeded' if report.success else 'failed'} in {report.seconds:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Newest run that recorded a macro; not every trajectory has one
+    run_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(sorted(glob.glob("trajectories/*/macro.json"))[-1])
+    result = asyncio.run(replay_macro(run_dir))
+    print(json.dumps(result.to_dict(), indent=4))
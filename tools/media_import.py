@@ -0,0 +1,232 @@
+import asyncio
+import posixpath
+import re
+import shlex
+import time
+
+from tools.adb_transport import AdbTransportError, get_transport
+from tools.inshot_tools import InshotTools
+from tools.metrics import timed
+from tools.state_cache import CachedTools, new_tools
+from tools.ui_snapshot import UiSnapshot
+
+INSHOT_PACKAGE = "com.camerasideas.instashot"
+INSHOT_ACTIVITY = f"{INSHOT_PACKAGE}/.MainActivity"
+DEFAULT_CLIP_SECONDS = 5.0 # InShot gives every imported photo 5s
+
+ID = lambda name: f"{INSHOT_PACKAGE}:id/{name}"
+
+
+class MediaImportError(Exception):
+    pass
+
+
+async def _poll(tools, predicate, timeout=8.0, interval=0.3):
+    """Re-reads the UI until predicate(snapshot) is truthy; returns its value or None."""
+    deadline = time.monotonic() + timeout
+    while True:
+        tools.invalidate() # Waiting on the app, not on our own actions
+        snapshot = await UiSnapshot.capture(tools)
+        value = predicate(snapshot)
+        if value or time.monotonic() > deadline:
+            return value or None
+        with timed("sleep", purpose="work", requested=f"{interval:g}"):
+            await asyncio.sleep(interval)
+
+
+def _editor_clip_total(snapshot):
+    element = snapshot.find_by_id(ID("total_clips_duration"))
+    if element is None:
+        return None
+    return InshotTools._parse_inshot_time(element.get("text", "0:00.0")) or None
+
+
+async def wall_tiles(tools):
+    """Image tiles of the picker grid (everything after wallRecyclerView that isn't chrome)."""
+    snapshot = await UiSnapshot.capture(tools)
+    wall = snapshot.find_by_id(ID("wallRecyclerView"))
+    if wall is None:
+        return snapshot, []
+
+    tiles = []
+    wall_idx = wall.get("index")
+    for elem in snapshot:
+        idx = elem.get("index", -1)
+        if idx <= wall_idx:
+            continue
+        if idx - wall_idx > 1:
+            if elem.get("resourceId") == "":
+                tiles.append(elem)
+            else:
+                break
+    return snapshot, tiles
+
+
+async def select_all_tiles(tools):
+    """Taps every tile in the picker grid and confirms the selection."""
+    snapshot, tiles = await wall_tiles(tools)
+    print(f"Selecting {len(tiles)} images")
+    for elem in tiles:
+        try:
+            center_x, center_y = snapshot.center_of(elem)
+            print(f"Tapping Image at ({center_x}, {center_y})")
+            await InshotTools._adb_tap(center_x, center_y)
+        except Exception as e:
+            print(f"Failed to tap element: {e}")
+
+    snapshot = await UiSnapshot.capture(tools)
+    apply_idx = InshotTools._find_node_by_id(snapshot, ID("applySelectVideo"))
+    if apply_idx == -1:
+        raise MediaImportError("Apply button (applySelectVideo) not found")
+    await tools.tap_on_index(apply_idx)
+    return len(tiles)
+
+
+class MediaImporter:
+    """
+    Gets the synced album into a new InShot project without an LLM:
+
+    1. One file: a plain ACTION_SEND intent with its MediaStore content URI.
+    2. Otherwise: launch the picker, switch to the album by name, tap every
+       tile and apply. (`am` can't build the Parcelable URI list that
+       ACTION_SEND_MULTIPLE needs, so several files go through the picker.)
+
+    Either way the editor screen is checked through the UI tree: the
+    timeline must exist and be num_files * 5s long.
+    """
+
+    def __init__(self, tools, remote_dir, transport=None):
+        self.tools = CachedTools.wrap(tools)
+        self.remote_dir = remote_dir.rstrip("/")
+        self.album = posixpath.basename(self.remote_dir)
+        self.transport = transport or get_transport()
+
+    def _shell(self, command, timeout=10.0):
+        exit_code, output = self.transport.run(command, timeout)
+        if exit_code != 0:
+            raise MediaImportError(output.strip() or f"'{command}' exited with {exit_code}")
+        return output
+
+    def remote_files(self):
+        output = self._shell(f"ls -1 {shlex.quote(self.remote_dir)}")
+        return sorted(line.strip() for line in output.splitlines() if line.strip())
+
+    def content_uris(self):
+        """MediaStore URIs of the album's images (empty until the media scan has run)."""
+        where = f"bucket_display_name='{self.album}'"
+        output = self._shell(
+            "content query --uri content://media/external/images/media --projection _id "
+            f"--where {shlex.quote(where)}"
+        )
+        ids = re.findall(r"_id=(\d+)", output)
+        return [f"content://media/external/images/media/{i}" for i in ids]
+
+    async def _verify_editor(self, num_files, timeout=15.0):
+        expected = num_files * DEFAULT_CLIP_SECONDS
+        total = await _poll(self.tools, _editor_clip_total, timeout=timeout)
+        if total is None:
+            raise MediaImportError("Editor timeline did not appear")
+        if abs(total - expected) > 0.5:
+            raise MediaImportError(f"Timeline is {total:.1f}s, expected {expected:.1f}s for {num_files} images")
+        print(f"✅ Editor open with {num_files} images ({total:.1f}s)")
+
+    async def _share_single(self, uri):
+        self._shell(
+            f"am start -W -a android.intent.action.SEND -t image/* "
+            f"--eu android.intent.extra.STREAM {shlex.quote(uri)} --grant-read-uri-permission -p {INSHOT_PACKAGE}"
+        )
+
+    async def _open_picker(self):
+        """
+        A cold start lands on InShot's home screen: Video, then NEW when the
+        drafts sheet shows up (as in the recorded import macros). A resumed
+        process may already be on the picker.
+        """
+        picker = lambda s: s.find_by_id(ID("selectDirectoryLayout"))
+        snapshot = await _poll(self.tools, lambda s: s if picker(s) or s.find_by_id(ID("btn_select_video")) else None)
+        if snapshot is None:
+            raise MediaImportError("InShot home screen did not appear")
+        if picker(snapshot):
+            return snapshot
+
+        await InshotTools._adb_tap(*snapshot.center_of(snapshot.find_by_id(ID("btn_select_video"))))
+        snapshot = await _poll(self.tools, lambda s: s if picker(s) or s.find_by_text("NEW") else None)
+        if snapshot is not None and not picker(snapshot):
+            await InshotTools._adb_tap(*snapshot.center_of(snapshot.find_by_text("NEW")))
+            snapshot = await _poll(self.tools, lambda s: s if picker(s) else None)
+        if snapshot is None:
+            raise MediaImportError("Picker did not open")
+        return snapshot
+
+    async def _open_album(self):
+        self._shell(f"am force-stop {INSHOT_PACKAGE}")
+        self._shell(f"am start -W -n {INSHOT_ACTIVITY}")
+
+        snapshot = await self._open_picker()
+        current = snapshot.find_by_id(ID("directoryTextView"))
+        if current is not None and current.get("text") == self.album:
+            return
+
+        await InshotTools._adb_tap(*snapshot.center_of(snapshot.find_by_id(ID("selectDirectoryLayout"))))
+        snapshot, folder = await self._find_album()
+        if folder is None:
+            raise MediaImportError(f"Album '{self.album}' not found in the picker")
+        await InshotTools._adb_tap(*snapshot.center_of(folder))
+        await _poll(self.tools, lambda s: s.find_by_id(ID("wallRecyclerView")))
+
+    async def _find_album(self, max_swipes=30):
+        """(snapshot, directory_name element) or (None, None)"""
+        last_names = None
+        for _ in range(max_swipes):
+            snapshot = await _poll(self.tools, lambda s: s if s.find_by_id(ID("directoryListView")) else None)
+            if snapshot is None:
+                return None, None
+            names = snapshot.find_all_by_id(ID("directory_name"))
+            for name in names:
+                if name.get("text") == self.album:
+                    return snapshot, name
+
+            labels = [n.get("text") for n in names]
+            if labels == last_names:
+                return None, None # Bottom of the list
+            last_names = labels
+
+            left, top, right, bottom = snapshot.bounds_of(snapshot.find_by_id(ID("directoryListView")))
+            x = (left + right) // 2
+            span = bottom - top
+            await InshotTools._swipe(x, top + int(span * 0.8), x, top + int(span * 0.2), duration_ms=300, hold_ms=100)
+        return None, None
+
+    async def run(self):
+        started = time.perf_counter()
+        files = self.remote_files()
+        if not files:
+            raise MediaImportError(f"No files in {self.remote_dir}")
+
+        uris = self.content_uris() if len(files) == 1 else []
+        if uris:
+            print("📨 Sharing the image to InShot")
+            await self._share_single(uris[0])
+        else:
+            print(f"📂 Importing {len(files)} images from album '{self.album}' through the picker")
+            await self._open_album()
+            await select_all_tiles(self.tools)
+
+        await self._verify_editor(len(files))
+        print(f"⚡ Media import took {time.perf_counter() - started:.1f}s")
+        return len(files)
+
+
+async def fast_import(remote_dir, tools=None):
+    """
+    True when the album made it into the editor without the agent. Any failure
+    (a missing node, a get_state error, a timeout) hands over to the agent.
+    """
+    try:
+        await MediaImporter(tools or new_tools(), remote_dir).run()
+        return True
+    except (MediaImportError, AdbTransportError) as e:
+        print(f"⚠️ Fast import failed: {e}")
+    except Exception as e:
+        print(f"⚠️ Fast import failed unexpectedly: {type(e).__name__}: {e}")
+    return False
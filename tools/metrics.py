@@ -0,0 +1,277 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("droidrun-video-editor.inshot_tools")
+except ImportError:
+    _tracer = None
+
+# Upper bounds in seconds: taps are ~10ms, UI dumps ~0.5s, agent LLM steps 5-30s
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOOL_METRIC = "inshot_tool_call_seconds"
+PRIMITIVE_METRIC = "inshot_primitive_seconds"
+METRICS_ENV = "DROIDRUN_METRICS"
+MAX_CALLS = 1000 # Per-call breakdowns kept for the JSON-lines export
+
+# Breakdown dicts of the tool calls we are inside of (outermost first)
+_open_calls = contextvars.ContextVar("open_tool_calls", default=())
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """[(le, count <= le)] as Prometheus wants them."""
+        total, result = 0, []
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], self.counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    Latency histograms for InshotTools calls and the device / model
+    primitives underneath them, keyed by (metric, labels). Primitives
+    observed inside a tool call are also added to that call's breakdown,
+    which ends up on its OTel span and in the JSON-lines export.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series = {}
+        self.calls = deque(maxlen=MAX_CALLS)
+
+    def observe(self, metric, seconds, **labels):
+        key = (metric, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self.series.get(key)
+            if histogram is None:
+                histogram = self.series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def primitive(self, primitive, seconds, **labels):
+        self.observe(PRIMITIVE_METRIC, seconds, primitive=primitive, **labels)
+        name = primitive if primitive != "sleep" else f"sleep_{labels.get('purpose', 'settle')}"
+        for breakdown in _open_calls.get():
+            entry = breakdown.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def reset(self):
+        with self._lock:
+            self.series.clear()
+            self.calls.clear()
+
+    def totals(self, metric=PRIMITIVE_METRIC, by="primitive"):
+        """{label value: (count, seconds)} summed over the other labels."""
+        totals = {}
+        with self._lock:
+            for (name, labels), histogram in self.series.items():
+                if name != metric:
+                    continue
+                value = dict(labels).get(by, "")
+                count, seconds = totals.get(value, (0, 0.0))
+                totals[value] = (count + histogram.count, seconds + histogram.sum)
+        return totals
+
+    # --- Export ---
+
+    def prometheus_text(self):
+        help_text = {
+            TOOL_METRIC: "InshotTools entry point latency",
+            PRIMITIVE_METRIC: "Latency of get_state, gestures, sleeps, seek iterations and LLM steps",
+        }
+        lines = []
+        with self._lock:
+            for metric in sorted({name for name, _ in self.series}):
+                lines.append(f"# HELP {metric} {help_text.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (name, labels), histogram in sorted(self.series.items()):
+                    if name != metric:
+                        continue
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    sep = "," if label_text else ""
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{{label_text}{sep}le="{bound}"}} {count}')
+                    lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def jsonl_records(self):
+        """One record per series, then one per recorded tool call."""
+        with self._lock:
+            records = [
+                {
+                    "type": "histogram",
+                    "metric": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "buckets": {str(bound): count for bound, count in histogram.cumulative()},
+                }
+                for (name, labels), histogram in sorted(self.series.items())
+            ]
+            records.extend({"type": "tool_call", **call} for call in self.calls)
+        return records
+
+    def write(self, path):
+        """Writes Prometheus text (.prom / .txt) or JSON lines (anything else)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.prometheus_text())
+            else:
+                for record in self.jsonl_records():
+                    f.write(json.dumps(record) + "\n")
+        return path
+
+    def summary(self):
+        """Where the time went, largest first."""
+        totals = self.totals()
+        sleeps = self.totals(by="purpose")
+        lines = [
+            f"   {name:<16}{count:>6} calls {seconds:>8.2f}s"
+            for name, (count, seconds) in sorted(totals.items(), key=lambda kv: -kv[1][1])
+            if name != "sleep"
+        ]
+        for purpose in ("settle", "work"):
+            if purpose in sleeps:
+                count, seconds = sleeps[purpose]
+                label = f"sleep ({purpose})"
+                lines.append(f"   {label:<16}{count:>6} calls {seconds:>8.2f}s")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timed(primitive, **labels):
+    """Times the block as one `primitive` observation."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.primitive(primitive, time.perf_counter() - started, **labels)
+
+
+def tool_call(name):
+    """
+    Decorator for async InshotTools entry points: latency histogram, breakdown
+    and OTel span. Only the outermost call goes into the histogram; a tool
+    called from inside another (apply_effect -> seek_timeline) is already part
+    of its caller's time and is only kept, flagged nested, in the call log.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            breakdown = {}
+            nested = bool(_open_calls.get())
+            token = _open_calls.set(_open_calls.get() + (breakdown,))
+            span_cm = _tracer.start_as_current_span(f"InshotTools.{name}") if _tracer else nullcontext()
+            started = time.perf_counter()
+            status = "error"
+            try:
+                with span_cm as span:
+                    result = await fn(*args, **kwargs)
+                    failed = isinstance(result, str) and result.lstrip().startswith(("❌", "⚠️"))
+                    status = "failed" if failed else "ok"
+                    if span is not None:
+                        span.set_attributes(_span_attributes(breakdown, status))
+                    return result
+            finally:
+                _open_calls.reset(token)
+                seconds = time.perf_counter() - started
+                if not nested:
+                    metrics.observe(TOOL_METRIC, seconds, tool=name, status=status)
+                metrics.calls.append({
+                    "tool": name,
+                    "status": status,
+                    "nested": nested,
+                    "seconds": round(seconds, 6),
+                    "primitives": {k: {"count": c, "seconds": round(s, 6)} for k, (c, s) in breakdown.items()},
+                })
+        return wrapper
+    return decorator
+
+
+def _span_attributes(breakdown, status):
+    attributes = {"inshot.status": status}
+    for name, (count, seconds) in breakdown.items():
+        attributes[f"inshot.{name}.count"] = count
+        attributes[f"inshot.{name}.seconds"] = round(seconds, 6)
+    return attributes
+
+
+_llm_hooks_installed = False
+
+
+def install_llm_hooks():
+    """
+    Times droidrun's LLM calls through llama_index's instrumentation events
+    (primitive llm_step, source=agent). Safe to call more than once.
+    """
+    global _llm_hooks_installed
+    if _llm_hooks_installed:
+        return
+    try:
+        from llama_index.core.instrumentation import get_dispatcher
+        from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+        from llama_index.core.instrumentation.events.llm import LLMChatEndEvent, LLMChatStartEvent
+    except ImportError:
+        return
+
+    started = {}
+
+    class LlmStepHandler(BaseEventHandler):
+        @classmethod
+        def class_name(cls):
+            return "LlmStepHandler"
+
+        def handle(self, event, **kwargs):
+            key = getattr(event, "span_id", None)
+            if isinstance(event, LLMChatStartEvent):
+                model = (getattr(event, "model_dict", None) or {}).get("model", "")
+                started[key] = (time.perf_counter(), model)
+            elif isinstance(event, LLMChatEndEvent) and key in started:
+                t0, model = started.pop(key)
+                metrics.primitive("llm_step", time.perf_counter() - t0, source="agent", model=model)
+
+    get_dispatcher().add_event_handler(LlmStepHandler())
+    _llm_hooks_installed = True
+
+
+def export_from_env(log=print):
+    """Writes metrics.prom and metrics.jsonl into $DROIDRUN_METRICS when it is set."""
+    folder = os.environ.get(METRICS_ENV)
+    if not folder or not metrics.series:
+        return None
+    metrics.write(os.path.join(folder, "metrics.prom"))
+    path = metrics.write(os.path.join(folder, "metrics.jsonl"))
+    log(f"⏱️ Tool timings:\n{metrics.summary()}\n   exported to {folder}")
+    return path
@@ -0,0 +1,143 @@
+from redis_state import global_state
+
+
+class SeekController:
+    """
+    Learns how far the InShot timeline actually moves per swipe.
+
+    Model: seconds_moved = gain * px + fling * (px / duration_ms)
+    The first term is the drag itself, the second the momentum InShot adds
+    when the finger lifts while still moving (zero when we hold before lifting).
+    Both coefficients are fitted online with recursive least squares and kept
+    in global_state per device, so every seek starts from the last one's fit.
+    """
+
+    STATE_KEY = "seek_model"
+    FORGETTING = 0.97 # Older swipes count less (zoom / speed drift)
+    FINE_SECONDS = 1.0 # Below this error we drag slowly and hold to kill the fling
+    FINE_HOLD_MS = 80
+    COARSE_SPEED = 2.5 # px per ms
+    FINE_SPEED = 1.0
+    MIN_DURATION_MS = 150
+    MAX_DURATION_MS = 2000
+    FLING_MAX_MS = 1000 # Momentum never carries the timeline further than this much finger travel
+
+    def __init__(self, px_per_sec, theta=None, P=None, samples=0):
+        self.px_per_sec = float(px_per_sec)
+        self.theta = list(theta) if theta else [1.0 / self.px_per_sec, 0.0]
+        self.P = [list(row) for row in P] if P else self._prior_covariance()
+        self.samples = samples
+        self._bound_covariance() # Models saved before the bound existed may have wound up
+
+    def _prior(self):
+        """Initial variances of (gain, fling); the covariance is never allowed above them."""
+        return [(0.5 / self.px_per_sec) ** 2, 0.25]
+
+    def _prior_covariance(self):
+        gain, fling = self._prior()
+        return [[gain, 0.0], [0.0, fling]]
+
+    # --- Persistence ---
+
+    @classmethod
+    def load(cls, px_per_sec, device="default"):
+        models = global_state.get(cls.STATE_KEY) or {}
+        saved = models.get(device) if isinstance(models, dict) else None
+        if not saved:
+            return cls(px_per_sec)
+
+        controller = cls(saved["px_per_sec"], saved["theta"], saved["P"], saved.get("samples", 0))
+        if abs(controller.px_per_sec - px_per_sec) / px_per_sec > 0.05:
+            # Re-calibrated or zoomed: same physics, new scale
+            controller.rescale(px_per_sec)
+        return controller
+
+    def save(self, device="default"):
+        models = global_state.get(self.STATE_KEY) or {}
+        if not isinstance(models, dict):
+            models = {}
+        models[device] = {
+            "px_per_sec": self.px_per_sec,
+            "theta": self.theta,
+            "P": self.P,
+            "samples": self.samples,
+        }
+        global_state.set(self.STATE_KEY, models)
+
+    def rescale(self, px_per_sec):
+        ratio = self.px_per_sec / float(px_per_sec)
+        self.theta = [self.theta[0] * ratio, self.theta[1] * ratio]
+        self.px_per_sec = float(px_per_sec)
+        self.P = self._prior_covariance()
+
+    # --- Model ---
+
+    @staticmethod
+    def _features(px, duration_ms, hold_ms):
+        fling = px / duration_ms if hold_ms == 0 else 0.0
+        return [float(px), fling]
+
+    def predict(self, px, duration_ms, hold_ms=0):
+        x = self._features(px, duration_ms, hold_ms)
+        return self.theta[0] * x[0] + self.theta[1] * x[1]
+
+    def update(self, px, duration_ms, hold_ms, observed_seconds):
+        """One RLS step with the measured time change of a swipe."""
+        x = self._features(px, duration_ms, hold_ms)
+        lam = self.FORGETTING
+        Px = [self.P[0][0] * x[0] + self.P[0][1] * x[1], self.P[1][0] * x[0] + self.P[1][1] * x[1]]
+        denom = lam + x[0] * Px[0] + x[1] * Px[1]
+        k = [Px[0] / denom, Px[1] / denom]
+        error = observed_seconds - (self.theta[0] * x[0] + self.theta[1] * x[1])
+
+        self.theta = [self.theta[0] + k[0] * error, self.theta[1] + k[1] * error]
+        # Forget only along excited features: held (fine) swipes say nothing
+        # about the fling, so its variance must not grow with every one of them
+        scale = [lam ** -0.5 if x[i] else 1.0 for i in range(2)]
+        self.P = [
+            [(self.P[i][j] - k[i] * Px[j]) * scale[i] * scale[j] for j in range(2)]
+            for i in range(2)
+        ]
+        self._bound_covariance()
+
+        # Keep the fit physical even after a bad reading
+        nominal = 1.0 / self.px_per_sec
+        self.theta[0] = min(max(self.theta[0], nominal / 3), nominal * 3)
+        self.theta[1] = min(max(self.theta[1], 0.0), nominal * self.FLING_MAX_MS)
+        self.samples += 1
+
+    def _bound_covariance(self):
+        # Scaling row and column i together keeps P symmetric positive definite
+        for i, limit in enumerate(self._prior()):
+            if self.P[i][i] > limit:
+                s = (limit / self.P[i][i]) ** 0.5
+                for j in range(2):
+                    self.P[i][j] *= s
+                    self.P[j][i] *= s
+
+    def reach(self, max_px):
+        """Seconds one capped coarse swipe is expected to cover."""
+        duration_ms = max(self.MIN_DURATION_MS, min(self.MAX_DURATION_MS, max_px / self.COARSE_SPEED))
+        return self.predict(max_px, duration_ms)
+
+    def plan(self, diff, max_forward_px, max_backward_px):
+        """
+        Returns (px, duration_ms, hold_ms) for the next swipe. px > 0 moves
+        forward (finger drags left). Far targets get a fast capped swipe;
+        close ones a slow, held drag sized by the learned gain.
+        """
+        fine = abs(diff) < self.FINE_SECONDS
+        hold_ms = self.FINE_HOLD_MS if fine else 0
+        speed = self.FINE_SPEED if fine else self.COARSE_SPEED
+        limit = max_forward_px if diff > 0 else max_backward_px
+
+        px = diff / self.theta[0]
+        duration_ms = self.MIN_DURATION_MS
+        for _ in range(3):
+            # Duration depends on distance and the fling term on duration: iterate
+            duration_ms = max(self.MIN_DURATION_MS, min(self.MAX_DURATION_MS, abs(px) / speed))
+            per_px = self.predict(1.0, duration_ms, hold_ms)
+            px = diff / per_px if per_px > 0 else diff / self.theta[0]
+            px = max(-limit, min(limit, px))
+
+        return int(round(px)), int(duration_ms), hold_ms
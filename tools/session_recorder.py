@@ -0,0 +1,507 @@
+import asyncio
+import contextvars
+import json
+import os
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+from redis_state import global_state
+from tools.adb_transport import get_transport, set_transport
+from tools.input_injector import get_input_backend, set_input_backend
+from tools.inshot_simulator import CALIBRATION_KEYS
+from tools.inshot_tools import InshotTools
+from tools.state_cache import CachedTools, new_tools, set_tools_factory
+from tools.timeline_model import TimelineModel
+
+# Session state the tools read before touching the device
+STATE_KEYS = CALIBRATION_KEYS + ("touch_profile",)
+GESTURES = ("tap", "swipe", "drag", "pinch")
+LOOKAHEAD = 10 # How far replay searches for a call that doesn't match the next recorded one
+RECORD_ENV = "DROIDRUN_RECORD"
+MAX_PRINTED = 10 # Divergences after the first few are usually fallout of the first
+
+# >0 while inside a recorded call: the adb commands a gesture produces are its own detail
+_depth = contextvars.ContextVar("record_depth", default=0)
+
+
+def _jsonable(value):
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _normalize(value):
+    """Comparable form of call arguments (coordinates to 0.1px)."""
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+class Recording:
+    """
+    Every device interaction of one session, in order:
+    {seq, t, kind (tools | input | adb), call, args, kwargs, result, elapsed, nested}
+    plus `meta` (what was run and the session state it started from).
+    """
+
+    def __init__(self, meta=None, events=None):
+        self.meta = meta or {}
+        self.events = events or []
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, kind, call, args, kwargs, result, started, elapsed, nested):
+        with self._lock:
+            self.events.append({
+                "seq": len(self.events),
+                "t": round(started - self._started, 4),
+                "kind": kind,
+                "call": call,
+                "args": _jsonable(args),
+                "kwargs": _jsonable(kwargs),
+                "result": _jsonable(result),
+                "elapsed": round(elapsed, 4),
+                "nested": nested,
+            })
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"meta": self.meta, "events": self.events}, f, indent=1, default=str)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data.get("meta"), data.get("events"))
+
+
+async def _record_async(recording, kind, call, fn, args, kwargs):
+    nested = _depth.get() > 0
+    token = _depth.set(_depth.get() + 1)
+    started = time.perf_counter()
+    result = None
+    try:
+        result = await fn(*args, **kwargs)
+        return result
+    finally:
+        _depth.reset(token)
+        recording.add(kind, call, args, kwargs, result, started, time.perf_counter() - started, nested)
+
+
+def _record_sync(recording, kind, call, fn, args, kwargs):
+    nested = _depth.get() > 0
+    token = _depth.set(_depth.get() + 1)
+    started = time.perf_counter()
+    result = None
+    try:
+        result = fn(*args, **kwargs)
+        return result
+    finally:
+        _depth.reset(token)
+        recording.add(kind, call, args, kwargs, result, started, time.perf_counter() - started, nested)
+
+
+class RecordingTools:
+    """droidrun Tools wrapper that records get_state responses and every action."""
+
+    def __init__(self, tools, recording):
+        self.tools = tools
+        self.recording = recording
+
+    async def get_state(self, *args, **kwargs):
+        return await _record_async(self.recording, "tools", "get_state", self.tools.get_state, args, kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self.tools, name)
+        if name not in CachedTools.ACTIONS or not callable(attr):
+            return attr
+
+        async def action(*args, **kwargs):
+            return await _record_async(self.recording, "tools", name, attr, args, kwargs)
+
+        return action
+
+
+class RecordingBackend:
+    """Input backend wrapper; exposes exactly the gestures the real backend has."""
+
+    def __init__(self, backend, recording):
+        self.backend = backend
+        self.recording = recording
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in GESTURES:
+            return attr
+
+        async def gesture(*args, **kwargs):
+            return await _record_async(self.recording, "input", name, attr, args, kwargs)
+
+        return gesture
+
+
+class RecordingTransport:
+    """Shell session wrapper recording every command with its exit code and output."""
+
+    def __init__(self, transport, recording):
+        self.transport = transport
+        self.recording = recording
+
+    def run(self, command, timeout=10.0):
+        run = lambda c: self.transport.run(c, timeout)
+        return _record_sync(self.recording, "adb", "run", run, (command,), {})
+
+    def run_args(self, args, timeout=10.0):
+        return self.run(" ".join(shlex.quote(str(a)) for a in args), timeout=timeout)
+
+    async def run_async(self, command, timeout=10.0):
+        return await asyncio.to_thread(self.run, command, timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+
+@contextmanager
+def record(path, meta=None):
+    """
+    Records the device side of everything run inside the block: Tools made
+    by new_tools(), the input backend and the shell session. Tools that
+    droidrun hands to agent custom tools are not ours to wrap, so only the
+    gestures and adb commands of agent-driven steps are captured.
+    """
+    recording = Recording(dict(meta or {}))
+    recording.meta["created"] = datetime.now().isoformat(timespec="seconds")
+    recording.meta["state"] = {key: global_state.get(key) for key in STATE_KEYS}
+
+    # Resolve the backend first so touchscreen detection isn't part of the session
+    backend = get_input_backend()
+    transport = get_transport()
+    recording.meta["serial"] = transport.serial
+    recording.meta["gestures"] = [g for g in GESTURES if hasattr(backend, g)]
+
+    previous_factory = set_tools_factory(None)
+
+    def build():
+        if previous_factory is not None:
+            return previous_factory()
+        from droidrun import AdbTools
+        return AdbTools()
+
+    set_tools_factory(lambda: RecordingTools(build(), recording))
+    set_input_backend(RecordingBackend(backend, recording))
+    set_transport(RecordingTransport(transport, recording))
+    try:
+        yield recording
+    finally:
+        set_transport(transport)
+        set_input_backend(backend)
+        set_tools_factory(previous_factory)
+        recording.save(path)
+        print(f"📼 Recorded {len(recording.events)} device calls to {path}")
+
+
+@contextmanager
+def recording_from_env(meta=None):
+    """record() into $DROIDRUN_RECORD/session_<time>.json when set; yields None otherwise."""
+    folder = os.environ.get(RECORD_ENV)
+    if not folder:
+        yield None
+        return
+    path = os.path.join(folder, f"session_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with record(path, meta) as recording:
+        yield recording
+
+
+# --- Replay ---
+
+class ReplayDivergence(Exception):
+    pass
+
+
+@dataclass
+class Divergence:
+    position: int # Index into the recorded (top-level) calls
+    expected: str
+    got: str
+    resolution: str # resynced | unmatched | missing
+
+
+def _describe(kind, call, args, kwargs):
+    parts = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()]
+    text = f"{kind}.{call}({', '.join(parts)})"
+    return text if len(text) < 160 else text[:157] + "..."
+
+
+class ReplayDevice:
+    """
+    Plays a Recording back as the device. Tools, input backend and transport
+    all read from one cursor over the recorded top-level calls: a call that
+    matches the next recorded one (same kind, name and arguments) gets its
+    recorded result. Anything else is a divergence; replay looks a few calls
+    ahead to resync, or raises ReplayDivergence when strict.
+
+    time_scale stretches the recorded call latencies and the tools' settle
+    sleeps: 1.0 is real time, 0 is as fast as possible.
+    """
+
+    def __init__(self, recording, time_scale=0.0, strict=False):
+        self.recording = recording
+        self.events = [e for e in recording.events if not e.get("nested")]
+        self.time_scale = time_scale
+        self.strict = strict
+        self.cursor = 0
+        self.divergences = []
+        self.tools = _ReplayTools(self)
+        self.backend = _ReplayBackend(self, recording.meta.get("gestures", GESTURES))
+        self.transport = _ReplayTransport(self, recording.meta.get("serial"))
+
+    def _matches(self, event, kind, call, args, kwargs):
+        return (
+            event["kind"] == kind and event["call"] == call
+            and _normalize(event["args"]) == _normalize(_jsonable(args))
+            and _normalize(event["kwargs"]) == _normalize(_jsonable(kwargs))
+        )
+
+    def _diverge(self, expected, got, resolution):
+        divergence = Divergence(self.cursor, expected, got, resolution)
+        self.divergences.append(divergence)
+        if len(self.divergences) <= MAX_PRINTED:
+            print(f"⚠️ Replay divergence at call {divergence.position}: expected {expected}, got {got} ({resolution})")
+        if self.strict:
+            raise ReplayDivergence(f"call {divergence.position}: expected {expected}, got {got}")
+
+    def _fallback(self, kind, call):
+        if kind == "tools" and call == "get_state":
+            # The closest recorded screen
+            for event in reversed(self.events[:self.cursor]):
+                if event["call"] == "get_state":
+                    return event["result"]
+            return next((e["result"] for e in self.events if e["call"] == "get_state"), ["", "", [], {}])
+        if kind == "adb":
+            return [0, ""]
+        return True if kind == "tools" else None
+
+    def next(self, kind, call, args, kwargs):
+        """(recorded result, recorded latency) for this call."""
+        got = _describe(kind, call, args, kwargs)
+        if self.cursor < len(self.events) and self._matches(self.events[self.cursor], kind, call, args, kwargs):
+            event = self.events[self.cursor]
+            self.cursor += 1
+            return event["result"], event["elapsed"]
+
+        expected = self.events[self.cursor] if self.cursor < len(self.events) else None
+        expected_text = _describe(expected["kind"], expected["call"], expected["args"], expected["kwargs"]) if expected else "end of recording"
+        for ahead in range(self.cursor + 1, min(len(self.events), self.cursor + 1 + LOOKAHEAD)):
+            if self._matches(self.events[ahead], kind, call, args, kwargs):
+                self._diverge(expected_text, got, "resynced")
+                event = self.events[ahead]
+                self.cursor = ahead + 1
+                return event["result"], event["elapsed"]
+
+        self._diverge(expected_text, got, "unmatched")
+        return self._fallback(kind, call), 0.0
+
+    async def call_async(self, kind, call, args, kwargs):
+        result, elapsed = self.next(kind, call, args, kwargs)
+        if self.time_scale:
+            await asyncio.sleep(elapsed * self.time_scale)
+        return result
+
+    def call_sync(self, kind, call, args, kwargs):
+        result, elapsed = self.next(kind, call, args, kwargs)
+        if self.time_scale:
+            time.sleep(elapsed * self.time_scale)
+        return result
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds * self.time_scale)
+
+    def finish(self):
+        """Flags recorded calls that never came; returns the report."""
+        if self.cursor < len(self.events):
+            remaining = self.events[self.cursor]
+            self.divergences.append(Divergence(
+                self.cursor, _describe(remaining["kind"], remaining["call"], remaining["args"], remaining["kwargs"]),
+                "end of session", "missing",
+            ))
+        return self.report()
+
+    def report(self):
+        return {
+            "calls": len(self.events),
+            "replayed": self.cursor,
+            "diverged": bool(self.divergences),
+            "divergences": [asdict(d) for d in self.divergences],
+        }
+
+    @contextmanager
+    def install(self):
+        """Makes new_tools(), the input backend, the transport and settle sleeps come from the recording."""
+        saved = {key: global_state.get(key) for key in STATE_KEYS}
+        for key, value in self.recording.meta.get("state", {}).items():
+            if value is None:
+                global_state.delete(key)
+            else:
+                global_state.set(key, value)
+        TimelineModel.forget()
+
+        previous_factory = set_tools_factory(lambda: self.tools)
+        previous_backend = set_input_backend(self.backend)
+        previous_transport = set_transport(self.transport)
+        previous_sleeper, previous_dump = InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE
+        InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE = self.sleep, False
+        try:
+            yield self
+        finally:
+            InshotTools._sleeper, InshotTools.DUMP_CALIBRATION_STATE = previous_sleeper, previous_dump
+            set_transport(previous_transport)
+            set_input_backend(previous_backend)
+            set_tools_factory(previous_factory)
+            for key, value in saved.items():
+                if value is None:
+                    global_state.delete(key)
+                else:
+                    global_state.set(key, value)
+            TimelineModel.forget()
+
+
+class _ReplayTools:
+    def __init__(self, device):
+        self._device = device
+
+    async def get_state(self, *args, **kwargs):
+        return await self._device.call_async("tools", "get_state", args, kwargs)
+
+    def __getattr__(self, name):
+        if name not in CachedTools.ACTIONS:
+            raise AttributeError(name)
+
+        async def action(*args, **kwargs):
+            return await self._device.call_async("tools", name, args, kwargs)
+
+        return action
+
+
+class _ReplayBackend:
+    def __init__(self, device, gestures):
+        self._device = device
+        self._gestures = set(gestures)
+
+    def __getattr__(self, name):
+        if name not in self._gestures:
+            raise AttributeError(name)
+
+        async def gesture(*args, **kwargs):
+            return await self._device.call_async("input", name, args, kwargs)
+
+        return gesture
+
+
+class _ReplayTransport:
+    adb_path = "adb"
+
+    def __init__(self, device, serial):
+        self._device = device
+        self.serial = serial
+
+    def run(self, command, timeout=10.0):
+        exit_code, output = self._device.call_sync("adb", "run", (command,), {})
+        return exit_code, output
+
+    def run_args(self, args, timeout=10.0):
+        return self.run(" ".join(shlex.quote(str(a)) for a in args), timeout=timeout)
+
+    async def run_async(self, command, timeout=10.0):
+        return self.run(command, timeout)
+
+
+# --- Entry points that can be recorded and replayed ---
+
+async def _run_plan(meta):
+    from plan_executor import PlanExecutor
+
+    executor = PlanExecutor(new_tools(), fallback_to_agent=False)
+    report = await executor.run(meta["steps"], num_images=meta.get("num_images"))
+    print(report.summary())
+    return not report.failed
+
+
+async def _run_import(meta):
+    from agents_functions import select_images
+
+    return await select_images(meta.get("remote_dir", "/sdcard/Pictures/droidrun"), use_agent_fallback=False)
+
+
+ENTRIES = {"plan": _run_plan, "import": _run_import}
+
+
+async def record_entry(path, entry, **meta):
+    """Runs an entry point on the real device while recording it."""
+    meta["entry"] = entry
+    with record(path, meta):
+        return await ENTRIES[entry](meta)
+
+
+async def replay(path, time_scale=0.0, strict=False):
+    """Re-runs a recording's entry point against the recorded responses; returns the replay report."""
+    recording = Recording.load(path)
+    entry = recording.meta.get("entry")
+    if entry not in ENTRIES:
+        raise ValueError(f"Recording has no replayable entry point (entry={entry!r})")
+
+    device = ReplayDevice(recording, time_scale=time_scale, strict=strict)
+    started = time.perf_counter()
+    with device.install():
+        result = await ENTRIES[entry](recording.meta)
+    if strict and device.divergences:
+        # Entry points catch step errors, so the one raised mid-step may have been swallowed
+        d = device.divergences[0]
+        raise ReplayDivergence(f"call {d.position}: expected {d.expected}, got {d.got}")
+    report = device.finish()
+    report["result"] = result
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["recorded_seconds"] = recording.events[-1]["t"] + recording.events[-1]["elapsed"] if recording.events else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Record a device session or replay one without a device.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("path")
+    rec.add_argument("entry", choices=list(ENTRIES))
+    rec.add_argument("--plan", default="plan.json")
+    rec.add_argument("--num-images", type=int, default=4)
+    rec.add_argument("--remote-dir", default="/sdcard/Pictures/droidrun")
+    rep = sub.add_parser("replay")
+    rep.add_argument("path")
+    rep.add_argument("--time-scale", type=float, default=0.0)
+    rep.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        meta = {"num_images": args.num_images, "remote_dir": args.remote_dir}
+        if args.entry == "plan":
+            with open(args.plan, "r") as f:
+                meta["steps"] = json.load(f)["plan"]
+        asyncio.run(record_entry(args.path, args.entry, **meta))
+    else:
+        report = asyncio.run(replay(args.path, args.time_scale, args.strict))
+        print(json.dumps(report, indent=4))
+        sys.exit(1 if report["diverged"] else 0)
@@ -0,0 +1,134 @@
+from tools.metrics import timed
+from tools.ui_snapshot import UiSnapshot
+
+# Bumped on every gesture that can change the screen (taps, swipes, input).
+# Process-wide because raw ADB taps don't go through a Tools instance.
+_action_epoch = 0
+
+
+def bump_epoch():
+    global _action_epoch
+    _action_epoch += 1
+
+
+def current_epoch():
+    return _action_epoch
+
+
+# Where fresh droidrun Tools come from; the session recorder / replayer swap it
+_tools_factory = None
+
+
+def new_tools():
+    """A droidrun AdbTools, or whatever set_tools_factory() installed."""
+    if _tools_factory is not None:
+        return _tools_factory()
+    from droidrun import AdbTools
+    return AdbTools()
+
+
+def set_tools_factory(factory):
+    """Installs `factory` (or None for AdbTools) process-wide; returns the previous one."""
+    global _tools_factory
+    previous, _tools_factory = _tools_factory, factory
+    return previous
+
+
+class CachedTools:
+    """
+    Wraps droidrun Tools so repeated get_state() calls with no gesture in
+    between are served from memory instead of a fresh device UI dump.
+    """
+
+    # Methods that touch the device and therefore start a new epoch
+    ACTIONS = (
+        "tap_on_index", "tap_by_index", "tap", "swipe", "drag",
+        "input_text", "back", "press_key", "start_app",
+    )
+
+    _wrappers = {}
+
+    def __init__(self, tools):
+        self.tools = tools
+        self.hits = 0
+        self.misses = 0
+        self._state = None
+        self._snapshot = None
+        self._epoch = -1
+
+    @classmethod
+    def wrap(cls, tools):
+        """
+        Returns the shared wrapper for `tools`. Wrapping a raw Tools object means
+        we are entering from the agent, which may have acted on its own, so the
+        cache is dropped. Already-wrapped objects pass through untouched.
+        """
+        if tools is None or isinstance(tools, cls):
+            return tools
+        wrapper = cls._wrappers.get(id(tools))
+        if wrapper is None or wrapper.tools is not tools:
+            wrapper = cls(tools)
+            cls._wrappers[id(tools)] = wrapper
+        wrapper.invalidate()
+        return wrapper
+
+    async def get_state(self, *args, **kwargs):
+        if self._state is not None and self._epoch == _action_epoch:
+            self.hits += 1
+            with timed("get_state", cache="hit"):
+                return self._state
+
+        self.misses += 1
+        epoch = _action_epoch
+        with timed("get_state", cache="miss"):
+            state = await self.tools.get_state(*args, **kwargs)
+        # A gesture that landed while we were dumping makes this state stale
+        if epoch == _action_epoch:
+            self._state, self._snapshot, self._epoch = state, None, epoch
+        return state
+
+    async def get_snapshot(self):
+        state = await self.get_state()
+        if self._state is not state:
+            return UiSnapshot(state[2])
+        if self._snapshot is None:
+            self._snapshot = UiSnapshot(state[2])
+        return self._snapshot
+
+    def invalidate(self):
+        self._state = None
+        self._snapshot = None
+        self._epoch = -1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    @classmethod
+    def total_stats(cls):
+        hits = sum(w.hits for w in cls._wrappers.values())
+        misses = sum(w.misses for w in cls._wrappers.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def __getattr__(self, name):
+        attr = getattr(self.tools, name)
+        if name not in self.ACTIONS or not callable(attr):
+            return attr
+
+        async def action(*args, **kwargs):
+            bump_epoch()
+            try:
+                with timed(name, via="tools"):
+                    return await attr(*args, **kwargs)
+            finally:
+                bump_epoch()
+
+        return action
@@ -0,0 +1,197 @@
+import time
+
+from redis_state import global_state
+
+
+class FenwickTree:
+    """Prefix sums with O(log n) point updates (1-based positions)."""
+
+    def __init__(self, values):
+        self.n = len(values)
+        self.tree = [0.0] * (self.n + 1)
+        for i, v in enumerate(values, 1):
+            self.tree[i] += v
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, i, delta):
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of positions 1..i"""
+        total = 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def lower_bound(self, target):
+        """Smallest i with prefix(i) > target (n + 1 if none)."""
+        pos, remaining = 0, target
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        return pos + 1
+
+
+class TimelineModel:
+    """
+    What InShot's timeline looks like after our edits.
+
+    durations[i]  raw clip length as set by change_duration
+    overlaps[j]   transition length at the junction after clip j+1
+    effects[i]    effect names applied over clip i+1
+    effect_blocks [start, end, name] where each effect landed. An effect is an
+                  absolute time span, fixed when it is applied: later edits
+                  to earlier clips move the clip out from under it.
+
+    A transition overlaps both neighbours by half its length, so a clip's
+    span on the timeline is its duration minus half of each adjacent overlap.
+    Spans live in a Fenwick tree; clip ranges and time -> clip lookups are
+    O(log n). Clip indices in the public methods are 1-based like the tools.
+    """
+
+    STATE_KEY = "timeline_model"
+    VERSION_KEY = "timeline_model_version"
+    DEFAULT_DURATION = 5.0
+
+    _current = None
+    _version = None # VERSION_KEY as it was when _current was loaded or saved
+
+    def __init__(self, durations, overlaps=None, effects=None, effect_blocks=None):
+        self.durations = [float(d) for d in durations]
+        self.overlaps = [float(o) for o in (overlaps or [0.0] * max(0, len(self.durations) - 1))]
+        self.effects = {int(k): list(v) for k, v in (effects or {}).items()}
+        self._rebuild()
+        if effect_blocks is None:
+            # Records saved before blocks were kept: assume nothing moved since
+            effect_blocks = [[*self.clip_range(k), name] for k in sorted(self.effects) for name in self.effects[k]]
+        self.effect_blocks = [[float(start), float(end), name] for start, end, name in effect_blocks]
+
+    def __len__(self):
+        return len(self.durations)
+
+    def _span(self, i):
+        left = self.overlaps[i - 1] if i > 0 else 0.0
+        right = self.overlaps[i] if i < len(self.overlaps) else 0.0
+        return self.durations[i] - left / 2 - right / 2
+
+    def _rebuild(self):
+        self._span_values = [self._span(i) for i in range(len(self.durations))]
+        self._spans = FenwickTree(self._span_values)
+
+    def _refresh(self, i):
+        if 0 <= i < len(self.durations):
+            span = self._span(i)
+            self._spans.add(i + 1, span - self._span_values[i])
+            self._span_values[i] = span
+
+    # --- Queries ---
+
+    def valid(self, image_idx):
+        return 1 <= image_idx <= len(self.durations)
+
+    def clip_range(self, image_idx):
+        """(start, end) of a clip on the timeline."""
+        return self._spans.prefix(image_idx - 1), self._spans.prefix(image_idx)
+
+    def clip_midpoint(self, image_idx):
+        start, end = self.clip_range(image_idx)
+        return (start + end) / 2.0
+
+    def junction_time(self, image1_idx):
+        """Where clip image1_idx meets the next one."""
+        return self._spans.prefix(image1_idx)
+
+    def total_duration(self):
+        return self._spans.prefix(len(self.durations))
+
+    def clip_at(self, time):
+        """1-based clip index under `time` (clamped to the first / last clip)."""
+        if not self.durations:
+            return None
+        return max(1, min(len(self.durations), self._spans.lower_bound(time)))
+
+    # --- Edits ---
+
+    def set_duration(self, image_idx, duration):
+        self.durations[image_idx - 1] = float(duration)
+        self._refresh(image_idx - 1)
+
+    def set_transition(self, image1_idx, transition_time):
+        self.overlaps[image1_idx - 1] = float(transition_time)
+        self._refresh(image1_idx - 1)
+        self._refresh(image1_idx)
+
+    def set_all_transitions(self, transition_time):
+        self.overlaps = [float(transition_time)] * len(self.overlaps)
+        self._rebuild()
+
+    def add_effect(self, image_idx, effect_name):
+        self.effects.setdefault(image_idx, []).append(effect_name)
+        self.effect_blocks.append([*self.clip_range(image_idx), effect_name])
+
+    def effect_spans(self):
+        """[(start, end, effect_name)] over the whole timeline, where each effect actually sits."""
+        return sorted(tuple(block) for block in self.effect_blocks)
+
+    # --- Persistence ---
+
+    def to_record(self):
+        return {"d": self.durations, "o": self.overlaps, "fx": self.effects, "fxb": self.effect_blocks}
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record["d"], record.get("o"), record.get("fx"), record.get("fxb"))
+
+    def save(self):
+        version = time.time_ns()
+        # Record first: whoever sees the new version also sees the new record
+        global_state.set(self.STATE_KEY, self.to_record())
+        global_state.set(self.VERSION_KEY, version)
+        TimelineModel._current, TimelineModel._version = self, version
+
+    @classmethod
+    def create(cls, num_images, duration=DEFAULT_DURATION):
+        model = cls([duration] * num_images)
+        model.save()
+        return model
+
+    @classmethod
+    def load(cls):
+        """
+        The model for this session. Kept in memory and re-read from Redis only
+        when VERSION_KEY changed: another process saved, or the state was
+        cleared (then there is no model until the next calibration).
+        """
+        version = global_state.get(cls.VERSION_KEY)
+        if cls._current is None or version != cls._version:
+            record = global_state.get(cls.STATE_KEY)
+            cls._current = cls.from_record(record) if isinstance(record, dict) and "d" in record else None
+            cls._version = version
+        return cls._current
+
+    @classmethod
+    def forget(cls):
+        """Drops the in-memory copy; the next load() reads Redis."""
+        cls._current = cls._version = None
+
+    def equivalent(self, other, tolerance=1e-6):
+        """Same clips, transitions and effect spans on the timeline (used to check plan rewrites)."""
+        if len(self) != len(other):
+            return False
+        close = lambda a, b: all(abs(x - y) <= tolerance for x, y in zip(a, b))
+        mine, theirs = self.effect_spans(), other.effect_spans()
+        return (
+            close(self.durations, other.durations)
+            and close(self.overlaps, other.overlaps)
+            and len(mine) == len(theirs)
+            and all(a[2] == b[2] and close(a[:2], b[:2]) for a, b in zip(mine, theirs))
+        )
@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right
+
+
+def parse_bounds(bounds_str):
+    """Converts '0,78,147,209' to (0, 78, 147, 209). Bad input -> (0, 0, 0, 0)"""
+    try:
+        x1, y1, x2, y2 = (int(x) for x in bounds_str.split(','))
+        return (x1, y1, x2, y2)
+    except (AttributeError, ValueError):
+        return (0, 0, 0, 0)
+
+
+class UiSnapshot:
+    """
+    One parsed UI tree from `tools.get_state()`.
+    Built once per dump: nodes are indexed by resourceId, lowercased text and
+    index, and bounds are stored as ints so helpers never re-scan the raw list.
+    """
+
+    def __init__(self, elements):
+        self.elements = list(elements or [])
+        self._bounds = []
+        self._by_id = {}
+        self._by_text = {}
+        self._by_index = {}
+        self._position = {}
+
+        for pos, el in enumerate(self.elements):
+            self._bounds.append(parse_bounds(el.get("bounds", "")))
+            self._position[id(el)] = pos
+            self._by_id.setdefault(el.get("resourceId", ""), []).append(pos)
+            self._by_text.setdefault(el.get("text", "").lower(), []).append(pos)
+            if el.get("index") is not None:
+                self._by_index.setdefault(el.get("index"), pos)
+
+        # Sorted edges for row / column queries
+        self._tops = sorted((b[1], pos) for pos, b in enumerate(self._bounds))
+        self._lefts = sorted((b[0], pos) for pos, b in enumerate(self._bounds))
+
+    @classmethod
+    async def capture(cls, tools):
+        # CachedTools keeps the already-indexed snapshot for the current epoch
+        if hasattr(tools, "get_snapshot"):
+            return await tools.get_snapshot()
+        return cls((await tools.get_state())[2])
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    # --- Lookups ---
+
+    def find_all_by_id(self, resource_id):
+        return [self.elements[pos] for pos in self._by_id.get(resource_id, [])]
+
+    def find_by_id(self, resource_id):
+        positions = self._by_id.get(resource_id)
+        return self.elements[positions[0]] if positions else None
+
+    def index_of(self, resource_id):
+        """Index of the first node with this resourceId, or -1."""
+        el = self.find_by_id(resource_id)
+        return el.get("index") if el else -1
+
+    def find_all_by_text(self, text):
+        """Case-insensitive exact text match, in tree order."""
+        return [self.elements[pos] for pos in self._by_text.get(text.lower(), [])]
+
+    def find_by_text(self, text):
+        positions = self._by_text.get(text.lower())
+        return self.elements[positions[0]] if positions else None
+
+    def get(self, index):
+        """Node by its droidrun `index` field (not list position)."""
+        pos = self._by_index.get(index)
+        return self.elements[pos] if pos is not None else None
+
+    def position_of(self, element):
+        return self._position.get(id(element), -1)
+
+    # --- Geometry ---
+
+    def bounds_of(self, element):
+        pos = self.position_of(element)
+        if pos == -1:
+            return parse_bounds(element.get("bounds", ""))
+        return self._bounds[pos]
+
+    def center_of(self, element):
+        x1, y1, x2, y2 = self.bounds_of(element)
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def row(self, top, tolerance=2):
+        """Nodes whose top edge is less than `tolerance` px from `top`, in tree order."""
+        return self._edge_range(self._tops, top, tolerance)
+
+    def column(self, left, tolerance=2):
+        """Nodes whose left edge is less than `tolerance` px from `left`, in tree order."""
+        return self._edge_range(self._lefts, left, tolerance)
+
+    def _edge_range(self, edges, value, tolerance):
+        lo = bisect_left(edges, (value - tolerance + 1, -1))
+        hi = bisect_right(edges, (value + tolerance - 1, len(self.elements)))
+        return [self.elements[pos] for pos in sorted(pos for _, pos in edges[lo:hi])]
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import types
+
+from plan_cache import file_sha256
+from profiling import bind
+
+RETENTION_S = 48 * 3600 # Gemini Files API keeps uploads for 48h
+SAFETY_MARGIN_S = 3600 # Don't hand out a handle that may expire mid-request
+DISPLAY_PREFIX = "director-"
+
+
+class UploadRegistry:
+    """
+    content sha256 -> Gemini file handle {name, uri, mime_type, expires}.
+    Persisted as JSON so unchanged images aren't uploaded again across runs.
+    """
+
+    def __init__(self, path=".gemini_uploads.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry and entry["expires"] - SAFETY_MARGIN_S > time.time():
+                return entry
+            return None
+
+    def put(self, digest, file_obj):
+        expires = time.time() + RETENTION_S
+        expiration = getattr(file_obj, "expiration_time", None)
+        if expiration is not None:
+            expires = min(expires, expiration.timestamp())
+        with self.lock:
+            self.entries[digest] = {
+                "name": file_obj.name,
+                "uri": file_obj.uri,
+                "mime_type": file_obj.mime_type,
+                "expires": expires,
+            }
+
+    def prune(self):
+        """Drops expired entries; returns the remote names still referenced."""
+        now = time.time()
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if v["expires"] > now}
+            return {v["name"] for v in self.entries.values()}
+
+    def forget(self, names):
+        """Drops entries whose remote file is gone."""
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if v["name"] not in names}
+
+    def save(self):
+        with self.lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+
+class FileUploader:
+    """
+    Uploads images to the Gemini Files API with a bounded thread pool,
+    reusing any still-live upload of the same bytes.
+    """
+
+    def __init__(self, client, registry=None, max_workers=4):
+        self.client = client
+        self.registry = registry or UploadRegistry()
+        self.max_workers = max_workers
+        self._swept = False
+
+    def _upload(self, path, digest):
+        file_obj = self.client.files.upload(file=path, config={
+            "display_name": f"{DISPLAY_PREFIX}{digest[:16]}"
+        })
+        self.registry.put(digest, file_obj)
+
+    def upload_all(self, paths):
+        """Returns one Part per path, in order."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            digests = list(pool.map(bind(file_sha256), paths))
+
+            pending = {}
+            for path, digest in zip(paths, digests):
+                if digest not in pending and self.registry.get(digest) is None:
+                    pending[digest] = path
+            list(pool.map(bind(lambda item: self._upload(item[1], item[0])), pending.items()))
+
+        self.registry.save()
+        print(f"📤 Uploaded {len(pending)} of {len(paths)} images ({len(paths) - len(pending)} reused) in {time.perf_counter() - started:.1f}s")
+
+        parts = []
+        for digest in digests:
+            entry = self.registry.get(digest)
+            parts.append(types.Part.from_uri(file_uri=entry["uri"], mime_type=entry["mime_type"]))
+
+        # Only now: a sweep running alongside would see our fresh uploads as orphans
+        if not self._swept:
+            self._swept = True
+            self.cleanup_in_background()
+        return parts
+
+    def cleanup_orphans(self):
+        """
+        Deletes our remote files the registry no longer points at. Files
+        created after the registry snapshot (an upload still in flight) are
+        left alone.
+        """
+        cutoff = time.time()
+        live = self.registry.prune()
+        deleted = set()
+        for file_obj in self.client.files.list():
+            name = file_obj.name
+            if not (file_obj.display_name or "").startswith(DISPLAY_PREFIX) or name in live:
+                continue
+            created = getattr(file_obj, "create_time", None)
+            if created is None or created.timestamp() > cutoff:
+                continue
+            try:
+                self.client.files.delete(name=name)
+                deleted.add(name)
+            except Exception as e:
+                print(f"⚠️ Could not delete {name}: {e}")
+        self.registry.forget(deleted)
+        self.registry.save()
+        return len(deleted)
+
+    def cleanup_in_background(self):
+        thread = threading.Thread(target=self._cleanup_quietly, daemon=True)
+        thread.start()
+        return thread
+
+    def _cleanup_quietly(self):
+        try:
+            deleted = self.cleanup_orphans()
+            if deleted:
+                print(f"🧹 Deleted {deleted} orphaned uploads")
+        except Exception as e:
+            print(f"⚠️ Upload cleanup failed: {e}")